@@ -1,4 +1,26 @@
-from addon_service.common.aiohttp_session import get_singleton_client_session__blocking
+"""get addon imp instances, ready to invoke operations
+
+`pooled_storage_addon_instance` (and its `__blocking` twin) lend out imps from a
+per-process pool (opt-in, with GRAVYVALET_IMP_POOL_SIZE > 0; otherwise each is
+made anew), keyed by imp class, account and config -- consecutive
+invocations thru the same account reuse a warm requestor (with credentials and
+limits already loaded) instead of loading them again
+
+an account's pooled imps are dropped when the account is saved (its `modified`
+is part of the key) or left idle longer than GRAVYVALET_IMP_POOL_IDLE_SECONDS
+"""
+
+import contextlib
+import datetime
+import functools
+import typing
+
+from django.conf import settings
+
+from addon_service.common.local_cache import (
+    KeyedPool,
+    PoolStats,
+)
 from addon_service.common.network import GravyvaletHttpRequestor
 from addon_service.models import AuthorizedStorageAccount
 from addon_toolkit.interfaces.storage import (
@@ -7,17 +29,114 @@ from addon_toolkit.interfaces.storage import (
 )
 
 
+__all__ = (
+    "clear_imp_pool",
+    "get_storage_addon_instance",
+    "get_storage_addon_instance__async",
+    "imp_pool_stats",
+    "pooled_storage_addon_instance",
+    "pooled_storage_addon_instance__blocking",
+)
+
+
 def get_storage_addon_instance(
     imp_cls: type[StorageAddonImp],
     account: AuthorizedStorageAccount,
     config: StorageConfig,
 ) -> StorageAddonImp:
-    assert issubclass(imp_cls, StorageAddonImp)
-    return imp_cls(
+    _network = _new_network(imp_cls, account, config)
+    _network.preload__blocking()
+    return imp_cls(config=config, network=_network)
+
+
+async def get_storage_addon_instance__async(
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> StorageAddonImp:
+    _network = _new_network(imp_cls, account, config)
+    await _network.preload()
+    return imp_cls(config=config, network=_network)
+
+
+@contextlib.contextmanager
+def pooled_storage_addon_instance__blocking(
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> typing.Iterator[StorageAddonImp]:
+    """borrow a ready imp instance (yours alone until the `with` block ends)"""
+    with _imp_pool().checkout__blocking(
+        _pool_key(imp_cls, account, config),
+        functools.partial(get_storage_addon_instance, imp_cls, account, config),
+    ) as _imp:
+        yield _imp
+
+
+@contextlib.asynccontextmanager
+async def pooled_storage_addon_instance(
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> typing.AsyncIterator[StorageAddonImp]:
+    """borrow a ready imp instance (yours alone until the `async with` block ends)"""
+    async with _imp_pool().checkout(
+        _pool_key(imp_cls, account, config),
+        functools.partial(get_storage_addon_instance__async, imp_cls, account, config),
+    ) as _imp:
+        yield _imp
+
+
+def imp_pool_stats() -> PoolStats:
+    return _imp_pool().stats()
+
+
+def clear_imp_pool() -> None:
+    _imp_pool().clear()
+
+
+###
+# module-private helpers
+
+
+class _ImpPoolKey(typing.NamedTuple):
+    imp_cls: type[StorageAddonImp]
+    account_pk: str
+    account_modified: datetime.datetime
+    credentials_pk: str | None
+    config: StorageConfig
+
+
+@functools.cache  # one pool per process
+def _imp_pool() -> KeyedPool[_ImpPoolKey, StorageAddonImp]:
+    return KeyedPool(
+        max_idle=settings.GRAVYVALET_IMP_POOL_SIZE,
+        idle_seconds=settings.GRAVYVALET_IMP_POOL_IDLE_SECONDS,
+    )
+
+
+def _pool_key(
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> _ImpPoolKey:
+    return _ImpPoolKey(
+        imp_cls=imp_cls,
+        account_pk=account.pk,
+        account_modified=account.modified,
+        credentials_pk=account._credentials_id,
         config=config,
-        network=GravyvaletHttpRequestor(
-            client_session=get_singleton_client_session__blocking(),
-            prefix_url=config.external_api_url,
-            account=account,
-        ),
+    )
+
+
+def _new_network(
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> GravyvaletHttpRequestor:
+    assert issubclass(imp_cls, StorageAddonImp)
+    return GravyvaletHttpRequestor(
+        prefix_url=config.external_api_url,
+        account=account,
+        max_upload_mb=config.max_upload_mb,
     )
@@ -0,0 +1,239 @@
+"""save finished invocations in batches, off the request path (opt-in)
+
+with GRAVYVALET_AUDIT_SINK_MAX_PENDING > 0, new invocations (performed
+immediately, see `addon_service.tasks.invocation`) are recorded here once done,
+instead of saved one at a time -- a background thread saves them together with
+`bulk_create`, whenever GRAVYVALET_AUDIT_SINK_BATCH_SIZE are pending or every
+GRAVYVALET_AUDIT_SINK_FLUSH_SECONDS
+
+invocations recorded within a transaction are queued only once it commits
+(and dropped if it rolls back, like any other row written in it)
+
+when GRAVYVALET_AUDIT_SINK_MAX_PENDING are pending, queuing waits for room
+(or saves a batch itself, if the background thread can't keep up -- after the
+caller's transaction, never within it)
+
+on graceful shutdown (at exit), pending invocations are saved before the
+process ends -- but any still pending when a process is killed are lost,
+and a recorded invocation may not be found in the database until saved
+"""
+
+import atexit
+import collections
+import dataclasses
+import functools
+import logging
+import threading
+import typing
+
+from django import db
+from django.conf import settings
+from django.utils import timezone
+
+from addon_service.models import AddonOperationInvocation
+
+
+__all__ = (
+    "AuditSinkStats",
+    "InvocationAuditSink",
+    "audit_sink_stats",
+    "drain",
+    "enabled",
+    "record",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class AuditSinkStats:
+    pending: int
+    recorded: int
+    saved: int
+    failed: int  # could not be saved (see logs)
+
+
+def enabled() -> bool:
+    return _audit_sink().enabled
+
+
+def record(invocations: typing.Iterable[AddonOperationInvocation]) -> None:
+    """save new, finished invocations soon (in a batch), once the current transaction commits"""
+    _audit_sink().record(invocations)
+
+
+def drain() -> None:
+    """save all pending invocations now (and stop the background thread)"""
+    _audit_sink().drain()
+
+
+def audit_sink_stats() -> AuditSinkStats:
+    return _audit_sink().stats()
+
+
+class InvocationAuditSink:
+    """buffer of new invocations, saved in batches
+
+    with `autostart=False`, nothing is saved until `flush` or `drain` is called
+    (or `record` finds no room)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_pending: int,
+        batch_size: int,
+        flush_seconds: float,
+        autostart: bool = True,
+    ) -> None:
+        self.max_pending = max_pending
+        self.batch_size = max(1, min(batch_size, max_pending))
+        self.flush_seconds = flush_seconds
+        self._autostart = autostart
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)  # notified after each batch
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()  # (one batch at a time)
+        self._pending: collections.deque[AddonOperationInvocation] = collections.deque()
+        self._thread: threading.Thread | None = None
+        self._draining = False
+        self._recorded = 0
+        self._saved = 0
+        self._failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_pending > 0
+
+    def record(self, invocations: typing.Iterable[AddonOperationInvocation]) -> None:
+        """queue new, finished invocations once the current transaction (if any) commits
+
+        (never queued if it rolls back -- and never saved before rows they refer
+        to, which may have been created in the same transaction)
+        """
+        _invocations = list(invocations)
+        _now = timezone.now()
+        for _invocation in _invocations:
+            assert _invocation._state.adding, "audit sink is for new invocations only"
+            _invocation.created = _invocation.modified = _now
+        db.transaction.on_commit(functools.partial(self._enqueue, _invocations))
+
+    def flush(self) -> int:
+        """save all pending invocations (in batches) in this thread; return count saved"""
+        _saved = 0
+        while _batch_saved := self._flush_batch():
+            _saved += _batch_saved
+        return _saved
+
+    def drain(self) -> None:
+        self._draining = True
+        self._wakeup.set()
+        _thread = self._thread
+        if _thread is not None:
+            _thread.join(timeout=max(self.flush_seconds, 1) * 10)
+        self.flush()  # (whatever's left)
+
+    def stats(self) -> AuditSinkStats:
+        with self._lock:
+            return AuditSinkStats(
+                pending=len(self._pending),
+                recorded=self._recorded,
+                saved=self._saved,
+                failed=self._failed,
+            )
+
+    def _enqueue(self, invocations: list[AddonOperationInvocation]) -> None:
+        # (as an on-commit callback, outside any transaction -- saving a batch
+        # here for lack of room won't save it with the caller's transaction)
+        for _invocation in invocations:
+            self._wait_for_room()
+            with self._lock:
+                self._pending.append(_invocation)
+                self._recorded += 1
+                _pending_count = len(self._pending)
+            if _pending_count >= self.batch_size:
+                self._wakeup.set()
+        if self._autostart and not self._draining:
+            self._ensure_thread()
+
+    def _wait_for_room(self) -> None:
+        with self._room:
+            _has_room = self._room.wait_for(
+                lambda: len(self._pending) < self.max_pending,
+                timeout=(
+                    self.flush_seconds
+                    if (self._thread is not None and self._thread.is_alive())
+                    else 0
+                ),
+            )
+        if not _has_room:  # save a batch here (slower, but nothing lost)
+            self._flush_batch()
+
+    def _flush_batch(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                _batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.batch_size, len(self._pending)))
+                ]
+            if not _batch:
+                return 0
+            _saved = _save_batch(_batch)
+            with self._room:
+                self._saved += _saved
+                self._failed += len(_batch) - _saved
+                self._room.notify_all()
+            return _saved
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=self.__class__.__qualname__,
+                    daemon=True,  # (drained at exit, see `_audit_sink`)
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._draining:
+                self._wakeup.wait(self.flush_seconds)
+                self._wakeup.clear()
+                try:
+                    self.flush()
+                except Exception:
+                    _logger.exception("audit sink: flush failed")
+        finally:
+            db.connections.close_all()  # (this thread's connections)
+
+
+###
+# module-private helpers
+
+
+@functools.cache  # one sink per process
+def _audit_sink() -> InvocationAuditSink:
+    _sink = InvocationAuditSink(
+        max_pending=settings.GRAVYVALET_AUDIT_SINK_MAX_PENDING,
+        batch_size=settings.GRAVYVALET_AUDIT_SINK_BATCH_SIZE,
+        flush_seconds=settings.GRAVYVALET_AUDIT_SINK_FLUSH_SECONDS,
+    )
+    if _sink.enabled:
+        atexit.register(_sink.drain)
+    return _sink
+
+
+def _save_batch(batch: list[AddonOperationInvocation]) -> int:
+    """save the given invocations; return how many were saved"""
+    try:
+        with db.transaction.atomic():
+            AddonOperationInvocation.objects.bulk_create(batch)
+        return len(batch)
+    except db.DatabaseError:
+        if len(batch) == 1:
+            _logger.exception("audit sink: could not save %r", batch[0])
+            return 0
+    # one bad invocation (e.g. its account deleted meanwhile) shouldn't lose the rest
+    return sum(_save_batch([_invocation]) for _invocation in batch)
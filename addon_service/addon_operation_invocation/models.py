@@ -6,6 +6,7 @@ from django.db import models
 
 from addon_service.common.base_model import AddonsServiceBaseModel
 from addon_service.common.invocation_status import InvocationStatus
+from addon_service.common.unit_of_work import load_related
 from addon_service.common.validators import validate_invocation_status
 from addon_service.models import AddonOperationModel
 from addon_toolkit import AddonImp
@@ -27,14 +28,24 @@ class AddonOperationInvocation(AddonsServiceBaseModel):
     )
     by_user = models.ForeignKey("UserReference", on_delete=models.CASCADE)
     operation_result = models.JSONField(null=True, default=None, blank=True)
+    result_from_cache = models.BooleanField(default=False)
     exception_type = models.TextField(blank=True, default="")
     exception_message = models.TextField(blank=True, default="")
     exception_context = models.TextField(blank=True, default="")
 
+    # the table is partitioned by `created` (see `.partitions`)
+    PARTITION_FIELD = "created"
+
     class Meta:
         indexes = [
-            models.Index(fields=["operation_identifier"]),
-            models.Index(fields=["exception_type"]),
+            # (with `created`, for time-bounded queries on the partitioned table)
+            models.Index(fields=["operation_identifier", "created"]),
+            # (only failed invocations have an exception_type)
+            models.Index(
+                fields=["exception_type"],
+                condition=~models.Q(exception_type=""),
+                name="addon_servi_failed_excepti_idx",
+            ),
         ]
 
     class JSONAPIMeta:
@@ -62,11 +73,11 @@ class AddonOperationInvocation(AddonsServiceBaseModel):
 
     @property
     def owner_uri(self) -> str:
-        return self.by_user.user_uri
+        return load_related(self, "by_user").user_uri
 
     @property
     def imp_cls(self) -> type[AddonImp]:
-        return self.thru_account.imp_cls
+        return load_related(self, "thru_account").imp_cls
 
     def clean_fields(self, *args, **kwargs):
         super().clean_fields(*args, **kwargs)
@@ -85,9 +96,10 @@ class AddonOperationInvocation(AddonsServiceBaseModel):
             )
 
     def storage_imp_config(self) -> StorageConfig:
-        if self.thru_addon:
-            return self.thru_addon.storage_imp_config()
-        return self.thru_account.storage_imp_config()
+        _thru_addon = load_related(self, "thru_addon")
+        if _thru_addon:
+            return _thru_addon.storage_imp_config()
+        return load_related(self, "thru_account").storage_imp_config()
 
     def set_exception(self, exception: BaseException) -> None:
         self.invocation_status = InvocationStatus.ERROR
@@ -0,0 +1,217 @@
+"""monthly partitions of the AddonOperationInvocation table (postgres only)
+
+the table is range-partitioned on `created` (see migration 0003), one partition
+per month named like "<table>_p202601", plus a default partition for anything
+outside those (which should stay empty, as long as partitions are created
+ahead of time -- see `addon_service.tasks.partition_maintenance`)
+
+old invocations go by whole partitions: detached (and dropped, unless kept for
+archiving) once past retention -- no DELETE, no vacuum (except for any old rows
+stranded in the default partition)
+
+lookups that include `created` touch only the partition for that month (e.g.
+`dibs`, and the task performing an eventual invocation); those by `id` alone
+(e.g. retrieving an invocation thru the api, `save`, `refresh_from_db`) check the
+primary key index of each partition
+"""
+
+import dataclasses
+import datetime
+import logging
+
+from django.db import (
+    IntegrityError,
+    connection,
+    transaction,
+)
+
+from .models import AddonOperationInvocation
+
+
+__all__ = (
+    "MonthlyPartition",
+    "create_partition",
+    "ensure_partitions",
+    "is_partitioned",
+    "list_partitions",
+    "prune_partitions",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True, order=True)
+class MonthlyPartition:
+    month: datetime.date  # (first day of the month)
+
+    @classmethod
+    def containing(cls, when: datetime.date) -> "MonthlyPartition":
+        return cls(when.replace(day=1))
+
+    @property
+    def name(self) -> str:
+        return f"{_table()}_p{self.month:%Y%m}"
+
+    @property
+    def start(self) -> datetime.datetime:
+        return datetime.datetime.combine(self.month, datetime.time(), datetime.UTC)
+
+    @property
+    def end(self) -> datetime.datetime:
+        return self.next().start
+
+    def next(self) -> "MonthlyPartition":
+        return MonthlyPartition(_add_months(self.month, 1))
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as _cursor:
+        _cursor.execute(
+            "SELECT EXISTS (SELECT FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+            [_table()],
+        )
+        (_partitioned,) = _cursor.fetchone()
+    return _partitioned
+
+
+def list_partitions() -> list[MonthlyPartition]:
+    """monthly partitions currently attached, in order"""
+    with connection.cursor() as _cursor:
+        _cursor.execute(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = %s::regclass",
+            [_table()],
+        )
+        _names = [_name for (_name,) in _cursor.fetchall()]
+    _prefix = f"{_table()}_p"
+    return sorted(
+        MonthlyPartition(datetime.datetime.strptime(_name, f"{_prefix}%Y%m").date())
+        for _name in _names
+        if _name.startswith(_prefix)
+    )
+
+
+def create_partition(partition: MonthlyPartition) -> bool:
+    """create the given partition, if missing; return True if created
+
+    (moves any of its rows out of the default partition)
+    """
+    if partition in list_partitions():
+        return False
+    _table_name = connection.ops.quote_name(_table())
+    _default = connection.ops.quote_name(_default_partition_name())
+    _partition = connection.ops.quote_name(partition.name)
+    _bounds = [partition.start, partition.end]
+    _create_sql = f"CREATE TABLE {_partition} PARTITION OF {_table_name} FOR VALUES FROM (%s) TO (%s)"
+    _in_default_sql = (
+        f"SELECT EXISTS (SELECT FROM {_default} WHERE created >= %s AND created < %s)"
+    )
+    with transaction.atomic(), connection.cursor() as _cursor:
+        # the usual case: nothing in the default partition for this month, so
+        # no need to block reads and writes of the whole table
+        _cursor.execute(_in_default_sql, _bounds)
+        (_in_default,) = _cursor.fetchone()
+        if not _in_default:
+            try:
+                with transaction.atomic():
+                    _cursor.execute(_create_sql, _bounds)
+                return True
+            except IntegrityError:  # (a row landed in the default since checked)
+                pass
+        # no inserts until done -- they'd fail while the default partition is
+        # detached, or land in it after it's checked
+        _cursor.execute(f"LOCK TABLE {_table_name} IN ACCESS EXCLUSIVE MODE")
+        _cursor.execute(_in_default_sql, _bounds)
+        (_in_default,) = _cursor.fetchone()
+        if _in_default:  # (postgres won't create a partition for rows in the default)
+            _cursor.execute(f"ALTER TABLE {_table_name} DETACH PARTITION {_default}")
+        _cursor.execute(_create_sql, _bounds)
+        if _in_default:
+            _cursor.execute(
+                f"WITH _moved AS (DELETE FROM {_default} WHERE created >= %s AND created < %s RETURNING *)"
+                f" INSERT INTO {_table_name} SELECT * FROM _moved",
+                _bounds,
+            )
+            _cursor.execute(
+                f"ALTER TABLE {_table_name} ATTACH PARTITION {_default} DEFAULT"
+            )
+            _logger.warning("moved rows out of %s into %s", _default, _partition)
+    return True
+
+
+def ensure_partitions(
+    *, months_ahead: int, today: datetime.date | None = None
+) -> list[MonthlyPartition]:
+    """create partitions for this month and `months_ahead` more; return those created"""
+    _partition = MonthlyPartition.containing(today or datetime.date.today())
+    _created = []
+    for _ in range(months_ahead + 1):
+        if create_partition(_partition):
+            _created.append(_partition)
+        _partition = _partition.next()
+    return _created
+
+
+def prune_partitions(
+    *,
+    retention_months: int,
+    detach_only: bool = False,
+    today: datetime.date | None = None,
+) -> list[MonthlyPartition]:
+    """detach (and drop) partitions entirely older than `retention_months` full months
+
+    return those pruned; detached partitions are left as ordinary tables (named
+    the same), for archiving elsewhere -- rows in the default partition from before
+    retention are deleted (unless `detach_only`, which leaves them be)
+    """
+    if retention_months < 1:
+        raise ValueError(f"expected positive retention_months (got {retention_months})")
+    _keep_since = _add_months(
+        MonthlyPartition.containing(today or datetime.date.today()).month,
+        -retention_months,
+    )
+    _pruned = [
+        _partition for _partition in list_partitions() if _partition.month < _keep_since
+    ]
+    _table_name = connection.ops.quote_name(_table())
+    for _partition in _pruned:
+        _partition_name = connection.ops.quote_name(_partition.name)
+        with transaction.atomic(), connection.cursor() as _cursor:
+            _cursor.execute(
+                f"ALTER TABLE {_table_name} DETACH PARTITION {_partition_name}"
+            )
+            if not detach_only:
+                _cursor.execute(f"DROP TABLE {_partition_name}")
+    if not detach_only:
+        _default = connection.ops.quote_name(_default_partition_name())
+        with connection.cursor() as _cursor:
+            _cursor.execute(
+                f"DELETE FROM {_default} WHERE created < %s",
+                [MonthlyPartition(_keep_since).start],
+            )
+            if _cursor.rowcount:
+                _logger.warning(
+                    "deleted %s old rows from %s", _cursor.rowcount, _default
+                )
+    return _pruned
+
+
+###
+# module-private helpers
+
+
+def _table() -> str:
+    return AddonOperationInvocation._meta.db_table
+
+
+def _default_partition_name() -> str:
+    return f"{_table()}_default"
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    _years, _month_index = divmod(month.month - 1 + months, 12)
+    return month.replace(year=month.year + _years, month=_month_index + 1, day=1)
@@ -0,0 +1,153 @@
+"""reuse results of operations that declare a `cache_ttl` (see AddonOperationDeclaration)
+
+keyed by account, connected root folder (may affect results), operation, and arguments;
+performing any UPDATE operation thru an account forgets that account's results
+
+like other caches in `addon_service.common.local_cache`, in local memory only
+(each process has its own -- an update in one process can't invalidate another's,
+nor can changes made elsewhere, e.g. uploads thru waterbutler, so keep each
+`cache_ttl` short); opt-in, with GRAVYVALET_OPERATION_RESULT_CACHE_SIZE > 0
+"""
+
+import dataclasses
+import functools
+import inspect
+import json
+import time
+import typing
+
+from django.conf import settings
+
+from addon_service.common.invocation_status import InvocationStatus
+from addon_service.common.local_cache import (
+    CacheStats,
+    TtlLruCache,
+)
+from addon_toolkit import AddonCapabilities
+
+
+if typing.TYPE_CHECKING:
+    from addon_service.models import AddonOperationInvocation
+
+
+__all__ = (
+    "ResultCacheKey",
+    "after_invocation",
+    "after_invocations",
+    "clear",
+    "result_cache_stats",
+    "use_cached_result",
+)
+
+
+class ResultCacheKey(typing.NamedTuple):
+    account_pk: str
+    connected_root_id: str | None
+    operation_identifier: str
+    canonical_kwargs: str
+
+
+def use_cached_result(invocation: "AddonOperationInvocation") -> bool:
+    """if a result is cached for this invocation, set it (as a success) and return True"""
+    _key = _cache_key(invocation)
+    if _key is None:
+        return False
+    _cached = _result_cache().get(_key, None)
+    if _cached is None:
+        return False
+    if _cached.expires_at <= time.monotonic():
+        _result_cache().invalidate(_key)
+        return False
+    invocation.operation_result = _cached.operation_result
+    invocation.invocation_status = InvocationStatus.SUCCESS
+    invocation.clear_exception()
+    invocation.result_from_cache = True
+    return True
+
+
+def after_invocation(invocation: "AddonOperationInvocation") -> None:
+    """remember a fresh result (if cacheable), or forget results an update may have changed"""
+    _declaration = invocation.operation.declaration
+    if _is_update(invocation):
+        # (even if the update failed -- it may have partly happened)
+        _forget_account(invocation.thru_account_id)
+        return
+    _key = _cache_key(invocation)
+    if _key is not None and invocation.invocation_status is InvocationStatus.SUCCESS:
+        _result_cache().set(
+            _key,
+            _CachedResult(
+                expires_at=time.monotonic() + _declaration.cache_ttl.total_seconds(),
+                operation_result=invocation.operation_result,
+            ),
+        )
+
+
+def after_invocations(invocations: typing.Iterable["AddonOperationInvocation"]) -> None:
+    """`after_invocation` for each of invocations performed concurrently
+
+    (updates forget results only after reads are remembered -- any read may have
+    run before an update, wherever it was in the list)
+    """
+    for _invocation in sorted(invocations, key=_is_update):
+        after_invocation(_invocation)
+
+
+def result_cache_stats() -> CacheStats:
+    return _result_cache().stats()
+
+
+def clear() -> None:
+    _result_cache().clear()
+
+
+###
+# module-private helpers
+
+
+@dataclasses.dataclass(frozen=True)
+class _CachedResult:
+    expires_at: float  # (each operation declares its own ttl)
+    operation_result: typing.Any
+
+
+@functools.cache  # one cache per process
+def _result_cache() -> TtlLruCache[ResultCacheKey, _CachedResult]:
+    return TtlLruCache(
+        maxsize=settings.GRAVYVALET_OPERATION_RESULT_CACHE_SIZE,
+        ttl_seconds=None,
+    )
+
+
+def _cache_key(invocation: "AddonOperationInvocation") -> ResultCacheKey | None:
+    _declaration = invocation.operation.declaration
+    if not _declaration.cache_ttl or not _result_cache().enabled:
+        return None
+    return ResultCacheKey(
+        account_pk=invocation.thru_account_id,
+        connected_root_id=invocation.storage_imp_config().connected_root_id,
+        operation_identifier=invocation.operation_identifier,
+        canonical_kwargs=_canonical_kwargs(
+            _declaration.call_signature, invocation.operation_kwargs
+        ),
+    )
+
+
+def _canonical_kwargs(signature: inspect.Signature, kwargs: dict) -> str:
+    # same arguments, same key -- whether defaults are given or not, in any order
+    try:
+        _bound = signature.bind_partial(**kwargs)
+    except TypeError:
+        _arguments = kwargs
+    else:
+        _bound.apply_defaults()
+        _arguments = _bound.arguments
+    return json.dumps(_arguments, sort_keys=True, separators=(",", ":"))
+
+
+def _is_update(invocation: "AddonOperationInvocation") -> bool:
+    return invocation.operation.declaration.capability is AddonCapabilities.UPDATE
+
+
+def _forget_account(account_pk: str) -> None:
+    _result_cache().invalidate_where(lambda _key, _: _key.account_pk == account_pk)
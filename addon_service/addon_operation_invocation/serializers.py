@@ -1,3 +1,5 @@
+from django.conf import settings
+from rest_framework import serializers as drf_serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework_json_api import serializers
 from rest_framework_json_api.relations import ResourceRelatedField
@@ -28,6 +30,7 @@ class AddonOperationInvocationSerializer(serializers.HyperlinkedModelSerializer)
             "invocation_status",
             "operation_kwargs",
             "operation_result",
+            "result_from_cache",
             "operation",
             "by_user",
             "thru_account",
@@ -43,6 +46,7 @@ class AddonOperationInvocationSerializer(serializers.HyperlinkedModelSerializer)
     invocation_status = EnumNameChoiceField(enum_cls=InvocationStatus, read_only=True)
     operation_kwargs = serializers.JSONField()
     operation_result = serializers.JSONField(read_only=True)
+    result_from_cache = serializers.BooleanField(read_only=True)
     created = serializers.DateTimeField(read_only=True)
     modified = serializers.DateTimeField(read_only=True)
     operation_name = serializers.CharField(required=True)
@@ -80,22 +84,98 @@ class AddonOperationInvocationSerializer(serializers.HyperlinkedModelSerializer)
     }
 
     def create(self, validated_data):
-        _thru_addon = validated_data.get("thru_addon")
-        _thru_account = validated_data.get("thru_account")
-        if _thru_addon is None and _thru_account is None:
-            raise ValidationError("must include either 'thru_addon' or 'thru_account'")
-        if _thru_account is None:
-            _thru_account = _thru_addon.base_account
-        _operation_name: str = validated_data["operation_name"]
-        _imp_cls = _thru_account.imp_cls
-        _operation = _imp_cls.get_operation_declaration(_operation_name)
-        _request = self.context["request"]
-        _user_uri = _request.session.get("user_reference_uri")
-        _user, _ = UserReference.objects.get_or_create(user_uri=_user_uri)
-        return AddonOperationInvocation(
-            operation=AddonOperationModel(_imp_cls, _operation),
-            operation_kwargs=validated_data["operation_kwargs"],
+        _thru_addon, _thru_account = _get_thru(validated_data)
+        return _new_invocation(
+            validated_data,
             thru_addon=_thru_addon,
             thru_account=_thru_account,
-            by_user=_user,
+            by_user=_get_requesting_user(self.context),
         )
+
+
+class _BatchItemSerializer(drf_serializers.Serializer):
+    operation_name = drf_serializers.CharField(required=True)
+    operation_kwargs = drf_serializers.JSONField(default=dict)
+
+
+class AddonOperationInvocationBatchSerializer(serializers.Serializer):
+    """many invocations thru the same account (or addon), in one request"""
+
+    class Meta:
+        resource_name = RESOURCE_TYPE
+
+    invocations = drf_serializers.ListField(
+        child=_BatchItemSerializer(),
+        allow_empty=False,
+        max_length=settings.GRAVYVALET_BATCH_INVOCATION_MAX_SIZE,
+    )
+    thru_account = ResourceRelatedField(
+        many=False,
+        required=False,
+        queryset=AuthorizedStorageAccount.objects.active(),
+    )
+    thru_addon = ResourceRelatedField(
+        many=False,
+        required=False,
+        queryset=ConfiguredStorageAddon.objects.active(),
+    )
+
+    def create(self, validated_data) -> list[AddonOperationInvocation]:
+        """new invocations (validated, but not saved)"""
+        _thru_addon, _thru_account = _get_thru(validated_data)
+        _user = _get_requesting_user(self.context)
+        return [
+            _new_invocation(
+                _item,
+                thru_addon=_thru_addon,
+                thru_account=_thru_account,
+                by_user=_user,
+            )
+            for _item in validated_data["invocations"]
+        ]
+
+
+###
+# module-private helpers
+
+
+def _get_thru(
+    validated_data,
+) -> tuple[ConfiguredStorageAddon | None, AuthorizedStorageAccount]:
+    _thru_addon = validated_data.get("thru_addon")
+    _thru_account = validated_data.get("thru_account")
+    if _thru_addon is None and _thru_account is None:
+        raise ValidationError("must include either 'thru_addon' or 'thru_account'")
+    if _thru_account is None:
+        _thru_account = _thru_addon.base_account
+    return (_thru_addon, _thru_account)
+
+
+def _get_requesting_user(serializer_context) -> UserReference:
+    _user_uri = serializer_context["request"].session.get("user_reference_uri")
+    _user, _ = UserReference.objects.get_or_create(user_uri=_user_uri)
+    return _user
+
+
+def _new_invocation(
+    item_data,
+    *,
+    thru_addon: ConfiguredStorageAddon | None,
+    thru_account: AuthorizedStorageAccount,
+    by_user: UserReference,
+) -> AddonOperationInvocation:
+    _imp_cls = thru_account.imp_cls
+    _operation = _imp_cls.get_operation_declaration(item_data["operation_name"])
+    _invocation = AddonOperationInvocation(
+        operation=AddonOperationModel(_imp_cls, _operation),
+        operation_kwargs=item_data["operation_kwargs"],
+        thru_addon=thru_addon,
+        thru_account=thru_account,
+        by_user=by_user,
+    )
+    # validate now -- it may never be saved (see AddonOperationDeclaration.persistence)
+    _invocation.full_clean(
+        exclude=["created", "modified"],  # (set when saved)
+        validate_unique=False,  # (fresh uuid)
+    )
+    return _invocation
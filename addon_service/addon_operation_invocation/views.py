@@ -1,3 +1,10 @@
+from http import HTTPStatus
+
+from django.db import transaction
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
 from addon_service.common.permissions import (
     IsAuthenticated,
     SessionUserIsOwner,
@@ -8,24 +15,51 @@ from addon_service.common.viewsets import RetrieveWriteViewSet
 from addon_service.tasks.invocation import (
     perform_invocation__blocking,
     perform_invocation__celery,
+    perform_invocations__blocking,
+    save_failed_invocation__blocking,
 )
 from addon_toolkit import AddonOperationType
 
 from .models import AddonOperationInvocation
-from .serializers import AddonOperationInvocationSerializer
+from .serializers import (
+    AddonOperationInvocationBatchSerializer,
+    AddonOperationInvocationSerializer,
+)
 
 
 class AddonOperationInvocationViewSet(RetrieveWriteViewSet):
     queryset = AddonOperationInvocation.objects.all()
     serializer_class = AddonOperationInvocationSerializer
 
+    @transaction.non_atomic_requests
+    def dispatch(self, request, *args, **kwargs):
+        # one transaction per request (as with ATOMIC_REQUESTS), except that a failed
+        # invocation is saved (per its operation's `persistence`) after rolling back
+        self._failed_invocation = None
+        try:
+            with transaction.atomic():
+                _response = super().dispatch(request, *args, **kwargs)
+                # (an error turned into a response may or may not roll back)
+                _rolled_back = transaction.get_rollback()
+        except Exception:
+            self._save_failed_invocation()
+            raise
+        if _rolled_back:
+            self._save_failed_invocation()
+        return _response
+
+    def _save_failed_invocation(self) -> None:
+        # (only once its transaction rolled back -- otherwise it's saved already)
+        if self._failed_invocation is not None:
+            save_failed_invocation__blocking(self._failed_invocation)
+
     def get_permissions(self):
         match self.action:
             case "retrieve" | "retrieve_related":
                 return [IsAuthenticated(), SessionUserMayAccessInvocation()]
             case "partial_update" | "update" | "destroy":
                 return [IsAuthenticated(), SessionUserIsOwner()]
-            case "create":
+            case "create" | "batch":
                 return [IsAuthenticated(), SessionUserMayPerformInvocation()]
             case None:
                 return super().get_permissions()
@@ -35,14 +69,52 @@ class AddonOperationInvocationViewSet(RetrieveWriteViewSet):
                 )
 
     def perform_create(self, serializer):
-        super().perform_create(serializer)
-        # after creating the AddonOperationInvocation, look into invoking it
-        _invocation = serializer.instance
+        _invocation = serializer.save()  # (new, not yet saved)
+        self.check_object_permissions(self.request, _invocation)
         _operation_type = _invocation.operation.operation_type
         match _operation_type:
             case AddonOperationType.REDIRECT | AddonOperationType.IMMEDIATE:
-                perform_invocation__blocking(_invocation)
+                # saved (or not, per the operation's `persistence`) when performed
+                try:
+                    perform_invocation__blocking(_invocation)
+                except Exception:
+                    self._failed_invocation = _invocation
+                    raise
             case AddonOperationType.EVENTUAL:
-                perform_invocation__celery.delay(_invocation.pk)
+                _invocation.save()
+                perform_invocation__celery.delay(
+                    _invocation.pk, _invocation.created.isoformat()
+                )
             case _:
                 raise ValueError(f"unknown operation type: {_operation_type}")
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """perform many immediate operations thru the same account (or addon) at once
+
+        expects `invocations` (a list of objects with `operation_name` and
+        `operation_kwargs`) and either `thru_account` or `thru_addon`; responds
+        with all the resulting invocations (failed or not)
+        """
+        _batch_serializer = AddonOperationInvocationBatchSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        _batch_serializer.is_valid(raise_exception=True)
+        _invocations = _batch_serializer.save()
+        _by_capability = {
+            _invocation.operation.capability: _invocation
+            for _invocation in _invocations
+        }
+        for _invocation in _by_capability.values():  # (one check per capability)
+            self.check_object_permissions(request, _invocation)
+        for _invocation in _invocations:
+            if _invocation.operation.operation_type not in (
+                AddonOperationType.REDIRECT,
+                AddonOperationType.IMMEDIATE,
+            ):
+                raise ValidationError(
+                    f"cannot batch {_invocation.operation_name} (only immediate operations)"
+                )
+        perform_invocations__blocking(_invocations)
+        _serializer = self.get_serializer(_invocations, many=True)
+        return Response(_serializer.data, status=HTTPStatus.CREATED)
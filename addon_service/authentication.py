@@ -1,17 +1,25 @@
+import functools
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import authentication as drf_authentication
 from rest_framework.request import Request as DrfRequest
 
 from addon_service.common import osf
+from addon_service.common.local_cache import TtlLruCache
 from addon_service.models import UserReference
 
 
+__all__ = ("GVCombinedAuthentication",)
+
+
 class GVCombinedAuthentication(drf_authentication.BaseAuthentication):
     """Authentication supporting session, basic, and token methods."""
 
     def authenticate(self, request: DrfRequest):
         _user_uri = osf.get_osf_user_uri(request)
         if _user_uri:
-            UserReference.objects.get_or_create(user_uri=_user_uri)
+            _ensure_user_reference(_user_uri)
             request.session["user_reference_uri"] = _user_uri
             return (True, None)
         return None  # unauthenticated
@@ -22,3 +30,26 @@ class GVCombinedAuthentication(drf_authentication.BaseAuthentication):
         see https://www.rfc-editor.org/rfc/rfc9110#name-www-authenticate
         """
         return True  # TODO?
+
+
+###
+# module-private helpers
+
+
+# (never invalidated across processes -- see OSF_USER_CACHE_TTL_SECONDS)
+@functools.cache  # one cache per process
+def _user_reference_pk_cache() -> TtlLruCache[str, str]:
+    return TtlLruCache(
+        maxsize=settings.OSF_USER_CACHE_SIZE,
+        ttl_seconds=settings.OSF_USER_CACHE_TTL_SECONDS,
+    )
+
+
+def _ensure_user_reference(user_uri: str) -> None:
+    _cache = _user_reference_pk_cache()
+    if _cache.get(user_uri, None) is None:
+        _user_reference, _ = UserReference.objects.get_or_create(user_uri=user_uri)
+        # remember only once committed (a rolled-back request may not have created it)
+        transaction.on_commit(
+            functools.partial(_cache.set, user_uri, _user_reference.pk)
+        )
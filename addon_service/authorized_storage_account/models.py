@@ -11,14 +11,17 @@ from django.db import (
 from addon_service.addon_operation.models import AddonOperationModel
 from addon_service.common.base_model import AddonsServiceBaseModel
 from addon_service.common.credentials_formats import CredentialsFormats
+from addon_service.common.dibs import dibs
+from addon_service.common.local_cache import SingleFlight
 from addon_service.common.service_types import ServiceTypes
+from addon_service.common.unit_of_work import (
+    load_related,
+    memoized,
+)
 from addon_service.common.validators import validate_addon_capability
 from addon_service.credentials.models import ExternalCredentials
 from addon_service.oauth import utils as oauth_utils
-from addon_service.oauth.models import (
-    OAuth2ClientConfig,
-    OAuth2TokenMetadata,
-)
+from addon_service.oauth.models import OAuth2TokenMetadata
 from addon_toolkit import (
     AddonCapabilities,
     AddonImp,
@@ -26,6 +29,10 @@ from addon_toolkit import (
 from addon_toolkit.interfaces.storage import StorageConfig
 
 
+# token refreshes in flight, by OAuth2TokenMetadata pk
+_OAUTH_TOKEN_REFRESHES: SingleFlight[str, bool] = SingleFlight()
+
+
 class AuthorizedStorageAccountManager(models.Manager):
 
     def active(self):
@@ -94,16 +101,18 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
 
     @property
     def external_service(self):
-        return self.external_storage_service
+        return load_related(self, "external_storage_service")
 
     @property
+    @memoized("external_storage_service_id")
     def credentials_format(self):
         return self.external_service.credentials_format
 
     @property
     def credentials(self):
-        if self._credentials:
-            return self._credentials.decrypted_credentials
+        _credentials = load_related(self, "_credentials")
+        if _credentials:
+            return _credentials.decrypted_credentials
         return None
 
     @credentials.setter
@@ -135,9 +144,10 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
     @property
     def owner_uri(self) -> str:
         """Convenience property to simplify permissions checking."""
-        return self.account_owner.user_uri
+        return load_related(self, "account_owner").user_uri
 
     @property
+    @memoized("int_authorized_capabilities", "external_storage_service_id")
     def authorized_operations(self) -> list[AddonOperationModel]:
         _imp_cls = self.imp_cls
         return [
@@ -148,6 +158,7 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
         ]
 
     @property
+    @memoized("int_authorized_capabilities", "external_storage_service_id")
     def authorized_operation_names(self) -> list[str]:
         return [
             _operation.name
@@ -178,6 +189,7 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
         )
 
     @property
+    @memoized("_api_base_url", "external_storage_service_id")
     def api_base_url(self):
         return self._api_base_url or self.external_service.api_base_url
 
@@ -186,6 +198,7 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
         self._api_base_url = value
 
     @property
+    @memoized("external_storage_service_id")
     def imp_cls(self) -> type[AddonImp]:
         return self.external_service.addon_imp.imp_cls
 
@@ -252,27 +265,42 @@ class AuthorizedStorageAccount(AddonsServiceBaseModel):
     # async functions for use in oauth callback flows
 
     async def refresh_oauth_access_token(self) -> None:
-        _oauth_client_config, _oauth_token_metadata = (
-            await self._load_client_config_and_token_metadata()
+        # one refresh at a time per token (in this process -- see also `dibs` below)
+        await _OAUTH_TOKEN_REFRESHES.run(
+            self.oauth2_token_metadata_id,
+            sync_to_async(self._refresh_oauth_access_token_now__blocking),
         )
-        _fresh_token_result = await oauth_utils.get_refreshed_access_token(
-            token_endpoint_url=_oauth_client_config.token_endpoint_url,
-            refresh_token=_oauth_token_metadata.refresh_token,
-            auth_callback_url=_oauth_client_config.auth_callback_url,
-            client_id=_oauth_client_config.client_id,
-            client_secret=_oauth_client_config.client_secret,
-        )
-        await _oauth_token_metadata.update_with_fresh_token(_fresh_token_result)
         await sync_to_async(self.refresh_from_db)()
 
-    refresh_oauth_access_token__blocking = async_to_sync(refresh_oauth_access_token)
+    def refresh_oauth_access_token__blocking(self) -> bool:
+        """refresh the access token (unless refreshed elsewhere in the meantime)
 
-    @sync_to_async
-    def _load_client_config_and_token_metadata(
-        self,
-    ) -> tuple[OAuth2ClientConfig, OAuth2TokenMetadata]:
-        # wrap db access in `sync_to_async`
-        return (
-            self.external_service.oauth2_client_config,
-            self.oauth2_token_metadata,
+        returns False if skipped because it had already been refreshed
+        """
+        _refreshed = _OAUTH_TOKEN_REFRESHES.run__blocking(
+            self.oauth2_token_metadata_id,
+            self._refresh_oauth_access_token_now__blocking,
         )
+        self.refresh_from_db()
+        return _refreshed
+
+    def _refresh_oauth_access_token_now__blocking(self) -> bool:
+        _token_metadata = self.oauth2_token_metadata
+        _seen_modified = _token_metadata.modified
+        # one refresh at a time per token (across all processes)
+        with dibs(_token_metadata):
+            if (
+                _token_metadata.modified != _seen_modified
+                and not _token_metadata.access_token_expires_soon()
+            ):
+                return False  # already refreshed elsewhere
+            _oauth_client_config = self.external_service.oauth2_client_config
+            _fresh_token_result = async_to_sync(oauth_utils.get_refreshed_access_token)(
+                token_endpoint_url=_oauth_client_config.token_endpoint_url,
+                refresh_token=_token_metadata.refresh_token,
+                auth_callback_url=_oauth_client_config.auth_callback_url,
+                client_id=_oauth_client_config.client_id,
+                client_secret=_oauth_client_config.client_secret,
+            )
+            _token_metadata.update_with_fresh_token__blocking(_fresh_token_result)
+        return True
@@ -26,6 +26,13 @@ from addon_toolkit import AddonCapabilities
 
 RESOURCE_TYPE = get_resource_type_from_model(AuthorizedStorageAccount)
 
+# relations read when serializing an account (for `select_related`)
+SELECT_FOR_SERIALIZING = (
+    "account_owner",
+    "external_storage_service__oauth2_client_config",
+    "oauth2_token_metadata",
+)
+
 
 class AuthorizedStorageAccountSerializer(serializers.HyperlinkedModelSerializer):
     def __init__(self, *args, **kwargs):
@@ -3,14 +3,31 @@ from addon_service.common.permissions import (
     SessionUserIsOwner,
 )
 from addon_service.common.viewsets import RetrieveWriteDeleteViewSet
+from addon_service.configured_storage_addon import (
+    serializers as configured_storage_addon_serializers,
+)
 
 from .models import AuthorizedStorageAccount
-from .serializers import AuthorizedStorageAccountSerializer
+from .serializers import (
+    SELECT_FOR_SERIALIZING,
+    AuthorizedStorageAccountSerializer,
+)
 
 
 class AuthorizedStorageAccountViewSet(RetrieveWriteDeleteViewSet):
     queryset = AuthorizedStorageAccount.objects.all()
     serializer_class = AuthorizedStorageAccountSerializer
+    select_for_includes = {"__all__": SELECT_FOR_SERIALIZING}
+    select_for_related = {
+        "configured_storage_addons": (
+            configured_storage_addon_serializers.SELECT_FOR_SERIALIZING
+        ),
+    }
+    query_budget = {
+        "retrieve": 3,
+        "retrieve_related": 4,
+        "create": 24,
+    }
 
     def get_permissions(self):
         match self.action:
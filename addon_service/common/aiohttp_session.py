@@ -1,41 +1,297 @@
+"""one shared aiohttp client session per process, on its own long-lived event loop
+
+the session (and its connection pool, configured by the HTTP_* settings) lives on
+an event loop in a daemon thread, so connections and tls sessions are reused by
+every outbound request in the process -- including those from the short-lived
+loops made by each `asgiref.sync.async_to_sync` call
+
+callers on any loop use it like an aiohttp session (`async with session.get(...)`);
+each network step (sending, reading the response) runs on the session's loop while
+the caller awaits, and a streamed request body is pulled from the caller's loop
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import dataclasses
+import os
 import threading
-from threading import local
+import typing
 
 import aiohttp
 from asgiref.sync import async_to_sync
+from django.conf import settings
 
 
 __all__ = (
+    "ClientSessionStats",
+    "OutboundClientSession",
+    "OutboundResponse",
+    "client_session_stats",
     "get_singleton_client_session",
     "get_singleton_client_session__blocking",
     "close_singleton_client_session",
     "close_singleton_client_session__blocking",
 )
 
-__SINGLETON_CLIENT_SESSION_STORE: threading.local = local()
 
+_T = typing.TypeVar("_T")
+
+
+@dataclasses.dataclass(frozen=True)
+class ClientSessionStats:
+    open_sessions: int
+    connections_in_use: int
+    idle_connections: int
+
+
+class OutboundClientSession:
+    """an aiohttp client session, usable from any event loop"""
+
+    def __init__(
+        self, session: aiohttp.ClientSession, loop: asyncio.AbstractEventLoop
+    ) -> None:
+        self._session = session
+        self._loop = loop
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
 
-async def get_singleton_client_session() -> aiohttp.ClientSession:
-    if not is_session_valid():
-        __SINGLETON_CLIENT_SESSION_STORE.session = aiohttp.ClientSession(
-            cookie_jar=aiohttp.DummyCookieJar(),  # ignore all cookies
+    @property
+    def connector(self) -> aiohttp.BaseConnector | None:
+        return self._session.connector
+
+    def request(
+        self, method: str, url: str, **kwargs: typing.Any
+    ) -> "_OutboundRequest":
+        return _OutboundRequest(self, method, url, kwargs)
+
+    def get(self, url: str, **kwargs: typing.Any) -> "_OutboundRequest":
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: typing.Any) -> "_OutboundRequest":
+        return self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        await self._run(self._session.close())
+
+    async def _run(self, coro: typing.Awaitable[_T]) -> _T:
+        """await on the session's loop (from whichever loop is running)"""
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_awaited(coro), self._loop)
         )
-    return __SINGLETON_CLIENT_SESSION_STORE.session
 
 
-def is_session_valid() -> bool:
-    return (
-        hasattr(__SINGLETON_CLIENT_SESSION_STORE, "session")
-        and isinstance(__SINGLETON_CLIENT_SESSION_STORE.session, aiohttp.ClientSession)
-        and not __SINGLETON_CLIENT_SESSION_STORE.session.closed
-    )
+class OutboundResponse:
+    """an aiohttp response, readable from any event loop"""
+
+    def __init__(
+        self, outbound: OutboundClientSession, response: aiohttp.ClientResponse
+    ) -> None:
+        self._outbound = outbound
+        self._response = response
+        self.content = _OutboundStreamReader(outbound, response.content)
+
+    @property
+    def status(self) -> int:
+        return self._response.status
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    async def read(self) -> bytes:
+        return await self._outbound._run(self._response.read())
+
+    async def text(self, **kwargs: typing.Any) -> str:
+        return await self._outbound._run(self._response.text(**kwargs))
+
+    async def json(self, **kwargs: typing.Any) -> typing.Any:
+        return await self._outbound._run(self._response.json(**kwargs))
+
+
+async def get_singleton_client_session() -> OutboundClientSession:
+    """get this process's client session (creating it if need be)"""
+    return await asyncio.wrap_future(_outbound_loop().get_session())
 
 
 async def close_singleton_client_session() -> None:
-    if is_session_valid():
-        await __SINGLETON_CLIENT_SESSION_STORE.close()
-        __SINGLETON_CLIENT_SESSION_STORE.session = None
+    """close this process's client session, if any (the next `get` makes another)"""
+    await asyncio.wrap_future(_outbound_loop().close_session())
+
+
+def client_session_stats() -> ClientSessionStats:
+    """connection pool stats for this process's client session"""
+    _session = _outbound_loop().current_session()
+    if _session is None:
+        return ClientSessionStats(
+            open_sessions=0, connections_in_use=0, idle_connections=0
+        )
+    # aiohttp offers no public api for pool stats; peek at the connector
+    _connector = _session.connector
+    return ClientSessionStats(
+        open_sessions=1,
+        connections_in_use=len(getattr(_connector, "_acquired", ())),
+        idle_connections=sum(map(len, getattr(_connector, "_conns", {}).values())),
+    )
 
 
 get_singleton_client_session__blocking = async_to_sync(get_singleton_client_session)
 close_singleton_client_session__blocking = async_to_sync(close_singleton_client_session)
+
+
+###
+# module-private helpers
+
+
+class _OutboundRequest:
+    """async context manager (or awaitable) for an `OutboundResponse`"""
+
+    def __init__(
+        self,
+        outbound: OutboundClientSession,
+        method: str,
+        url: str,
+        kwargs: dict[str, typing.Any],
+    ) -> None:
+        self._outbound = outbound
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._response: aiohttp.ClientResponse | None = None
+
+    async def __aenter__(self) -> OutboundResponse:
+        _kwargs = dict(self._kwargs)
+        _data = _kwargs.get("data")
+        if hasattr(_data, "__aiter__"):
+            _kwargs["data"] = _pulled_from(asyncio.get_running_loop(), _data)
+        self._response = await self._outbound._run(
+            self._outbound._session.request(self._method, self._url, **_kwargs)
+        )
+        return OutboundResponse(self._outbound, self._response)
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._response is not None:
+            await self._outbound._run(_released(self._response))
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+
+class _OutboundStreamReader:
+    def __init__(
+        self, outbound: OutboundClientSession, content: aiohttp.StreamReader
+    ) -> None:
+        self._outbound = outbound
+        self._content = content
+
+    async def read(self, n: int = -1) -> bytes:
+        return await self._outbound._run(self._content.read(n))
+
+    async def iter_chunked(self, n: int) -> typing.AsyncIterator[bytes]:
+        while _chunk := await self.read(n):
+            yield _chunk
+
+
+class _OutboundLoop:
+    """an event loop running forever in a daemon thread, with (at most) one session"""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._session: OutboundClientSession | None = None
+        self._thread = threading.Thread(
+            target=self.loop.run_forever,
+            name=self.__class__.__qualname__,
+            daemon=True,
+        )
+        self._thread.start()
+
+    def get_session(self) -> "concurrent.futures.Future[OutboundClientSession]":
+        return asyncio.run_coroutine_threadsafe(self._get_session(), self.loop)
+
+    def close_session(self) -> "concurrent.futures.Future[None]":
+        return asyncio.run_coroutine_threadsafe(self._close_session(), self.loop)
+
+    def current_session(self) -> OutboundClientSession | None:
+        _session = self._session
+        return None if (_session is None or _session.closed) else _session
+
+    def stop(self) -> None:
+        try:
+            self.close_session().result(timeout=5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+
+    async def _get_session(self) -> OutboundClientSession:
+        if self._session is None or self._session.closed:
+            self._session = OutboundClientSession(_new_client_session(), self.loop)
+        return self._session
+
+    async def _close_session(self) -> None:
+        _session, self._session = self._session, None
+        if _session is not None:
+            await _session._session.close()
+
+
+def _outbound_loop() -> _OutboundLoop:
+    global __OUTBOUND_LOOP, __OUTBOUND_LOOP_PID
+    with __OUTBOUND_LOOP_LOCK:
+        # (a forked child process gets its own -- the parent's thread isn't running there)
+        if __OUTBOUND_LOOP is None or __OUTBOUND_LOOP_PID != os.getpid():
+            __OUTBOUND_LOOP = _OutboundLoop()
+            __OUTBOUND_LOOP_PID = os.getpid()
+            atexit.register(__OUTBOUND_LOOP.stop)
+        return __OUTBOUND_LOOP
+
+
+def _new_client_session() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT_SECONDS,
+            use_dns_cache=(settings.HTTP_DNS_CACHE_TTL_SECONDS > 0),
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL_SECONDS or None,
+        ),
+        cookie_jar=aiohttp.DummyCookieJar(),  # ignore all cookies
+    )
+
+
+async def _awaited(awaitable: typing.Awaitable[_T]) -> _T:
+    return await awaitable
+
+
+async def _released(response: aiohttp.ClientResponse) -> None:
+    # (as on leaving `async with session.request(...)`)
+    response.release()
+    await response.wait_for_close()
+
+
+async def _pulled_from(
+    loop: asyncio.AbstractEventLoop, chunks: typing.AsyncIterable[bytes]
+) -> typing.AsyncIterator[bytes]:
+    """iterate (on the session's loop) over chunks from an iterable on the caller's loop"""
+    _iterator = aiter(chunks)
+    while True:
+        _chunk = await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_next_chunk(_iterator), loop)
+        )
+        if _chunk is None:
+            return
+        yield _chunk
+
+
+async def _next_chunk(iterator: typing.AsyncIterator[bytes]) -> bytes | None:
+    try:
+        return await anext(iterator)
+    except StopAsyncIteration:
+        return None
+
+
+__OUTBOUND_LOOP_LOCK = threading.Lock()
+__OUTBOUND_LOOP: _OutboundLoop | None = None
+__OUTBOUND_LOOP_PID: int | None = None
@@ -5,6 +5,7 @@ from addon_service.common.str_uuid_field import (
     StrUUIDField,
     str_uuid4,
 )
+from addon_service.common.unit_of_work import current_unit_of_work
 
 
 class AddonsServiceBaseModel(models.Model):
@@ -18,6 +19,18 @@ class AddonsServiceBaseModel(models.Model):
         self.modified = timezone.now()
         self.full_clean()
         super().save(*args, **kwargs)
+        _unit = current_unit_of_work()
+        if _unit is not None:
+            _unit.forget(self)
+
+    def refresh_from_db(self, *args, **kwargs):
+        _unit = current_unit_of_work()
+        if _unit is not None:  # (related rows may be just as stale)
+            _unit.forget(self)
+            _unit.forget_related(self)
+        super().refresh_from_db(*args, **kwargs)
+        if _unit is not None:  # (in case it refers to different rows now)
+            _unit.forget_related(self)
 
     def __str__(self):
         return f"<{self.__class__.__qualname__}(pk={self.pk})>"
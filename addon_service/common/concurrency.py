@@ -0,0 +1,360 @@
+"""limits on concurrent requests to external storage services
+
+each `ExternalStorageService` allows at most `max_concurrent_downloads` concurrent
+outbound requests (and, if ACCOUNT_CONCURRENCY_LIMIT is set, each account at most
+that many) -- within a process, by `SlotPool`, and across processes (web and
+celery alike), by `CrossProcessLimit` (postgres advisory locks)
+
+slots are held per outbound request (see `GravyvaletHttpRequestor`) and are
+re-entrant: a request sent while the same context already holds a slot (e.g. from
+within another request's response) takes no other
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import logging
+import random
+import threading
+import time
+import typing
+import weakref
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from addon_service.common.exceptions import ExternalServiceBusy
+
+
+if typing.TYPE_CHECKING:
+    from addon_service.models import AuthorizedStorageAccount
+
+
+__all__ = (
+    "CrossProcessLimit",
+    "SlotPool",
+    "cross_process_slot__blocking",
+    "slot_pools_for_account__blocking",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+class SlotPool:
+    """counting semaphore usable from any thread or event loop, with a bounded wait
+
+    >>> _pool = SlotPool(size=1, name='example')
+    >>> _pool.acquire__blocking(timeout=0)
+    >>> _pool.acquire__blocking(timeout=0)
+    Traceback (most recent call last):
+      ...
+    addon_service.common.exceptions.ExternalServiceBusy: example: no slot free after 0 seconds
+    >>> _pool.release()
+    >>> with _pool.slot__blocking(timeout=0):
+    ...     _pool.in_use
+    1
+    >>> _pool.in_use
+    0
+    """
+
+    def __init__(self, *, size: int, name: str) -> None:
+        self.size = size
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_use = 0
+        # waiters get slots handed directly to them, first come first served
+        self._waiters: collections.deque[concurrent.futures.Future] = (
+            collections.deque()
+        )
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__qualname__}({self.name!r}, in_use={self._in_use}, size={self.size}, waiting={self.waiting})>"
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, *, timeout: float | None) -> None:
+        _waiter = self._acquire_or_wait()
+        if _waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(_waiter), timeout)
+        except BaseException as _e:
+            self._give_up(_waiter)
+            if isinstance(_e, TimeoutError):
+                raise self._busy(timeout) from _e
+            raise
+
+    def acquire__blocking(self, *, timeout: float | None) -> None:
+        _waiter = self._acquire_or_wait()
+        if _waiter is None:
+            return
+        try:
+            _waiter.result(timeout)
+        except concurrent.futures.TimeoutError as _e:
+            if _waiter.cancel():
+                self._give_up(_waiter)
+                raise self._busy(timeout) from _e
+            _waiter.result()  # handed a slot just in time
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                _waiter = self._waiters.popleft()
+                if _waiter.set_running_or_notify_cancel():  # (false if cancelled)
+                    _waiter.set_result(None)  # slot passes to the waiter
+                    return
+            self._in_use -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, *, timeout: float | None):
+        if _holding_slot(self):  # (re-entrant)
+            yield
+            return
+        await self.acquire(timeout=timeout)
+        try:
+            with _slot_held(self):
+                yield
+        finally:
+            self.release()
+
+    @contextlib.contextmanager
+    def slot__blocking(self, *, timeout: float | None):
+        if _holding_slot(self):  # (re-entrant)
+            yield
+            return
+        self.acquire__blocking(timeout=timeout)
+        try:
+            with _slot_held(self):
+                yield
+        finally:
+            self.release()
+
+    def _acquire_or_wait(self) -> concurrent.futures.Future | None:
+        with self._lock:
+            if self._in_use < self.size and not self._waiters:
+                self._in_use += 1
+                return None
+            _waiter: concurrent.futures.Future = concurrent.futures.Future()
+            self._waiters.append(_waiter)
+            return _waiter
+
+    def _give_up(self, waiter: concurrent.futures.Future) -> None:
+        if waiter.cancel():
+            with self._lock:
+                with contextlib.suppress(ValueError):  # (maybe already popped)
+                    self._waiters.remove(waiter)
+        else:  # already handed a slot -- give it back
+            self.release()
+
+    def _busy(self, timeout: float | None) -> ExternalServiceBusy:
+        return ExternalServiceBusy(f"{self.name}: no slot free after {timeout} seconds")
+
+
+@dataclasses.dataclass(frozen=True)
+class CrossProcessLimit:
+    """at most `size` slots, shared by all processes using the same database
+
+    (by session-level postgres advisory locks, on this thread's connection --
+    released if the connection dies)
+    """
+
+    name: str
+    size: int
+
+    @classmethod
+    def for_account__blocking(
+        cls, account: "AuthorizedStorageAccount"
+    ) -> "CrossProcessLimit | None":
+        """the limit on requests to the account's external service, if any"""
+        _size = account.external_service.max_concurrent_downloads
+        if _size <= 0:  # no limit
+            return None
+        return cls(name=f"service:{account.external_storage_service_id}", size=_size)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, *, timeout: float | None = None):
+        if _holding_slot(self):  # (re-entrant)
+            yield
+            return
+        if timeout is None:
+            timeout = settings.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS
+        _pauses = _backoff_pauses(timeout)
+        # (waits here, not in the sync thread, which other coroutines may need)
+        while (_slot := await sync_to_async(self._try_take)()) is None:
+            _pause = next(_pauses, None)
+            if _pause is None:
+                raise self._busy(timeout)
+            await asyncio.sleep(_pause)
+        try:
+            with _slot_held(self):
+                yield
+        finally:
+            await sync_to_async(self._give_back)(_slot)
+
+    @contextlib.contextmanager
+    def slot__blocking(self, *, timeout: float | None = None):
+        if _holding_slot(self):  # (re-entrant)
+            yield
+            return
+        if timeout is None:
+            timeout = settings.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS
+        _pauses = _backoff_pauses(timeout)
+        while (_slot := self._try_take()) is None:
+            _pause = next(_pauses, None)
+            if _pause is None:
+                raise self._busy(timeout)
+            time.sleep(_pause)
+        try:
+            with _slot_held(self):
+                yield
+        finally:
+            self._give_back(_slot)
+
+    def _try_take(self) -> int | None:
+        _lock_class = _advisory_lock_class(self.name)
+        _held = _advisory_slots_held()
+        # start at a random slot, to spread contention
+        _first = random.randrange(self.size)
+        with connection.cursor() as _cursor:
+            for _offset in range(self.size):
+                _slot = (_first + _offset) % self.size
+                if (_lock_class, _slot) in _held:
+                    continue  # (taken on this connection -- would be granted again)
+                _cursor.execute(
+                    "SELECT pg_try_advisory_lock(%s, %s)", [_lock_class, _slot]
+                )
+                if _cursor.fetchone()[0]:
+                    _held.add((_lock_class, _slot))
+                    return _slot
+        _logger.debug("no advisory slot free (%s)", self.name)
+        return None
+
+    def _give_back(self, slot: int) -> None:
+        _lock_class = _advisory_lock_class(self.name)
+        _advisory_slots_held().discard((_lock_class, slot))
+        with connection.cursor() as _cursor:
+            _cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [_lock_class, slot])
+
+    def _busy(self, timeout: float) -> ExternalServiceBusy:
+        return ExternalServiceBusy(f"{self.name}: no slot free after {timeout} seconds")
+
+
+def slot_pools_for_account__blocking(
+    account: "AuthorizedStorageAccount",
+) -> tuple[SlotPool, ...]:
+    """get this process's slot pools limiting requests thru the given account
+
+    (blocking because it may query the account's external service)
+    """
+    _pools = []
+    if settings.ACCOUNT_CONCURRENCY_LIMIT > 0:
+        _pools.append(
+            _slot_pool(
+                f"account:{account.pk}",
+                settings.ACCOUNT_CONCURRENCY_LIMIT,
+            )
+        )
+    _service_limit = account.external_service.max_concurrent_downloads
+    if _service_limit > 0:
+        _pools.append(
+            _slot_pool(f"service:{account.external_storage_service_id}", _service_limit)
+        )
+    return tuple(_pools)
+
+
+@contextlib.contextmanager
+def cross_process_slot__blocking(
+    account: "AuthorizedStorageAccount",
+    *,
+    timeout: float | None = None,
+):
+    """hold one of the external service's `max_concurrent_downloads` slots,
+    shared by all processes using the same database
+
+    raises ExternalServiceBusy if no slot is free within `timeout` seconds
+    (default: settings.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS)
+    """
+    _limit = CrossProcessLimit.for_account__blocking(account)
+    if _limit is None:
+        yield
+        return
+    with _limit.slot__blocking(timeout=timeout):
+        yield
+
+
+###
+# module-private helpers
+
+# held weakly: a pool no request is using (or waiting on) has no slots to keep track of
+_SLOT_POOLS: "weakref.WeakValueDictionary[str, SlotPool]" = (
+    weakref.WeakValueDictionary()
+)
+_SLOT_POOLS_LOCK = threading.Lock()
+
+
+def _slot_pool(name: str, size: int) -> SlotPool:
+    with _SLOT_POOLS_LOCK:
+        _pool = _SLOT_POOLS.get(name)
+        if _pool is None or _pool.size != size:
+            # (a changed limit takes effect for new requests; the superseded pool
+            # lives on only while requests already holding it do)
+            _pool = _SLOT_POOLS[name] = SlotPool(size=size, name=name)
+        return _pool
+
+
+@functools.cache
+def _advisory_lock_class(name: str) -> int:
+    # postgres advisory lock keys are signed 32-bit ints
+    _unsigned = zlib.crc32(f"gravyvalet:{name}".encode())
+    return (_unsigned ^ 0x8000_0000) - 0x8000_0000
+
+
+def _advisory_slots_held() -> set[tuple[int, int]]:
+    # session-level advisory locks are re-entrant per connection, so keep track of
+    # those taken on this connection (lest concurrent requests share a slot)
+    try:
+        return connection._gravyvalet_advisory_slots
+    except AttributeError:
+        _held = connection._gravyvalet_advisory_slots = set()
+        return _held
+
+
+def _backoff_pauses(timeout: float) -> typing.Iterator[float]:
+    # pauses between attempts, until `timeout` seconds have passed
+    _deadline = time.monotonic() + timeout
+    _pause = 0.05
+    while (_remaining := _deadline - time.monotonic()) > 0:
+        yield min(_pause, _remaining)
+        _pause = min(_pause * 2, 1.0)
+
+
+# slots (or limits) held in the current context, for re-entrance
+_HELD_SLOTS: contextvars.ContextVar[frozenset[typing.Hashable]] = (
+    contextvars.ContextVar("held_slots", default=frozenset())
+)
+
+
+def _holding_slot(limit: typing.Hashable) -> bool:
+    return limit in _HELD_SLOTS.get()
+
+
+@contextlib.contextmanager
+def _slot_held(limit: typing.Hashable):
+    _token = _HELD_SLOTS.set(_HELD_SLOTS.get() | {limit})
+    try:
+        yield
+    finally:
+        _HELD_SLOTS.reset(_token)
@@ -20,10 +20,14 @@ def dibs(model_instance, *, refresh=True):
     "dibs" (noun): The right to use or enjoy something exclusively or before anyone else.
     https://en.wiktionary.org/wiki/dibs
     """
+    _lookup = {"pk": model_instance.pk}
+    _partition_field = getattr(model_instance, "PARTITION_FIELD", None)
+    if _partition_field is not None:  # (so only one partition is locked, or looked in)
+        _lookup[_partition_field] = getattr(model_instance, _partition_field)
     with transaction.atomic():
         _locked_obj = (
             model_instance.__class__.objects.select_for_update()
-            .filter(pk=model_instance.pk)
+            .filter(**_lookup)
             .first()
         )
         if _locked_obj is None:
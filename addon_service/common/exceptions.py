@@ -4,3 +4,19 @@ class AddonServiceException(Exception):
 
 class ExpiredAccessToken(AddonServiceException):
     pass
+
+
+class ExternalServiceBusy(AddonServiceException):
+    pass  # too many concurrent requests to an external service
+
+
+class OsfUnavailable(AddonServiceException):
+    pass  # osf answered with a server error (or "too many requests") -- try again later
+
+
+class UploadTooLarge(AddonServiceException):
+    pass  # a request body is larger than the external service allows
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass  # a view made more database queries than expected (see QueryBudgetMixin)
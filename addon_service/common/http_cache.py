@@ -0,0 +1,181 @@
+"""conditional-request cache for GET responses from external services (opt-in)
+
+with HTTP_CACHE_SIZE > 0, `GravyvaletHttpRequestor` remembers validators
+(ETag, Last-Modified) and parsed json bodies of successful GET responses, sends
+conditional requests (If-None-Match, If-Modified-Since) and answers "304 Not
+Modified" from the cache
+
+entries are keyed by account and credentials (never shared across either), url,
+query and request headers (which may ask for a different representation, like
+`Accept` or `Range`); any other request thru an account (PUT, POST, DELETE...) forgets all
+that account's entries
+
+like other caches in `local_cache`, in local memory only
+"""
+
+import copy
+import dataclasses
+import functools
+import threading
+import typing
+
+from django.conf import settings
+
+from addon_service.common.local_cache import (
+    CacheStats,
+    TtlLruCache,
+)
+
+
+__all__ = (
+    "CachedResponse",
+    "HttpCacheKey",
+    "HttpCacheStats",
+    "clear",
+    "enabled",
+    "forget_account",
+    "http_cache_stats",
+    "lookup",
+    "record_not_modified",
+    "store",
+)
+
+
+class HttpCacheKey(typing.NamedTuple):
+    account_pk: str
+    credentials_pk: str | None
+    url: str
+    query: tuple[tuple[str, str], ...]
+    headers: tuple[tuple[str, str], ...]  # (non-credential; names lowercased, sorted)
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedResponse:
+    etag: str | None
+    last_modified: str | None
+    headers: tuple[tuple[str, str], ...]
+    json_content: typing.Any
+
+    def conditional_headers(self) -> list[tuple[str, str]]:
+        _headers = []
+        if self.etag is not None:
+            _headers.append(("If-None-Match", self.etag))
+        if self.last_modified is not None:
+            _headers.append(("If-Modified-Since", self.last_modified))
+        return _headers
+
+    def copy_json_content(self) -> typing.Any:
+        # (each caller gets its own copy, free to mutate)
+        return copy.deepcopy(self.json_content)
+
+
+@dataclasses.dataclass(frozen=True)
+class HttpCacheStats:
+    conditional_requests: int  # sent with validators from the cache
+    not_modified: int  # ...and answered from the cache
+    cache: CacheStats
+
+    @property
+    def hit_ratio(self) -> float:
+        return (
+            (self.not_modified / self.conditional_requests)
+            if self.conditional_requests
+            else 0.0
+        )
+
+
+def enabled() -> bool:
+    return _http_cache().enabled
+
+
+def lookup(key: HttpCacheKey) -> CachedResponse | None:
+    """get validators (and body) to send a conditional request"""
+    _cached = _http_cache().get(key, None)
+    if _cached is not None:
+        _counters().count("conditional_requests")
+    return _cached
+
+
+def record_not_modified() -> None:
+    _counters().count("not_modified")
+
+
+def store(
+    key: HttpCacheKey,
+    *,
+    headers: typing.Iterable[tuple[str, str]],
+    json_content: typing.Any,
+    body_size: int,
+) -> bool:
+    """remember a successful response, if it has validators and may be cached"""
+    _headers = tuple(headers)
+    _lower = {_name.lower(): _value for _name, _value in _headers}
+    _etag = _lower.get("etag")
+    _last_modified = _lower.get("last-modified")
+    if (
+        (_etag is None and _last_modified is None)
+        or "no-store" in _lower.get("cache-control", "")
+        or body_size > settings.HTTP_CACHE_MAX_BODY_BYTES
+    ):
+        return False
+    _http_cache().set(
+        key,
+        CachedResponse(
+            etag=_etag,
+            last_modified=_last_modified,
+            headers=_headers,
+            json_content=json_content,
+        ),
+    )
+    return True
+
+
+def forget_account(account_pk: str) -> int:
+    return _http_cache().invalidate_where(lambda _key, _: _key.account_pk == account_pk)
+
+
+def http_cache_stats() -> HttpCacheStats:
+    return HttpCacheStats(
+        conditional_requests=_counters().get("conditional_requests"),
+        not_modified=_counters().get("not_modified"),
+        cache=_http_cache().stats(),
+    )
+
+
+def clear() -> None:
+    _http_cache().clear()
+    _counters().clear()
+
+
+###
+# module-private helpers
+
+
+@functools.cache  # one cache per process
+def _http_cache() -> TtlLruCache[HttpCacheKey, CachedResponse]:
+    return TtlLruCache(
+        maxsize=settings.HTTP_CACHE_SIZE,
+        ttl_seconds=settings.HTTP_CACHE_TTL_SECONDS,
+    )
+
+
+class _Counters:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def get(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+@functools.cache
+def _counters() -> _Counters:
+    return _Counters()
@@ -0,0 +1,453 @@
+"""in-process caching helpers (thread-safe, usable from any event loop)
+
+caches here live in local memory only -- each process (and each test) has its own
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import dataclasses
+import threading
+import time
+import typing
+
+
+__all__ = (
+    "CacheStats",
+    "KeyedPool",
+    "PoolStats",
+    "SingleFlight",
+    "TtlLruCache",
+)
+
+
+_Key = typing.TypeVar("_Key", bound=typing.Hashable)
+_Value = typing.TypeVar("_Value")
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        _lookups = self.hits + self.misses
+        return (self.hits / _lookups) if _lookups else 0.0
+
+
+class SingleFlight(typing.Generic[_Key, _Value]):
+    """coalesce concurrent calls with the same key into one call
+
+    while a call for a given key is in flight, other callers with the same key
+    wait for (and share) its result instead of making their own call.
+
+    uses `concurrent.futures.Future` so waiters may be in other threads or on
+    other event loops (as with `asgiref.sync.async_to_sync`)
+
+    >>> _flight = SingleFlight()
+    >>> _flight.run__blocking('a', lambda: 7)
+    7
+    >>> asyncio.run(_flight.run('a', _seven_soon))
+    7
+    >>> _flight.in_flight_count()
+    0
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[_Key, concurrent.futures.Future] = {}
+
+    def in_flight_count(self) -> int:
+        return len(self._in_flight)
+
+    async def run(
+        self,
+        key: _Key,
+        load: typing.Callable[[], typing.Awaitable[_Value]],
+    ) -> _Value:
+        _future, _is_leader = self._join(key)
+        if not _is_leader:
+            return await asyncio.wrap_future(_future)
+        try:
+            _value = await load()
+        except BaseException as _e:
+            self._finish(key, _future, exception=_e)
+            raise
+        self._finish(key, _future, value=_value)
+        return _value
+
+    def run__blocking(self, key: _Key, load: typing.Callable[[], _Value]) -> _Value:
+        _future, _is_leader = self._join(key)
+        if not _is_leader:
+            return _future.result()
+        try:
+            _value = load()
+        except BaseException as _e:
+            self._finish(key, _future, exception=_e)
+            raise
+        self._finish(key, _future, value=_value)
+        return _value
+
+    def _join(self, key: _Key) -> tuple[concurrent.futures.Future, bool]:
+        with self._lock:
+            try:
+                return (self._in_flight[key], False)
+            except KeyError:
+                _future = self._in_flight[key] = concurrent.futures.Future()
+                return (_future, True)
+
+    def _finish(
+        self,
+        key: _Key,
+        future: concurrent.futures.Future,
+        *,
+        value: typing.Any = None,
+        exception: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            del self._in_flight[key]
+        if exception is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exception)
+
+
+class TtlLruCache(typing.Generic[_Key, _Value]):
+    """size-bounded, time-limited cache with least-recently-used eviction
+
+    >>> _cache = TtlLruCache(maxsize=2, ttl_seconds=60)
+    >>> _cache.set('a', 1)
+    >>> _cache.set('b', 2)
+    >>> _cache.get('a')
+    1
+    >>> _cache.set('c', 3)  # evicts 'b', least recently used
+    >>> _cache.get('b', 'nope')
+    'nope'
+    >>> _cache.get_or_load__blocking('b', lambda: 22)
+    22
+    >>> asyncio.run(_cache.get_or_load('d', _seven_soon))
+    7
+    >>> sorted(_cache.keys())
+    ['b', 'd']
+    >>> _cache.stats()
+    CacheStats(hits=1, misses=3, size=2, maxsize=2)
+
+    a `maxsize` (or `ttl_seconds`) of zero disables caching (but not single-flight loading)
+    >>> _nocache = TtlLruCache(maxsize=0, ttl_seconds=60)
+    >>> _nocache.set('a', 1)
+    >>> _nocache.get('a', None) is None
+    True
+
+    a `ttl_seconds` of None means entries expire only by eviction
+
+    repr shows only stats, never cached values:
+    >>> _cache
+    <TtlLruCache(hits=1, misses=3, size=2, maxsize=2)>
+    """
+
+    _NOTHING: typing.ClassVar = object()
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        ttl_seconds: float | None,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # ordered least- to most-recently used; values are (expires_at, value)
+        self._entries: collections.OrderedDict[_Key, tuple[float, _Value]] = (
+            collections.OrderedDict()
+        )
+        self._single_flight: SingleFlight[_Key, _Value] = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self) -> str:
+        _stats = self.stats()
+        return f"<{self.__class__.__qualname__}(hits={_stats.hits}, misses={_stats.misses}, size={_stats.size}, maxsize={_stats.maxsize})>"
+
+    def __getstate__(self):
+        raise TypeError(f"{self.__class__.__qualname__} is for local memory only")
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and (self.ttl_seconds is None or self.ttl_seconds > 0)
+
+    def get(self, key: _Key, default: typing.Any = _NOTHING) -> _Value:
+        _value = self._lookup(key)
+        if _value is self._NOTHING:
+            if default is self._NOTHING:
+                raise KeyError(key)
+            return default
+        return _value
+
+    def set(self, key: _Key, value: _Value) -> None:
+        if not self.enabled:
+            return
+        _expires_at = (
+            float("inf")
+            if self.ttl_seconds is None
+            else self._clock() + self.ttl_seconds
+        )
+        with self._lock:
+            self._entries[key] = (_expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: _Key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: typing.Callable[[_Key, _Value], bool]) -> int:
+        with self._lock:
+            _doomed = [
+                _key
+                for _key, (_, _value) in self._entries.items()
+                if predicate(_key, _value)
+            ]
+            for _key in _doomed:
+                del self._entries[_key]
+        return len(_doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def keys(self) -> list[_Key]:
+        _now = self._clock()
+        with self._lock:
+            return [
+                _key
+                for _key, (_expires_at, _) in self._entries.items()
+                if _expires_at > _now
+            ]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    async def get_or_load(
+        self,
+        key: _Key,
+        load: typing.Callable[[], typing.Awaitable[_Value]],
+    ) -> _Value:
+        """get the cached value for `key`, or await `load()` (once, even if called concurrently)"""
+        _value = self._lookup(key)
+        if _value is not self._NOTHING:
+            return _value
+
+        async def _load_and_set():
+            _loaded = await load()
+            self.set(key, _loaded)
+            return _loaded
+
+        return await self._single_flight.run(key, _load_and_set)
+
+    def get_or_load__blocking(
+        self,
+        key: _Key,
+        load: typing.Callable[[], _Value],
+    ) -> _Value:
+        """get the cached value for `key`, or call `load()` (once, even if called concurrently)"""
+        _value = self._lookup(key)
+        if _value is not self._NOTHING:
+            return _value
+
+        def _load_and_set():
+            _loaded = load()
+            self.set(key, _loaded)
+            return _loaded
+
+        return self._single_flight.run__blocking(key, _load_and_set)
+
+    def _lookup(self, key: _Key) -> typing.Any:
+        with self._lock:
+            try:
+                _expires_at, _value = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return self._NOTHING
+            if _expires_at <= self._clock():
+                del self._entries[key]
+                self._misses += 1
+                return self._NOTHING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return _value
+
+
+@dataclasses.dataclass(frozen=True)
+class PoolStats:
+    created: int
+    reused: int
+    idle: int
+    max_idle: int
+
+
+class KeyedPool(typing.Generic[_Key, _Value]):
+    """idle objects kept for reuse, by key -- each in use by only one caller at a time
+
+    >>> _pool = KeyedPool(max_idle=2, idle_seconds=60)
+    >>> with _pool.checkout__blocking('a', list) as _a:
+    ...     _a.append(1)
+    >>> with _pool.checkout__blocking('a', list) as _a_again:
+    ...     _a_again
+    [1]
+
+    objects in use are not shared -- a concurrent checkout gets another
+    >>> with _pool.checkout__blocking('a', list) as _a1:
+    ...     with _pool.checkout__blocking('a', list) as _a2:
+    ...         (_a1, _a2)
+    ([1], [])
+    >>> asyncio.run(_checkout_length(_pool, 'b'))
+    0
+    >>> _pool.stats()  # (least recently returned evicted, beyond `max_idle`)
+    PoolStats(created=3, reused=2, idle=2, max_idle=2)
+
+    objects are dropped (not returned to the pool) when their checkout raises,
+    or when left idle longer than `idle_seconds`; a `max_idle` (or `idle_seconds`)
+    of zero disables pooling -- each checkout creates anew
+    """
+
+    _NOTHING: typing.ClassVar = object()
+
+    def __init__(
+        self,
+        *,
+        max_idle: int,
+        idle_seconds: float,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # per key, ordered least- to most-recently returned; values are (returned_at, obj)
+        self._idle: dict[_Key, list[tuple[float, _Value]]] = {}
+        self._idle_count = 0
+        self._created = 0
+        self._reused = 0
+
+    def __repr__(self) -> str:
+        _stats = self.stats()
+        return f"<{self.__class__.__qualname__}(created={_stats.created}, reused={_stats.reused}, idle={_stats.idle}, max_idle={_stats.max_idle})>"
+
+    def __getstate__(self):
+        raise TypeError(f"{self.__class__.__qualname__} is for local memory only")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_idle > 0 and self.idle_seconds > 0
+
+    @contextlib.contextmanager
+    def checkout__blocking(
+        self, key: _Key, create: typing.Callable[[], _Value]
+    ) -> typing.Iterator[_Value]:
+        _obj = self._take(key)
+        if _obj is self._NOTHING:
+            _obj = create()
+            self._count_created()
+        yield _obj  # (if this raises, `_obj` is dropped)
+        self._give_back(key, _obj)
+
+    @contextlib.asynccontextmanager
+    async def checkout(
+        self, key: _Key, create: typing.Callable[[], typing.Awaitable[_Value]]
+    ) -> typing.AsyncIterator[_Value]:
+        _obj = self._take(key)
+        if _obj is self._NOTHING:
+            _obj = await create()
+            self._count_created()
+        yield _obj  # (if this raises, `_obj` is dropped)
+        self._give_back(key, _obj)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._idle.clear()
+            self._idle_count = 0
+            self._created = 0
+            self._reused = 0
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                created=self._created,
+                reused=self._reused,
+                idle=self._idle_count,
+                max_idle=self.max_idle,
+            )
+
+    def _take(self, key: _Key) -> typing.Any:
+        with self._lock:
+            self._drop_expired()
+            _entries = self._idle.get(key)
+            if not _entries:
+                return self._NOTHING
+            _, _obj = _entries.pop()  # (most recently returned -- the warmest)
+            if not _entries:
+                del self._idle[key]
+            self._idle_count -= 1
+            self._reused += 1
+            return _obj
+
+    def _give_back(self, key: _Key, obj: _Value) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((self._clock(), obj))
+            self._idle_count += 1
+            self._drop_expired()
+            while self._idle_count > self.max_idle:
+                # evict the least recently returned, of any key
+                _oldest_key = min(self._idle, key=lambda _k: self._idle[_k][0][0])
+                self._drop_first(_oldest_key)
+
+    def _count_created(self) -> None:
+        with self._lock:
+            self._created += 1
+
+    def _drop_expired(self) -> None:
+        # (call with lock held)
+        _too_old = self._clock() - self.idle_seconds
+        for _key in list(self._idle):
+            while _key in self._idle and self._idle[_key][0][0] <= _too_old:
+                self._drop_first(_key)
+
+    def _drop_first(self, key: _Key) -> None:
+        # (call with lock held)
+        _entries = self._idle[key]
+        del _entries[0]
+        if not _entries:
+            del self._idle[key]
+        self._idle_count -= 1
+
+
+async def _checkout_length(pool: KeyedPool, key: typing.Hashable) -> int:
+    # for doctests
+    async def _create():
+        return []
+
+    async with pool.checkout(key, _create) as _obj:
+        return len(_obj)
+
+
+async def _seven_soon() -> int:
+    # for doctests
+    await asyncio.sleep(0)
+    return 7
@@ -1,20 +1,43 @@
 import contextlib
+import copy
 import dataclasses
+import datetime
+import functools
+import json
 import logging
+import re
 import typing
 import weakref
-from http import HTTPStatus
+from http import (
+    HTTPMethod,
+    HTTPStatus,
+)
 from urllib.parse import (
     urljoin,
     urlsplit,
 )
 
-import aiohttp
 from asgiref.sync import sync_to_async
+from django.conf import settings
 
 from addon_service import models as db
-from addon_service.common import exceptions
+from addon_service.common import (
+    exceptions,
+    http_cache,
+)
+from addon_service.common.aiohttp_session import (
+    OutboundResponse,
+    get_singleton_client_session,
+)
+from addon_service.common.concurrency import (
+    CrossProcessLimit,
+    SlotPool,
+    slot_pools_for_account__blocking,
+)
+from addon_service.oauth import utils as oauth_utils
 from addon_toolkit.constrained_network import (
+    DEFAULT_CHUNK_SIZE,
+    HttpRequestContent,
     HttpRequestInfo,
     HttpRequestor,
     HttpResponseInfo,
@@ -31,8 +54,12 @@ _logger = logging.getLogger(__name__)
 class _AiohttpResponseInfo(HttpResponseInfo):
     """an imp-friendly face for an aiohttp response (without exposing aiohttp to imps)"""
 
-    def __init__(self, response: aiohttp.ClientResponse):
-        _PrivateResponse(response).assign(self)
+    def __init__(
+        self,
+        response: OutboundResponse,
+        cache_key: http_cache.HttpCacheKey | None = None,
+    ):
+        _PrivateResponse(response, cache_key).assign(self)
 
     @property
     def http_status(self) -> HTTPStatus:
@@ -46,8 +73,52 @@ class _AiohttpResponseInfo(HttpResponseInfo):
         return Multidict(_response.headers.items())
 
     async def json_content(self) -> typing.Any:
+        _private = _PrivateResponse.get(self)
+        _response = _private.aiohttp_response
+        if _private.cache_key is None or _response.status != HTTPStatus.OK:
+            return await _response.json()
+        _body = await _response.read()  # (json() reuses the body read here)
+        _json = await _response.json()
+        http_cache.store(
+            _private.cache_key,
+            headers=_response.headers.items(),
+            json_content=_json,
+            body_size=len(_body),
+        )
+        return copy.deepcopy(_json)  # (the cached copy stays unchanged)
+
+    async def iter_content(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.AsyncIterator[bytes]:
         _response = _PrivateResponse.get(self).aiohttp_response
-        return await _response.json()
+        async for _chunk in _response.content.iter_chunked(chunk_size):
+            yield _chunk
+
+
+class _CachedResponseInfo(HttpResponseInfo):
+    """a response answered from `http_cache` (after "304 Not Modified")"""
+
+    def __init__(self, cached: http_cache.CachedResponse):
+        self._cached = cached
+
+    @property
+    def http_status(self) -> HTTPStatus:
+        return HTTPStatus.OK
+
+    @property
+    def headers(self) -> Multidict:
+        return Multidict(self._cached.headers)
+
+    async def json_content(self) -> typing.Any:
+        return self._cached.copy_json_content()
+
+    async def iter_content(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.AsyncIterator[bytes]:
+        _body = json.dumps(self._cached.json_content).encode()
+        for _start in range(0, len(_body), chunk_size):
+            _end = _start + chunk_size
+            yield _body[_start:_end]
 
 
 class GravyvaletHttpRequestor(HttpRequestor):
@@ -57,40 +128,80 @@ class GravyvaletHttpRequestor(HttpRequestor):
     def __init__(
         self,
         *,
-        client_session: aiohttp.ClientSession,
         prefix_url: str,
         account: db.AuthorizedStorageAccount,
+        max_upload_mb: int | None = None,
     ):
-        _PrivateNetworkInfo(client_session, prefix_url, account).assign(self)
+        _PrivateNetworkInfo(prefix_url, account, max_upload_mb).assign(self)
+
+    def preload__blocking(self) -> None:
+        """load credentials and limits now, while in sync code, to avoid hopping threads at send time"""
+        _private = _PrivateNetworkInfo.get(self)
+        _private.get_headers__blocking()
+        _private.get_slot_pools__blocking()
+
+    async def preload(self) -> None:
+        """load credentials and limits now (for use from async code)"""
+        _private = _PrivateNetworkInfo.get(self)
+        await _private.get_headers()
+        await _private.get_slot_pools()
 
     # abstract method from HttpRequestor:
     @contextlib.asynccontextmanager
     async def do_send(self, request: HttpRequestInfo):
+        _private = _PrivateNetworkInfo.get(self)
+        if await _private.access_token_expires_soon():
+            await _private.refresh_access_token()
+        _content = _LimitedContent(request.content, _private.max_upload_bytes())
         try:
-            async with self._try_send(request) as _response:
+            async with self._try_send(request, _content) as _response:
                 yield _response
         except exceptions.ExpiredAccessToken:
-            await _PrivateNetworkInfo.get(self).account.refresh_oauth_access_token()
+            await _private.refresh_access_token()
+            if _content.started_streaming:
+                raise  # (a streamed body can't be sent again)
             # if this one fails, don't try refreshing again
-            async with self._try_send(request) as _response:
+            async with self._try_send(request, _content) as _response:
                 yield _response
 
     @contextlib.asynccontextmanager
-    async def _try_send(self, request: HttpRequestInfo):
+    async def _try_send(self, request: HttpRequestInfo, content: "_LimitedContent"):
+        _private = _PrivateNetworkInfo.get(self)
+        async with contextlib.AsyncExitStack() as _slots:
+            for _slot_pool in await _private.get_slot_pools():
+                await _slots.enter_async_context(
+                    _slot_pool.slot(timeout=settings.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS)
+                )
+            async with self._send_now(request, content) as _response:
+                yield _response
+
+    @contextlib.asynccontextmanager
+    async def _send_now(self, request: HttpRequestInfo, content: "_LimitedContent"):
         _private = _PrivateNetworkInfo.get(self)
         _url = _private.get_full_url(request.uri_path)
+        _headers = _merged_headers(await _private.get_headers(), request.headers)
+        _cache_key = _private.http_cache_key(request, _url)
+        _cached = None if _cache_key is None else http_cache.lookup(_cache_key)
+        if _cached is not None:
+            _headers.add_many(_cached.conditional_headers())
         _logger.info(f"sending {request.http_method} to {_url}")
-        async with _private.client_session.request(
+        _client_session = await get_singleton_client_session()
+        async with _client_session.request(
             request.http_method,
             _url,
-            headers=await _private.get_headers(),
-            # TODO: content
+            params=list(request.query.items()),
+            headers=_headers,
+            data=content.as_data(),
         ) as _response:
             if _response.status == HTTPStatus.UNAUTHORIZED:
                 # assume unauthorized because of token expiration.
                 # if not, will fail again after refresh (which is fine)
                 raise exceptions.ExpiredAccessToken
-            yield _AiohttpResponseInfo(_response)
+            if _cached is not None and _response.status == HTTPStatus.NOT_MODIFIED:
+                http_cache.record_not_modified()
+                yield _CachedResponseInfo(_cached)
+            else:
+                yield _AiohttpResponseInfo(_response, _cache_key)
 
 
 ###
@@ -123,38 +234,187 @@ class _PrivateInfo:
         self.__private_map[shared_obj] = self
 
 
+class _LimitedContent:
+    """a request body, checked against a size limit (incrementally, when streamed)"""
+
+    def __init__(self, content: HttpRequestContent, max_bytes: int | None):
+        self._content = content
+        self._max_bytes = max_bytes
+        self.started_streaming = False
+        if isinstance(content, bytes):
+            self._check_size(len(content))
+
+    def as_data(self) -> bytes | typing.AsyncIterator[bytes] | None:
+        if self._content is None or isinstance(self._content, bytes):
+            return self._content
+        return self._stream(self._content)
+
+    async def _stream(
+        self, chunks: typing.AsyncIterable[bytes]
+    ) -> typing.AsyncIterator[bytes]:
+        self.started_streaming = True
+        _sent_bytes = 0
+        async for _chunk in chunks:
+            _sent_bytes += len(_chunk)
+            self._check_size(_sent_bytes)
+            yield _chunk
+
+    def _check_size(self, byte_count: int) -> None:
+        if self._max_bytes is not None and byte_count > self._max_bytes:
+            raise exceptions.UploadTooLarge(
+                f"request body larger than {self._max_bytes} bytes"
+            )
+
+
+_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+def _merged_headers(credential_headers: Multidict, request_headers: Multidict):
+    _merged = Multidict(request_headers.items())
+    for _name in credential_headers.keys():
+        del _merged[_name]  # (credential headers win)
+    _merged.add_many(credential_headers.items())
+    return _merged
+
+
 @dataclasses.dataclass
 class _PrivateResponse(_PrivateInfo):
     """ "private" info associated with an _AiohttpResponseInfo instance"""
 
     # avoid exposing aiohttp directly to imps
-    aiohttp_response: aiohttp.ClientResponse
+    aiohttp_response: OutboundResponse
+    cache_key: http_cache.HttpCacheKey | None = None
 
 
 @dataclasses.dataclass
 class _PrivateNetworkInfo(_PrivateInfo):
     """ "private" info associated with a GravyvaletHttpRequestor instance"""
 
-    # avoid exposing aiohttp directly to imps
-    client_session: aiohttp.ClientSession
-
     # keep network constraints away from imps
     prefix_url: str
     account: db.AuthorizedStorageAccount
-
-    @sync_to_async
-    def get_headers(self) -> Multidict:
-        _headers = Multidict()
-        _credentials = self.account.credentials
-        if _credentials:
-            _headers.add_many(self.account.credentials.iter_headers())
-        return _headers
+    max_upload_mb: int | None = None
+
+    # credential headers (and oauth access token expiration), once loaded from the database
+    loaded_headers: Multidict | None = dataclasses.field(default=None, repr=False)
+    loaded_token_expiration: datetime.datetime | None = None
+    # limits on concurrent requests (in this process, then across processes), once loaded
+    loaded_slot_pools: tuple[SlotPool | CrossProcessLimit, ...] | None = None
+
+    async def get_headers(self) -> Multidict:
+        if self.loaded_headers is None:
+            return await sync_to_async(self.get_headers__blocking)()
+        return self.loaded_headers
+
+    def get_headers__blocking(self) -> Multidict:
+        if self.loaded_headers is None:
+            _headers = Multidict()
+            _credentials = self.account.credentials
+            if _credentials:
+                _headers.add_many(_credentials.iter_headers())
+            if self.account.oauth2_token_metadata_id is not None:
+                self.loaded_token_expiration = (
+                    self.account.oauth2_token_metadata.access_token_expiration
+                )
+            self.loaded_headers = _headers
+        return self.loaded_headers
+
+    def forget_headers(self) -> None:
+        self.loaded_headers = None
+        self.loaded_token_expiration = None
+
+    async def access_token_expires_soon(self) -> bool:
+        await self.get_headers()  # ensure loaded
+        return oauth_utils.expires_soon(self.loaded_token_expiration)
+
+    async def refresh_access_token(self) -> None:
+        await self.account.refresh_oauth_access_token()
+        self.forget_headers()
+
+    async def get_slot_pools(self) -> tuple[SlotPool | CrossProcessLimit, ...]:
+        if self.loaded_slot_pools is None:
+            return await sync_to_async(self.get_slot_pools__blocking)()
+        return self.loaded_slot_pools
+
+    def get_slot_pools__blocking(self) -> tuple[SlotPool | CrossProcessLimit, ...]:
+        if self.loaded_slot_pools is None:
+            _cross_process_limit = CrossProcessLimit.for_account__blocking(self.account)
+            self.loaded_slot_pools = (
+                *slot_pools_for_account__blocking(self.account),
+                *([] if _cross_process_limit is None else [_cross_process_limit]),
+            )
+        return self.loaded_slot_pools
+
+    def max_upload_bytes(self) -> int | None:
+        if self.max_upload_mb is None:
+            return None
+        return self.max_upload_mb * 1024 * 1024
+
+    def http_cache_key(
+        self, request: HttpRequestInfo, full_url: str
+    ) -> http_cache.HttpCacheKey | None:
+        """key for `http_cache`, if the request may use it (and forget the account's
+        cached responses, if the request may change anything)
+        """
+        if not http_cache.enabled():
+            return None
+        if request.http_method not in (HTTPMethod.GET, HTTPMethod.HEAD):
+            http_cache.forget_account(self.account.pk)
+            return None
+        if (
+            request.http_method != HTTPMethod.GET
+            or request.content is not None
+            or any(_name in request.headers for _name in _CONDITIONAL_HEADERS)
+        ):
+            return None
+        return http_cache.HttpCacheKey(
+            account_pk=self.account.pk,
+            credentials_pk=self.account._credentials_id,
+            url=full_url,
+            query=tuple(request.query.items()),
+            headers=tuple(
+                sorted(
+                    (_name.lower(), _value) for _name, _value in request.headers.items()
+                )
+            ),
+        )
 
     def get_full_url(self, relative_url: str) -> str:
-        """resolve a url relative to a given prefix
+        return _PrefixUrlResolver.for_prefix(self.prefix_url).resolve(relative_url)
 
-        like urllib.parse.urljoin, but return value guaranteed to start with the given `prefix_url`
-        """
+
+class _PrefixUrlResolver:
+    """resolve urls relative to a given prefix
+
+    like urllib.parse.urljoin, but return value guaranteed to start with the given `prefix_url`
+
+    (one per prefix, cached -- plain relative paths, the common case, are
+    resolved without parsing)
+    """
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def for_prefix(prefix_url: str) -> "_PrefixUrlResolver":
+        return _PrefixUrlResolver(prefix_url)
+
+    def __init__(self, prefix_url: str):
+        self.prefix_url = prefix_url
+        # what urljoin resolves a plain relative path against: the prefix, up to
+        # and including the last "/" in its path (without query or fragment)
+        self._base_url = urljoin(prefix_url, "_").removesuffix("_")
+
+    def resolve(self, relative_url: str) -> str:
+        if _is_plain_relative_path(relative_url):
+            _full_url = self._base_url + relative_url
+        else:
+            _full_url = self._resolve_parsed(relative_url)
+        if not _full_url.startswith(self.prefix_url):
+            raise ValueError(
+                f'relative url may not alter the base url (maybe with dot segments "/../"? got "{relative_url}")'
+            )
+        return _full_url
+
+    def _resolve_parsed(self, relative_url: str) -> str:
         _split_relative = urlsplit(relative_url)
         if _split_relative.scheme or _split_relative.netloc:
             raise ValueError(
@@ -164,9 +424,15 @@ class _PrivateNetworkInfo(_PrivateInfo):
             raise ValueError(
                 f'relative url may not be an absolute path starting with "/" (got "{relative_url}")'
             )
-        _full_url = urljoin(self.prefix_url, relative_url)
-        if not _full_url.startswith(self.prefix_url):
-            raise ValueError(
-                f'relative url may not alter the base url (maybe with dot segments "/../"? got "{relative_url}")'
-            )
-        return _full_url
+        return urljoin(self.prefix_url, relative_url)
+
+
+def _is_plain_relative_path(relative_url: str) -> bool:
+    """a relative path that urljoin would simply append to the base url"""
+    return bool(_PLAIN_RELATIVE_PATH.fullmatch(relative_url)) and not any(
+        _segment in (".", "..") for _segment in relative_url.split("/")
+    )
+
+
+# no scheme, query, fragment, params, leading or doubled "/", space or control chars
+_PLAIN_RELATIVE_PATH = re.compile(r"(?!/)(?!.*//)[^\x00-\x20\x7f:;?#\\]+")
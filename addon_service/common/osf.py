@@ -1,5 +1,6 @@
 import enum
 import functools
+import hashlib
 import logging
 import re
 from http import HTTPStatus
@@ -11,6 +12,8 @@ from django.core.exceptions import PermissionDenied
 
 from addon_service.common import hmac as hmac_utils
 from addon_service.common.aiohttp_session import get_singleton_client_session
+from addon_service.common.exceptions import OsfUnavailable
+from addon_service.common.local_cache import TtlLruCache
 from addon_toolkit import AddonCapabilities
 
 
@@ -42,33 +45,93 @@ class OSFPermission(enum.StrEnum):
         raise ValueError(capabilities)
 
 
-@async_to_sync
-async def get_osf_user_uri(request: django_http.HttpRequest) -> str | None:
+def get_osf_user_uri(request: django_http.HttpRequest) -> str | None:
+    """the requesting user's osf uri, if any (from hmac-signed headers, or osf)
+
+    (blocking, for sync callers, e.g. rest_framework authentication; enters an
+    event loop only when actually asking osf, not for hmac or recently cached answers)
+    """
     try:
-        return _get_hmac_verified_user_iri(request)
-    except hmac_utils.RejectedHmac as e:
-        _logger.critical(f"rejected hmac signature!?\n\tpath:{request.path}")
-        raise PermissionDenied(e)
+        return _hmac_user_uri(request)
     except hmac_utils.NotUsingHmac:
         pass  # the only acceptable hmac-related error is not using hmac at all
-    # not hmac -- ask osf
+    # not hmac -- ask osf (or recall what osf said recently)
     _auth_headers = _get_osf_auth_headers(request)
     if not _auth_headers:
         return None
-    _client = await get_singleton_client_session()
-    async with _client.get(_osfapi_me_url(), headers=_auth_headers) as _response:
-        if HTTPStatus(_response.status).is_client_error:
-            return None
-        _response_content = await _response.json()
-        return _iri_from_osfapi_resource(_response_content["data"])
+    try:
+        return _user_uri_cache().get_or_load__blocking(
+            _caller_cache_key(_auth_headers),
+            functools.partial(async_to_sync(_ask_osf_for_user_uri), _auth_headers),
+        )
+    except _NoOsfUser:
+        return None
 
 
-@async_to_sync
-async def has_osf_permission_on_resource(
+def has_osf_permission_on_resource(
     request: django_http.HttpRequest,
     resource_uri: str,
     required_permission: OSFPermission,
 ) -> bool:
+    """whether the requesting user has the given permission on an osf resource
+
+    (blocking, for sync callers, e.g. rest_framework permissions; enters an event
+    loop only when actually asking osf, not for hmac or recently cached answers)
+    """
+    try:
+        return _hmac_permission(request, resource_uri, required_permission)
+    except hmac_utils.NotUsingHmac:
+        pass  # the only acceptable hmac-related error is not using hmac at all
+    # not hmac -- ask osf (or recall what osf said recently)
+    _auth_headers = _get_osf_auth_headers(request)
+    return _permission_cache().get_or_load__blocking(
+        (_caller_cache_key(_auth_headers), resource_uri, required_permission),
+        functools.partial(
+            async_to_sync(_ask_osf_for_permission),
+            _auth_headers,
+            resource_uri,
+            required_permission,
+        ),
+    )
+
+
+###
+# module-private helpers
+
+_HeaderList = list[tuple[str, str]]
+
+
+@functools.cache  # one cache per process
+def _permission_cache() -> TtlLruCache[tuple[str, str, OSFPermission], bool]:
+    return TtlLruCache(
+        maxsize=settings.OSF_PERMISSION_CACHE_SIZE,
+        ttl_seconds=settings.OSF_PERMISSION_CACHE_TTL_SECONDS,
+    )
+
+
+@functools.cache  # one cache per process
+def _user_uri_cache() -> TtlLruCache[str, str]:
+    return TtlLruCache(
+        maxsize=settings.OSF_USER_CACHE_SIZE,
+        ttl_seconds=settings.OSF_USER_CACHE_TTL_SECONDS,
+    )
+
+
+def _hmac_user_uri(request: django_http.HttpRequest) -> str | None:
+    # raises hmac_utils.NotUsingHmac if the request is not hmac-signed
+    try:
+        return _get_hmac_verified_user_iri(request)
+    except hmac_utils.RejectedHmac as e:
+        _logger.critical(f"rejected hmac signature!?\n\tpath:{request.path}")
+        raise PermissionDenied(e)
+
+
+def _hmac_permission(
+    request: django_http.HttpRequest,
+    resource_uri: str,
+    required_permission: OSFPermission,
+) -> bool:
+    # raises hmac_utils.NotUsingHmac if the request is not hmac-signed
     try:
         return _has_hmac_verified_osf_permission(
             request, resource_uri, required_permission
@@ -78,9 +141,35 @@ async def has_osf_permission_on_resource(
             f"rejected hmac signature!?\n\tpath:{request.path}\n\tresource:{resource_uri}"
         )
         return False
-    except hmac_utils.NotUsingHmac:
-        pass  # the only acceptable hmac-related error is not using hmac at all
-    # not hmac -- ask osf
+
+
+class _NoOsfUser(Exception):
+    """osf did not recognize the caller (raised to avoid caching the absence)"""
+
+
+def _caller_cache_key(auth_headers: _HeaderList) -> str:
+    # identify the caller by a digest of their credentials (never the credentials themselves)
+    _digest = hashlib.sha256()
+    for _name, _value in sorted(auth_headers):
+        _digest.update(f"{_name}:{_value}\n".encode())
+    return _digest.hexdigest()
+
+
+async def _ask_osf_for_user_uri(auth_headers: _HeaderList) -> str:
+    _client = await get_singleton_client_session()
+    async with _client.get(_osfapi_me_url(), headers=auth_headers) as _response:
+        _raise_if_unavailable(_response)
+        if HTTPStatus(_response.status).is_client_error:
+            raise _NoOsfUser
+        _response_content = await _response.json()
+        return _iri_from_osfapi_resource(_response_content["data"])
+
+
+async def _ask_osf_for_permission(
+    auth_headers: _HeaderList,
+    resource_uri: str,
+    required_permission: OSFPermission,
+) -> bool:
     _client = await get_singleton_client_session()
     async with _client.get(
         _osfapi_guid_url(resource_uri),
@@ -89,11 +178,12 @@ async def has_osf_permission_on_resource(
             "embed": "referent",  # instead, include the referent in the response
         },
         headers=[
-            *_get_osf_auth_headers(request),
+            *auth_headers,
             ("Accept", "application/vnd.api+json"),  # jsonapi
         ],
     ) as _response:
-        if not HTTPStatus(_response.status).is_success:
+        _raise_if_unavailable(_response)
+        if HTTPStatus(_response.status).is_client_error:
             return False  # nonexistent osfid (TODO: consider raising error?)
         _response_content = await _response.json()
         _embedded_referent = _response_content["data"]["embeds"]["referent"]
@@ -111,10 +201,13 @@ async def has_osf_permission_on_resource(
         )
 
 
-###
-# module-private helpers
-
-_HeaderList = list[tuple[str, str]]
+def _raise_if_unavailable(response) -> None:
+    # raised (not returned) so nothing is cached -- osf is asked again next time
+    _status = HTTPStatus(response.status)
+    if _status == HTTPStatus.TOO_MANY_REQUESTS or not (
+        _status.is_success or _status.is_client_error
+    ):
+        raise OsfUnavailable(f"osf responded {_status.value} {_status.phrase}")
 
 
 @functools.cache  # compute only once
@@ -6,6 +6,7 @@ from rest_framework import (
 
 from addon_service.common import hmac as hmac_utils
 from addon_service.common import osf
+from addon_service.common.unit_of_work import load_related
 
 
 class IsAuthenticated(permissions.BasePermission):
@@ -52,13 +53,13 @@ class SessionUserMayAccessInvocation(permissions.BasePermission):
         _user_uri = request.session.get("user_reference_uri")
         return bool(
             # must be the invoker:
-            (_user_uri == obj.by_user.user_uri)
+            (_user_uri == obj.owner_uri)
             # or the account owner:
-            or (_user_uri == obj.thru_account.owner_uri)
+            or (_user_uri == load_related(obj, "thru_account").owner_uri)
             # or a user with "read" access on the connected osf project:
             or osf.has_osf_permission_on_resource(
                 request,
-                obj.thru_addon.authorized_resource.resource_uri,
+                load_related(obj, "thru_addon").resource_uri,
                 osf.OSFPermission.READ,
             )
         )
@@ -67,8 +68,8 @@ class SessionUserMayAccessInvocation(permissions.BasePermission):
 class SessionUserMayPerformInvocation(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         _user_uri = request.session.get("user_reference_uri")
-        _thru_addon = obj.thru_addon
-        _thru_account = obj.thru_account
+        _thru_addon = load_related(obj, "thru_addon")
+        _thru_account = load_related(obj, "thru_account")
         if _thru_addon is None:
             # when invoking thru account, must be the owner
             return _user_uri == _thru_account.owner_uri
@@ -79,7 +80,7 @@ class SessionUserMayPerformInvocation(permissions.BasePermission):
             # or a user with sufficient on the connected osf project:
             or osf.has_osf_permission_on_resource(
                 request,
-                _thru_addon.authorized_resource.resource_uri,
+                _thru_addon.resource_uri,
                 osf.OSFPermission.for_capabilities(obj.operation.capability),
             )
         )
@@ -0,0 +1,159 @@
+"""a unit of work: identity map and memoization, scoped to one request (or task)
+
+within `unit_of_work()` (opened for each request by `UnitOfWorkMiddleware`):
+- related objects gotten thru `load_related` are loaded once per row, and the same
+  instance shared by everything that refers to that row
+- `memoized` methods are computed once per row (and values of their dependencies)
+- saving a row forgets both; `refresh_from_db` also forgets the rows it refers to
+  (see `AddonsServiceBaseModel`), so they're loaded fresh next time
+
+outside a unit of work, both do nothing special (load and compute every time)
+
+>>> from addon_service.models import UserReference
+>>> _user = UserReference(user_uri="http://osf.example/u")
+>>> with unit_of_work() as _uow:
+...     _uow.register(_user)
+...     _uow.get(UserReference, _user.pk) is _user
+True
+>>> current_unit_of_work() is None
+True
+"""
+
+import contextlib
+import contextvars
+import functools
+import typing
+
+from django.db import models
+
+
+__all__ = (
+    "UnitOfWork",
+    "UnitOfWorkMiddleware",
+    "current_unit_of_work",
+    "load_related",
+    "memoized",
+    "unit_of_work",
+)
+
+
+_Model = typing.TypeVar("_Model", bound=models.Model)
+
+
+class UnitOfWork:
+    def __init__(self) -> None:
+        self._identity_map: dict[
+            tuple[type[models.Model], typing.Any], models.Model
+        ] = {}
+        self._memos: dict[tuple, typing.Any] = {}
+
+    def get(self, model_cls: type[_Model], pk: typing.Any) -> _Model | None:
+        return self._identity_map.get((model_cls, pk))  # type: ignore[return-value]
+
+    def register(self, obj: models.Model) -> None:
+        self._identity_map.setdefault((type(obj), obj.pk), obj)
+
+    def forget(self, obj: models.Model) -> None:
+        """forget the given object's row (its shared instance and memoized values)"""
+        self._forget_row(type(obj), obj.pk)
+
+    def forget_related(self, obj: models.Model) -> None:
+        """forget rows the given object refers to (by foreign key or one-to-one field)"""
+        for _field in obj._meta.concrete_fields:
+            if _field.many_to_one or _field.one_to_one:
+                _related_pk = getattr(obj, _field.attname)
+                if _related_pk is not None:
+                    self._forget_row(_field.related_model, _related_pk)
+
+    def memo(self, key: tuple, compute: typing.Callable[[], typing.Any]):
+        try:
+            return self._memos[key]
+        except KeyError:
+            _value = self._memos[key] = compute()
+            return _value
+
+    def _forget_row(self, model_cls: type[models.Model], pk: typing.Any) -> None:
+        _row = (model_cls, pk)
+        self._identity_map.pop(_row, None)
+        for _key in [_key for _key in self._memos if _key[:2] == _row]:
+            del self._memos[_key]
+
+
+@contextlib.contextmanager
+def unit_of_work() -> typing.Iterator[UnitOfWork]:
+    """enter a unit of work (or continue the current one, if any)"""
+    _current = _CURRENT_UNIT_OF_WORK.get()
+    if _current is not None:
+        yield _current
+        return
+    _unit = UnitOfWork()
+    _token = _CURRENT_UNIT_OF_WORK.set(_unit)
+    try:
+        yield _unit
+    finally:
+        _CURRENT_UNIT_OF_WORK.reset(_token)
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    return _CURRENT_UNIT_OF_WORK.get()
+
+
+def load_related(obj: models.Model, field_name: str) -> typing.Any:
+    """get a forward-related object (by foreign key or one-to-one field),
+    loading each related row at most once per unit of work
+    """
+    _field = typing.cast(models.ForeignKey, obj._meta.get_field(field_name))
+    _unit = _CURRENT_UNIT_OF_WORK.get()
+    _related_pk = getattr(obj, _field.attname)
+    if _unit is None or _related_pk is None or _field.is_cached(obj):
+        return getattr(obj, field_name)
+    _related = _unit.get(_field.related_model, _related_pk)
+    if _related is None:
+        _related = getattr(obj, field_name)
+        _unit.register(_related)
+    else:
+        _field.set_cached_value(obj, _related)
+    return _related
+
+
+def memoized(*depends_on: str):
+    """decorate a model method (with no params) to compute it once per row per
+    unit of work -- recomputed if any of the named attributes' values change
+    """
+
+    def _decorator(fn):
+        @functools.wraps(fn)
+        def _memoized_fn(self):
+            _unit = _CURRENT_UNIT_OF_WORK.get()
+            if _unit is None or self._state.adding:
+                return fn(self)
+            _key = (
+                type(self),
+                self.pk,
+                fn.__name__,
+                *(getattr(self, _attr) for _attr in depends_on),
+            )
+            return _unit.memo(_key, functools.partial(fn, self))
+
+        return _memoized_fn
+
+    return _decorator
+
+
+class UnitOfWorkMiddleware:
+    """each request is a unit of work"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with unit_of_work():
+            return self.get_response(request)
+
+
+###
+# module-private helpers
+
+_CURRENT_UNIT_OF_WORK: contextvars.ContextVar[UnitOfWork | None] = (
+    contextvars.ContextVar("_CURRENT_UNIT_OF_WORK", default=None)
+)
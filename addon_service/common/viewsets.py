@@ -1,6 +1,8 @@
 import dataclasses
 import typing
 
+from django.conf import settings
+from django.db import connection
 from rest_framework import mixins as drf_mixins
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
@@ -15,15 +17,85 @@ from rest_framework_json_api.views import (
     RelatedMixin,
 )
 
+from .exceptions import QueryBudgetExceeded
 from .filtering import RestrictedListEndpointFilterBackend
 from .static_dataclass_model import StaticDataclassModel
 
 
-class _DrfJsonApiHelpers(AutoPrefetchMixin, PreloadIncludesMixin, RelatedMixin):
+class QueryBudgetMixin:
+    """with GRAVYVALET_ENFORCE_QUERY_BUDGETS, fail requests that make more database
+    queries than the view's `query_budget` (for all actions, or by action name)
+
+    (counts queries while rendering, too -- that's where `include` is handled)
+    """
+
+    query_budget: int | dict[str, int] | None = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not (settings.GRAVYVALET_ENFORCE_QUERY_BUDGETS and self.query_budget):
+            return super().dispatch(request, *args, **kwargs)  # type: ignore[misc]
+        _queries: list[str] = []
+
+        def _count_query(execute, sql, params, many, context):
+            _queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(_count_query):
+            _response = super().dispatch(request, *args, **kwargs)  # type: ignore[misc]
+            if hasattr(_response, "render"):
+                _response.render()
+        _action = getattr(self, "action", None)
+        _budget = (
+            self.query_budget.get(_action)
+            if isinstance(self.query_budget, dict)
+            else self.query_budget
+        )
+        if _budget is not None and len(_queries) > _budget:
+            raise QueryBudgetExceeded(
+                f"{type(self).__name__}.{_action} made {len(_queries)} queries"
+                f" (budget {_budget}):\n" + "\n".join(_queries)
+            )
+        return _response
+
+
+class PreloadRelatedMixin:
+    """like drf-jsonapi's `PreloadIncludesMixin`, but for related endpoints
+
+    `select_for_related` and `prefetch_for_related` map related field names to
+    lookups for `select_related` and `prefetch_related` on the related queryset
+    """
+
+    select_for_related: dict[str, list[str]] = {}
+    prefetch_for_related: dict[str, list[str]] = {}
+
+    def get_related_instance(self):
+        _instance = super().get_related_instance()  # type: ignore[misc]
+        if not hasattr(_instance, "all"):
+            return _instance  # (not many)
+        _field_name = self.get_related_field_name()  # type: ignore[attr-defined]
+        _queryset = _instance.all()
+        _select = self.select_for_related.get(_field_name)
+        if _select:
+            _queryset = _queryset.select_related(*_select)
+        _prefetch = self.prefetch_for_related.get(_field_name)
+        if _prefetch:
+            _queryset = _queryset.prefetch_related(*_prefetch)
+        return _queryset
+
+
+class _DrfJsonApiHelpers(
+    QueryBudgetMixin,
+    PreloadRelatedMixin,
+    AutoPrefetchMixin,
+    PreloadIncludesMixin,
+    RelatedMixin,
+):
     pass
 
 
-class RestrictedReadOnlyViewSet(ReadOnlyModelViewSet):
+class RestrictedReadOnlyViewSet(
+    QueryBudgetMixin, PreloadRelatedMixin, ReadOnlyModelViewSet
+):
     """ReadOnlyViewSet that requires `list` actions return only one result.
 
     UserReference and ResourceReference endpoints are major entry points into
@@ -5,6 +5,10 @@ from django.db import models
 
 from addon_service.addon_operation.models import AddonOperationModel
 from addon_service.common.base_model import AddonsServiceBaseModel
+from addon_service.common.unit_of_work import (
+    load_related,
+    memoized,
+)
 from addon_service.common.validators import validate_addon_capability
 from addon_service.resource_reference.models import ResourceReference
 from addon_toolkit import (
@@ -53,7 +57,7 @@ class ConfiguredStorageAddon(AddonsServiceBaseModel):
 
     @property
     def display_name(self):
-        return self._display_name or self.base_account.display_name
+        return self._display_name or self._base_account.display_name
 
     @display_name.setter
     def display_name(self, value: str):
@@ -71,15 +75,15 @@ class ConfiguredStorageAddon(AddonsServiceBaseModel):
 
     @property
     def account_owner(self):
-        return self.base_account.account_owner
+        return self._base_account.account_owner
 
     @property
     def owner_uri(self) -> str:
-        return self.base_account.owner_uri
+        return self._base_account.owner_uri
 
     @property
     def resource_uri(self):
-        return self.authorized_resource.resource_uri
+        return load_related(self, "authorized_resource").resource_uri
 
     @resource_uri.setter
     def resource_uri(self, uri: str):
@@ -87,6 +91,7 @@ class ConfiguredStorageAddon(AddonsServiceBaseModel):
         self.authorized_resource = _resource_ref
 
     @property
+    @memoized("int_connected_capabilities", "base_account_id")
     def connected_operations(self) -> list[AddonOperationModel]:
         _imp_cls = self.imp_cls
         return [
@@ -97,6 +102,7 @@ class ConfiguredStorageAddon(AddonsServiceBaseModel):
         ]
 
     @property
+    @memoized("int_connected_capabilities", "base_account_id")
     def connected_operation_names(self):
         return [
             _operation.name
@@ -107,19 +113,23 @@ class ConfiguredStorageAddon(AddonsServiceBaseModel):
 
     @property
     def credentials(self):
-        return self.base_account.credentials
+        return self._base_account.credentials
 
     @property
     def external_service(self):
-        return self.base_account.external_service
+        return self._base_account.external_service
 
     @property
     def imp_cls(self) -> type[AddonImp]:
-        return self.base_account.imp_cls
+        return self._base_account.imp_cls
+
+    @property
+    def _base_account(self):
+        return load_related(self, "base_account")
 
     def storage_imp_config(self) -> StorageConfig:
         return dataclasses.replace(
-            self.base_account.storage_imp_config(),
+            self._base_account.storage_imp_config(),
             connected_root_id=self.root_folder,
         )
 
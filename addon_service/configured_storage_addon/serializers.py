@@ -3,6 +3,9 @@ from rest_framework_json_api.relations import ResourceRelatedField
 from rest_framework_json_api.utils import get_resource_type_from_model
 
 from addon_service.addon_operation.models import AddonOperationModel
+from addon_service.authorized_storage_account import (
+    serializers as authorized_storage_account_serializers,
+)
 from addon_service.common import view_names
 from addon_service.common.enum_serializers import EnumNameMultipleChoiceField
 from addon_service.common.serializer_fields import DataclassRelatedLinkField
@@ -15,6 +18,15 @@ from addon_toolkit import AddonCapabilities
 
 RESOURCE_TYPE = get_resource_type_from_model(ConfiguredStorageAddon)
 
+# relations read when serializing an addon (for `select_related`)
+SELECT_FOR_SERIALIZING = (
+    "authorized_resource",
+    *(
+        f"base_account__{_lookup}"
+        for _lookup in authorized_storage_account_serializers.SELECT_FOR_SERIALIZING
+    ),
+)
+
 
 class ConfiguredStorageAddonSerializer(serializers.HyperlinkedModelSerializer):
     root_folder = serializers.CharField(required=False, allow_blank=True)
@@ -15,12 +15,22 @@ from addon_service.common.viewsets import RetrieveWriteDeleteViewSet
 from addon_service.common.waterbutler_compat import WaterButlerCredentialsSerializer
 
 from .models import ConfiguredStorageAddon
-from .serializers import ConfiguredStorageAddonSerializer
+from .serializers import (
+    SELECT_FOR_SERIALIZING,
+    ConfiguredStorageAddonSerializer,
+)
 
 
 class ConfiguredStorageAddonViewSet(RetrieveWriteDeleteViewSet):
     queryset = ConfiguredStorageAddon.objects.active()
     serializer_class = ConfiguredStorageAddonSerializer
+    select_for_includes = {"__all__": SELECT_FOR_SERIALIZING}
+    query_budget = {
+        "retrieve": 3,
+        "retrieve_related": 3,
+        "create": 16,
+        "get_wb_credentials": 6,
+    }
 
     def get_permissions(self):
         match self.action:
@@ -0,0 +1,194 @@
+"""measure credentials encryption: latency, memory, and derived-key cache behavior
+
+for choosing key parameters (GRAVYVALET_SCRYPT_*) and derived-key cache size for
+given hardware, and for catching regressions -- see the `benchmark_encryption`
+management command
+
+each grid point runs against its own derived-key cache (see
+`encryption.isolated_key_derivation`), so "cold" means a key is derived and "warm"
+means it was cached; decrypt and rotate run over a random mix of `distinct_salts`
+salts, so their hit ratio depends on cache size
+
+peak RSS is the process high-water mark (it never goes down), so compare grid
+points from cheapest to most expensive, alongside `KeyParameters.memory_required`
+"""
+
+import dataclasses
+import itertools
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import typing
+
+from . import encryption
+
+
+__all__ = (
+    "BenchmarkResult",
+    "LatencyStats",
+    "run_benchmarks",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class LatencyStats:
+    samples: int
+    mean_seconds: float
+    p50_seconds: float
+    p95_seconds: float
+    max_seconds: float
+
+    @classmethod
+    def from_seconds(cls, seconds: typing.Sequence[float]) -> "LatencyStats":
+        _sorted = sorted(seconds)
+        return cls(
+            samples=len(_sorted),
+            mean_seconds=statistics.fmean(_sorted),
+            p50_seconds=_sorted[len(_sorted) // 2],
+            p95_seconds=_sorted[min(len(_sorted) - 1, int(len(_sorted) * 0.95))],
+            max_seconds=_sorted[-1],
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    scrypt_cost_log2: int
+    scrypt_block_size: int
+    scrypt_parallelization: int
+    cache_size: int
+    encrypt_cold: LatencyStats
+    encrypt_warm: LatencyStats
+    decrypt: LatencyStats
+    rotate: LatencyStats
+    derivations: int
+    cache_hit_ratio: float
+    memory_required_bytes: int  # estimated, per derivation
+    peak_rss_bytes: int  # (process high-water mark)
+
+    def as_row(self) -> dict[str, int | float]:
+        _row: dict[str, int | float] = {}
+        for _field in dataclasses.fields(self):
+            _value = getattr(self, _field.name)
+            if isinstance(_value, LatencyStats):
+                _row[f"{_field.name}_mean_ms"] = _value.mean_seconds * 1000
+                _row[f"{_field.name}_p95_ms"] = _value.p95_seconds * 1000
+            else:
+                _row[_field.name] = _value
+        return _row
+
+
+def run_benchmarks(
+    *,
+    cost_log2_grid: typing.Iterable[int],
+    block_size_grid: typing.Iterable[int],
+    parallelization_grid: typing.Iterable[int],
+    cache_sizes: typing.Iterable[int],
+    iterations: int = 20,
+    distinct_salts: int = 4,
+    payload_bytes: int = 256,
+    seed: int = 0,
+) -> typing.Iterator[BenchmarkResult]:
+    """run one benchmark per combination of key parameters and cache size
+
+    (yields each result as soon as it's done -- slow grid points are slow)
+    """
+    _cache_sizes = list(cache_sizes)
+    for _cost_log2, _block_size, _parallelization in itertools.product(
+        cost_log2_grid, block_size_grid, parallelization_grid
+    ):
+        for _cache_size in _cache_sizes:
+            yield _run_one(
+                scrypt_cost_log2=_cost_log2,
+                scrypt_block_size=_block_size,
+                scrypt_parallelization=_parallelization,
+                cache_size=_cache_size,
+                iterations=iterations,
+                distinct_salts=distinct_salts,
+                payload=os.urandom(payload_bytes),
+                rng=random.Random(seed),
+            )
+
+
+###
+# module-private helpers
+
+
+def _run_one(
+    *,
+    scrypt_cost_log2: int,
+    scrypt_block_size: int,
+    scrypt_parallelization: int,
+    cache_size: int,
+    iterations: int,
+    distinct_salts: int,
+    payload: bytes,
+    rng: random.Random,
+) -> BenchmarkResult:
+    _all_params = [
+        encryption.KeyParameters(
+            scrypt_cost_log2=scrypt_cost_log2,
+            scrypt_block_size=scrypt_block_size,
+            scrypt_parallelization=scrypt_parallelization,
+        )
+        for _ in range(distinct_salts)
+    ]
+    with encryption.isolated_key_derivation(cache_size=cache_size) as _service:
+        # cold: first use of each salt derives its key
+        _encrypted: dict[encryption.KeyParameters, bytes] = {}
+        _encrypt_cold = []
+        for _params in _all_params:
+            _encrypted[_params], _seconds = _timed(
+                encryption.pls_encrypt_bytes, payload, _params
+            )
+            _encrypt_cold.append(_seconds)
+        # warm: same salt again, right away (cached unless cache_size is 0)
+        _encrypt_warm = [
+            _timed(encryption.pls_encrypt_bytes, payload, _all_params[-1])[1]
+            for _ in range(iterations)
+        ]
+        # a random mix of salts -- hits and misses depend on cache size
+        _mixed = [rng.choice(_all_params) for _ in range(iterations)]
+        _decrypt = [
+            _timed(encryption.pls_decrypt_bytes, _encrypted[_params], _params)[1]
+            for _params in _mixed
+        ]
+        # (rotates as if this grid point were the configured key parameters)
+        _rotate = [
+            _timed(
+                encryption.pls_rotate_encryption,
+                encrypted=_encrypted[_params],
+                stored_params=_params,
+                key_defaults=_params,
+            )[1]
+            for _params in _mixed
+        ]
+        _stats = _service.stats()
+    return BenchmarkResult(
+        scrypt_cost_log2=scrypt_cost_log2,
+        scrypt_block_size=scrypt_block_size,
+        scrypt_parallelization=scrypt_parallelization,
+        cache_size=cache_size,
+        encrypt_cold=LatencyStats.from_seconds(_encrypt_cold),
+        encrypt_warm=LatencyStats.from_seconds(_encrypt_warm),
+        decrypt=LatencyStats.from_seconds(_decrypt),
+        rotate=LatencyStats.from_seconds(_rotate),
+        derivations=_stats.derivations,
+        cache_hit_ratio=_stats.cache.hit_ratio,
+        memory_required_bytes=_all_params[0].memory_required(),
+        peak_rss_bytes=_peak_rss_bytes(),
+    )
+
+
+def _timed(fn, *args, **kwargs):
+    _start = time.perf_counter()
+    _result = fn(*args, **kwargs)
+    return _result, time.perf_counter() - _start
+
+
+def _peak_rss_bytes() -> int:
+    _maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # (kilobytes on linux, bytes on macos)
+    return _maxrss if sys.platform == "darwin" else _maxrss * 1024
@@ -8,18 +8,34 @@ considering recommendations from:
 - https://nvlpubs.nist.gov/nistpubs/Legacy/SP/nistspecialpublication800-132.pdf
 """
 
+import asyncio
 import base64
+import concurrent.futures
+import contextlib
+import contextvars
 import dataclasses
 import functools
 import hashlib
 import json
 import os
+import threading
+import time
 
 from cryptography import fernet
 from django.conf import settings
 
+from addon_service.common.local_cache import (
+    CacheStats,
+    TtlLruCache,
+)
+
 
 __all__ = (
+    "KeyDerivationStats",
+    "SaltEpoch",
+    "derive_multifernet_key__async",
+    "isolated_key_derivation",
+    "key_derivation_stats",
     "pls_decrypt_bytes",
     "pls_decrypt_json",
     "pls_encrypt_bytes",
@@ -39,7 +55,7 @@ def salt_factory() -> bytes:
     return os.urandom(_SALT_BYTE_COUNT)
 
 
-@dataclasses.dataclass(frozen=True)  # frozen for use as lru_cache key
+@dataclasses.dataclass(frozen=True)  # frozen for use as cache key
 class KeyParameters:  # https://datatracker.ietf.org/doc/html/rfc7914#section-2
     salt: bytes = dataclasses.field(default_factory=salt_factory)
     # recommended scrypt_cost_log2 between 14 and 20 (for "N" between 2^14 and 2^20)
@@ -108,39 +124,212 @@ def pls_decrypt_bytes(encrypted: bytes, key_params: KeyParameters) -> bytes:
 def pls_rotate_encryption(
     encrypted: bytes,
     stored_params: KeyParameters,
+    *,
+    salt_epoch: "SaltEpoch | None" = None,
+    key_defaults: KeyParameters | None = None,
 ) -> tuple[bytes, KeyParameters]:
-    _fresh_params = KeyParameters(salt=salt_factory())
-    _stored_up_to_date = (
-        len(stored_params.salt) == len(_fresh_params.salt)
-        and stored_params.scrypt_cost_log2 == _fresh_params.scrypt_cost_log2
-        and stored_params.scrypt_block_size == _fresh_params.scrypt_block_size
-        and stored_params.scrypt_parallelization == _fresh_params.scrypt_parallelization
-    )
-    if _stored_up_to_date:  # key params NOT changed -- can use MultiFernet.rotate
+    """re-encrypt with the latest secret (and, if changed, the default key params)
+
+    `key_defaults` (if given) stands in for the configured key parameters, other
+    than salt -- e.g. for benchmarking
+    """
+    if _has_current_defaults(stored_params, key_defaults):
+        # key params NOT changed -- can use MultiFernet.rotate (and keep the salt)
         _fresh_encrypted = _derive_multifernet_key(stored_params).rotate(encrypted)
-        _fresh_params = stored_params
+        return _fresh_encrypted, stored_params
+    # key defaults HAVE changed -- decrypt and re-encrypt with fresh params
+    if key_defaults is not None:
+        _fresh_params = dataclasses.replace(key_defaults, salt=salt_factory())
+    elif salt_epoch is not None:
+        _fresh_params = salt_epoch.next_key_parameters()
     else:
-        # key defaults HAVE changed -- decrypt and re-encrypt
-        _decrypted = pls_decrypt_bytes(encrypted, stored_params)
-        _fresh_encrypted = pls_encrypt_bytes(_decrypted, _fresh_params)
+        _fresh_params = KeyParameters(salt=salt_factory())
+    _decrypted = pls_decrypt_bytes(encrypted, stored_params)
+    _fresh_encrypted = pls_encrypt_bytes(_decrypted, _fresh_params)
     return _fresh_encrypted, _fresh_params
 
 
-# deriving keys is expensive on purpose -- cache, but only in local memory
-@functools.lru_cache(maxsize=settings.GRAVYVALET_DERIVED_KEY_CACHE_SIZE)
-def _derive_multifernet_key(
+class SaltEpoch:
+    """hands out key parameters with a shared salt, each for up to `max_rows` rows
+
+    for bulk re-encryption: rows sharing a salt share a derived key, so rotating
+    many rows costs a derivation per salt rather than per row (and later decrypting
+    or rotating them again likewise)
+
+    the tradeoff: a shared salt no longer separates those rows' keys -- anyone who
+    gets one derived key (e.g. from process memory) can decrypt every row in its
+    epoch, and one guess at the secret can be checked against all of them at once.
+    (each fernet token still has its own random IV, so equal plaintexts do not
+    give equal ciphertexts) -- `max_rows` bounds how many rows share that fate
+    """
+
+    def __init__(self, *, max_rows: int):
+        if max_rows < 1:
+            raise ValueError(f"expected max_rows >= 1 (got {max_rows})")
+        self.max_rows = max_rows
+        self.salt_count = 0
+        self._lock = threading.Lock()
+        self._key_params: KeyParameters | None = None
+        self._row_count = 0
+
+    def next_key_parameters(self) -> KeyParameters:
+        with self._lock:
+            if self._key_params is None or self._row_count >= self.max_rows:
+                self._key_params = KeyParameters(salt=salt_factory())
+                self._row_count = 0
+                self.salt_count += 1
+            self._row_count += 1
+            return self._key_params
+
+
+def _has_current_defaults(
+    key_params: KeyParameters, key_defaults: KeyParameters | None = None
+) -> bool:
+    _defaults = (
+        KeyParameters(salt=key_params.salt)
+        if key_defaults is None
+        else dataclasses.replace(key_defaults, salt=key_params.salt)
+    )
+    return len(key_params.salt) == _SALT_BYTE_COUNT and key_params == _defaults
+
+
+###
+# deriving keys is expensive on purpose (by default, ~128MB and a good fraction
+# of a second each) -- cache derived keys (only in local memory), derive each
+# only once at a time, and only a few at a time (in a dedicated thread pool,
+# as hashlib.scrypt releases the GIL)
+
+
+@dataclasses.dataclass(frozen=True)
+class KeyDerivationStats:
+    derivations: int
+    total_seconds: float
+    max_seconds: float
+    queue_depth: int  # waiting for a worker
+    in_progress: int
+    cache: CacheStats
+
+    @property
+    def mean_seconds(self) -> float:
+        return (self.total_seconds / self.derivations) if self.derivations else 0.0
+
+
+def key_derivation_stats() -> KeyDerivationStats:
+    return _derivation_service().stats()
+
+
+async def derive_multifernet_key__async(
     key_params: KeyParameters,
-    /,  # positional-only params for cache-friendliness
 ) -> fernet.MultiFernet:
-    # https://cryptography.io/en/latest/fernet/#cryptography.fernet.MultiFernet
-    return fernet.MultiFernet(
-        [
-            _derive_fernet_key(_secret, key_params)
-            for _secret in (
-                settings.GRAVYVALET_ENCRYPT_SECRET,
-                *settings.GRAVYVALET_ENCRYPT_SECRET_PRIORS,
+    """get the derived key for the given params, without blocking the event loop"""
+    return await _derivation_service().get_key__async(key_params)
+
+
+@contextlib.contextmanager
+def isolated_key_derivation(*, cache_size: int, max_workers: int = 1):
+    """derive keys on a separate service (with its own, initially empty, cache)
+    within this context -- for measuring derivation and cache behavior
+    """
+    _service = _KeyDerivationService(cache_size=cache_size, max_workers=max_workers)
+    _token = _ISOLATED_SERVICE.set(_service)
+    try:
+        yield _service
+    finally:
+        _ISOLATED_SERVICE.reset(_token)
+        _service.shutdown()
+
+
+def _derive_multifernet_key(key_params: KeyParameters) -> fernet.MultiFernet:
+    return _derivation_service().get_key__blocking(key_params)
+
+
+class _KeyDerivationService:
+    def __init__(self, *, cache_size: int, max_workers: int):
+        self._cache: TtlLruCache[KeyParameters, fernet.MultiFernet] = TtlLruCache(
+            maxsize=cache_size,
+            ttl_seconds=None,  # expire only by eviction
+        )
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="key-derivation",
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_progress = 0
+        self._derivations = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+
+    def get_key__blocking(self, key_params: KeyParameters) -> fernet.MultiFernet:
+        return self._cache.get_or_load__blocking(
+            key_params,
+            lambda: self._submit(key_params).result(),
+        )
+
+    async def get_key__async(self, key_params: KeyParameters) -> fernet.MultiFernet:
+        return await self._cache.get_or_load(
+            key_params,
+            lambda: asyncio.wrap_future(self._submit(key_params)),
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+    def stats(self) -> KeyDerivationStats:
+        with self._lock:
+            return KeyDerivationStats(
+                derivations=self._derivations,
+                total_seconds=self._total_seconds,
+                max_seconds=self._max_seconds,
+                queue_depth=self._queued,
+                in_progress=self._in_progress,
+                cache=self._cache.stats(),
             )
-        ]
+
+    def _submit(self, key_params: KeyParameters) -> concurrent.futures.Future:
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._derive, key_params)
+
+    def _derive(self, key_params: KeyParameters) -> fernet.MultiFernet:
+        with self._lock:
+            self._queued -= 1
+            self._in_progress += 1
+        _start = time.perf_counter()
+        try:
+            # https://cryptography.io/en/latest/fernet/#cryptography.fernet.MultiFernet
+            return fernet.MultiFernet(
+                [
+                    _derive_fernet_key(_secret, key_params)
+                    for _secret in (
+                        settings.GRAVYVALET_ENCRYPT_SECRET,
+                        *settings.GRAVYVALET_ENCRYPT_SECRET_PRIORS,
+                    )
+                ]
+            )
+        finally:
+            _seconds = time.perf_counter() - _start
+            with self._lock:
+                self._in_progress -= 1
+                self._derivations += 1
+                self._total_seconds += _seconds
+                self._max_seconds = max(self._max_seconds, _seconds)
+
+
+_ISOLATED_SERVICE: contextvars.ContextVar[_KeyDerivationService | None] = (
+    contextvars.ContextVar("_ISOLATED_SERVICE", default=None)
+)
+
+
+def _derivation_service() -> _KeyDerivationService:
+    return _ISOLATED_SERVICE.get() or _process_derivation_service()
+
+
+@functools.cache  # one per process
+def _process_derivation_service() -> _KeyDerivationService:
+    return _KeyDerivationService(
+        cache_size=settings.GRAVYVALET_DERIVED_KEY_CACHE_SIZE,
+        max_workers=settings.GRAVYVALET_KEY_DERIVATION_WORKERS,
     )
 
 
@@ -1,8 +1,12 @@
+import functools
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 
 from addon_service.common.base_model import AddonsServiceBaseModel
 from addon_service.common.dibs import dibs
+from addon_service.common.local_cache import TtlLruCache
 from addon_toolkit.credentials import Credentials
 from addon_toolkit.json_arguments import json_for_dataclass
 
@@ -40,18 +44,26 @@ class ExternalCredentials(AddonsServiceBaseModel):
     @property
     def decrypted_credentials(self) -> Credentials:
         """Returns a Dataclass instance of the credentials for performing Addon Operations."""
-        return self.format.dataclass(**self._decrypted_json)
+        if self._state.adding:
+            return self._decrypt_credentials()
+        # (modified in the key, so other processes' updates are never mistaken for this)
+        return _decrypted_credentials_cache().get_or_load__blocking(
+            (self.pk, self.modified),
+            self._decrypt_credentials,
+        )
 
     @decrypted_credentials.setter
     def decrypted_credentials(self, value: Credentials):
+        self._forget_decrypted()
         self._decrypted_json = json_for_dataclass(value)
 
-    def rotate_encryption(self):
+    def rotate_encryption(self, *, salt_epoch: encryption.SaltEpoch | None = None):
         with dibs(self):
             self.encrypted_json, self._key_parameters = (
                 encryption.pls_rotate_encryption(
                     encrypted=self.encrypted_json,
                     stored_params=self._key_parameters,
+                    salt_epoch=salt_epoch,
                 )
             )
             self.save()
@@ -59,6 +71,14 @@ class ExternalCredentials(AddonsServiceBaseModel):
     ###
     # private encryption-related methods
 
+    def _decrypt_credentials(self) -> Credentials:
+        return self.format.dataclass(**self._decrypted_json)
+
+    def _forget_decrypted(self) -> None:
+        _decrypted_credentials_cache().invalidate_where(
+            lambda _key, _: _key[0] == self.pk
+        )
+
     @property
     def _decrypted_json(self):
         return encryption.pls_decrypt_json(self.encrypted_json, self._key_parameters)
@@ -104,6 +124,10 @@ class ExternalCredentials(AddonsServiceBaseModel):
             return None
         return self.authorized_accounts[0].external_service.credentials_format
 
+    def save(self, *args, **kwargs):
+        self._forget_decrypted()  # (also when called by `rotate_encryption`)
+        super().save(*args, **kwargs)
+
     def clean_fields(self, *args, **kwargs):
         super().clean_fields(*args, **kwargs)
         self._validate_credentials()
@@ -112,6 +136,20 @@ class ExternalCredentials(AddonsServiceBaseModel):
         if not self.authorized_accounts:
             return
         try:
-            self.decrypted_credentials
+            self._decrypt_credentials()  # (not cached -- not yet saved)
         except TypeError as e:
             raise ValidationError(e)
+
+
+###
+# module-private helpers
+
+
+@functools.cache  # one cache per process
+def _decrypted_credentials_cache() -> TtlLruCache[tuple[str, object], Credentials]:
+    # decrypted credentials stay in local memory only (TtlLruCache refuses to
+    # be pickled, and its repr shows only stats)
+    return TtlLruCache(
+        maxsize=settings.GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_SIZE,
+        ttl_seconds=settings.GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_TTL_SECONDS,
+    )
@@ -0,0 +1,221 @@
+"""rotate credentials encryption in batches (rather than one row at a time)
+
+each batch claims a chunk of rows (skipping rows locked by other batches),
+re-encrypts them on a worker pool -- grouped by key parameters, so each derived
+key is used for many rows -- and writes them back in one `bulk_update`.
+
+batches go in pk order; the last pk of a batch is a checkpoint to resume from
+(and rotated rows get a fresh `modified`, so are not selected again)
+
+with GRAVYVALET_MAX_ROWS_PER_SALT set, rows re-encrypted in the same batch share
+fresh salts (see `encryption.SaltEpoch` for the tradeoff)
+"""
+
+import collections
+import concurrent.futures
+import dataclasses
+import datetime
+import functools
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import encryption
+from .models import ExternalCredentials
+
+
+__all__ = (
+    "RotationBatch",
+    "RotationProgress",
+    "count_remaining",
+    "rotate_batch",
+    "rotate_in_batches",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class RotationBatch:
+    last_pk: str  # checkpoint: resume after this pk
+    rotated: int
+    failed: int
+    derived_key_count: int  # distinct key parameters in the batch
+    fresh_salt_count: int  # (only counted with a max rows per salt)
+
+
+@dataclasses.dataclass(frozen=True)
+class RotationProgress:
+    rotated: int
+    failed: int
+    remaining: int  # (counted at the start, less rows in each batch since)
+    elapsed_seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.rotated / self.elapsed_seconds) if self.elapsed_seconds else 0.0
+
+    @property
+    def eta_seconds(self) -> float | None:
+        _rate = self.rows_per_second
+        return (self.remaining / _rate) if _rate else None
+
+    def __str__(self):
+        _eta = "?" if self.eta_seconds is None else f"{self.eta_seconds:.0f}s"
+        return f"rotated {self.rotated} ({self.failed} failed, {self.remaining} remaining) at {self.rows_per_second:.1f} rows/s, eta {_eta}"
+
+
+def rotate_batch(
+    *,
+    earlier_than: datetime.datetime,
+    after_pk: str = "",
+    batch_size: int | None = None,
+    max_workers: int | None = None,
+    max_rows_per_salt: int | None = None,
+) -> RotationBatch | None:
+    """rotate encryption for one batch of credentials last modified before `earlier_than`
+
+    returns None if there's nothing (unlocked) left to rotate
+    """
+    if batch_size is None:
+        batch_size = settings.GRAVYVALET_ROTATION_BATCH_SIZE
+    if max_workers is None:
+        max_workers = settings.GRAVYVALET_ROTATION_WORKERS
+    if max_rows_per_salt is None:
+        max_rows_per_salt = settings.GRAVYVALET_MAX_ROWS_PER_SALT
+    _salt_epoch = (
+        encryption.SaltEpoch(max_rows=max_rows_per_salt)
+        if max_rows_per_salt > 0
+        else None
+    )
+    _rotate_row = functools.partial(_try_rotate_row, salt_epoch=_salt_epoch)
+    with transaction.atomic():
+        _rows = list(
+            _rotatable(earlier_than, after_pk)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")[:batch_size]
+        )
+        if not _rows:
+            return None
+        _rows_by_params: dict[encryption.KeyParameters, list[ExternalCredentials]] = (
+            collections.defaultdict(list)
+        )
+        for _row in _rows:
+            _rows_by_params[_row._key_parameters].append(_row)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="key-rotation",
+        ) as _executor:
+            _rotated = [
+                _row
+                for _row in _executor.map(
+                    _rotate_row,  # (all at once, in groups sharing key parameters)
+                    [_row for _group in _rows_by_params.values() for _row in _group],
+                )
+                if _row is not None
+            ]
+        _now = timezone.now()
+        for _row in _rotated:
+            _row.modified = _now  # (bulk_update skips `save`)
+        ExternalCredentials.objects.bulk_update(
+            _rotated,
+            fields=[
+                "encrypted_json",
+                "_salt",
+                "_scrypt_block_size",
+                "_scrypt_cost_log2",
+                "_scrypt_parallelization",
+                "modified",
+            ],
+        )
+    for _row in _rotated:
+        _row._forget_decrypted()
+    return RotationBatch(
+        last_pk=_rows[-1].pk,
+        rotated=len(_rotated),
+        failed=len(_rows) - len(_rotated),
+        derived_key_count=len(_rows_by_params),
+        fresh_salt_count=(0 if _salt_epoch is None else _salt_epoch.salt_count),
+    )
+
+
+def count_remaining(*, earlier_than: datetime.datetime, after_pk: str = "") -> int:
+    return _rotatable(earlier_than, after_pk).count()
+
+
+def rotate_in_batches(
+    *,
+    earlier_than: datetime.datetime | None = None,
+    after_pk: str = "",
+    batch_size: int | None = None,
+    max_workers: int | None = None,
+    max_rows_per_salt: int | None = None,
+) -> RotationProgress:
+    """rotate encryption for all credentials last modified before `earlier_than`
+    (default now), one batch after another, logging progress
+
+    (remaining rows are counted once, up front)
+    """
+    if earlier_than is None:
+        earlier_than = timezone.now()
+    _start = time.monotonic()
+    _rotated = _failed = 0
+    _progress = RotationProgress(
+        rotated=0,
+        failed=0,
+        remaining=count_remaining(earlier_than=earlier_than, after_pk=after_pk),
+        elapsed_seconds=0.0,
+    )
+    while True:
+        _batch = rotate_batch(
+            earlier_than=earlier_than,
+            after_pk=after_pk,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            max_rows_per_salt=max_rows_per_salt,
+        )
+        if _batch is None:
+            break
+        after_pk = _batch.last_pk
+        _rotated += _batch.rotated
+        _failed += _batch.failed
+        _progress = RotationProgress(
+            rotated=_rotated,
+            failed=_failed,
+            remaining=max(0, _progress.remaining - _batch.rotated - _batch.failed),
+            elapsed_seconds=time.monotonic() - _start,
+        )
+        _logger.info("key rotation (checkpoint %s): %s", after_pk, _progress)
+    return _progress
+
+
+###
+# module-private helpers
+
+
+def _rotatable(earlier_than: datetime.datetime, after_pk: str):
+    _queryset = ExternalCredentials.objects.filter(modified__lte=earlier_than)
+    if after_pk:
+        _queryset = _queryset.filter(pk__gt=after_pk)
+    return _queryset
+
+
+def _try_rotate_row(
+    row: ExternalCredentials,
+    *,
+    salt_epoch: encryption.SaltEpoch | None,
+) -> ExternalCredentials | None:
+    try:
+        row.encrypted_json, row._key_parameters = encryption.pls_rotate_encryption(
+            encrypted=bytes(row.encrypted_json),
+            stored_params=row._key_parameters,
+            salt_epoch=salt_epoch,
+        )
+    except Exception:
+        _logger.exception("could not rotate encryption for %r", row)
+        return None
+    return row
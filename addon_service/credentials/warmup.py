@@ -0,0 +1,110 @@
+"""pre-derive encryption keys at process start, so early requests need not wait
+
+(when GRAVYVALET_WARMUP_AT_STARTUP is set, `/v1/status/` answers 503 until warm)
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import encryption
+from .models import ExternalCredentials
+
+
+__all__ = (
+    "is_warm",
+    "start_warmup",
+    "warm_derived_key_cache",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+def warm_derived_key_cache(*, limit: int | None = None) -> int:
+    """derive keys for the most recently modified credentials' key parameters
+
+    derives (up to the cache size) in parallel, on the key-derivation worker pool;
+    returns the count of distinct key parameters
+    """
+    _key_params = _recent_key_parameters(
+        settings.GRAVYVALET_DERIVED_KEY_CACHE_SIZE if limit is None else limit
+    )
+    asyncio.run(_derive_all(_key_params))
+    return len(_key_params)
+
+
+def start_warmup() -> None:
+    """start warming up in a background thread (only once per process)"""
+    with _WARMUP_LOCK:
+        if _WARMUP_STARTED.is_set():
+            return
+        _WARMUP_STARTED.set()
+    threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+
+
+def is_warm() -> bool:
+    return _WARMUP_DONE.is_set()
+
+
+###
+# module-private helpers
+
+_WARMUP_LOCK = threading.Lock()
+_WARMUP_STARTED = threading.Event()
+_WARMUP_DONE = threading.Event()
+
+
+def _warm_up() -> None:
+    _start = time.perf_counter()
+    try:
+        _count = warm_derived_key_cache()
+    except Exception:
+        # best effort -- better to serve (slowly) than never be ready
+        _logger.exception("warmup failed")
+    else:
+        _logger.info(
+            "warmup: derived %s keys in %.2fs (%r)",
+            _count,
+            time.perf_counter() - _start,
+            encryption.key_derivation_stats(),
+        )
+    finally:
+        connection.close()  # (this thread's own connection)
+        _WARMUP_DONE.set()
+
+
+def _recent_key_parameters(limit: int) -> list[encryption.KeyParameters]:
+    _key_params: dict[encryption.KeyParameters, None] = {}  # (ordered set)
+    _rows = (
+        ExternalCredentials.objects.order_by("-modified")
+        .values_list(
+            "_salt",
+            "_scrypt_cost_log2",
+            "_scrypt_block_size",
+            "_scrypt_parallelization",
+        )
+        .iterator()
+    )
+    for _salt, _cost_log2, _block_size, _parallelization in _rows:
+        if len(_key_params) >= limit:
+            break
+        _key_params[
+            encryption.KeyParameters(
+                salt=bytes(_salt),
+                scrypt_cost_log2=_cost_log2,
+                scrypt_block_size=_block_size,
+                scrypt_parallelization=_parallelization,
+            )
+        ] = None
+    return list(_key_params)
+
+
+async def _derive_all(key_params: list[encryption.KeyParameters]) -> None:
+    await asyncio.gather(
+        *(encryption.derive_multifernet_key__async(_params) for _params in key_params)
+    )
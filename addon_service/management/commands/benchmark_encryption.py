@@ -0,0 +1,62 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from addon_service.credentials import encryption
+from addon_service.credentials.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    """benchmark credentials encryption across a grid of key parameters and cache sizes
+
+    prints one row per grid point (as csv, or json lines with --json);
+    run on production-like hardware when choosing GRAVYVALET_SCRYPT_* settings
+    """
+
+    def add_arguments(self, parser):
+        _defaults = encryption.KeyParameters()
+        parser.add_argument(
+            "--cost-log2",
+            type=int,
+            nargs="+",
+            default=[_defaults.scrypt_cost_log2],
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            nargs="+",
+            default=[_defaults.scrypt_block_size],
+        )
+        parser.add_argument(
+            "--parallelization",
+            type=int,
+            nargs="+",
+            default=[_defaults.scrypt_parallelization],
+        )
+        parser.add_argument("--cache-size", type=int, nargs="+", default=[0, 1, 64])
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--distinct-salts", type=int, default=4)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        _results = run_benchmarks(
+            cost_log2_grid=options["cost_log2"],
+            block_size_grid=options["block_size"],
+            parallelization_grid=options["parallelization"],
+            cache_sizes=options["cache_size"],
+            iterations=options["iterations"],
+            distinct_salts=options["distinct_salts"],
+        )
+        _writer = None
+        for _result in _results:
+            _row = _result.as_row()
+            if options["json"]:
+                self.stdout.write(json.dumps(_row))
+                continue
+            if _writer is None:
+                _writer = csv.DictWriter(
+                    self.stdout, fieldnames=list(_row), lineterminator="\n"
+                )
+                _writer.writeheader()
+            _writer.writerow(_row)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:47
+
+from django.db import (
+    migrations,
+    models,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("addon_service", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="addonoperationinvocation",
+            name="result_from_cache",
+            field=models.BooleanField(default=False),
+        ),
+    ]
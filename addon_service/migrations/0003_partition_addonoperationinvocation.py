@@ -0,0 +1,135 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:59
+
+import datetime
+
+from django.db import (
+    migrations,
+    models,
+)
+
+
+_TABLE = "addon_service_addonoperationinvocation"
+_MONTHS_AHEAD = 3  # (more created by addon_service.tasks.partition_maintenance)
+
+
+def _partition_by_created(apps, schema_editor):
+    """rebuild the table partitioned by range on `created`, one partition per month"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as _cursor:
+        _cursor.execute(f"SELECT min(created) FROM {_TABLE}")
+        (_earliest,) = _cursor.fetchone()
+        _rebuild_table(
+            _cursor,
+            partition_clause="PARTITION BY RANGE (created)",
+            primary_key="(id, created)",  # (must include the partition key)
+            create_partitions=lambda: _create_monthly_partitions(
+                _cursor, since=(_earliest or datetime.datetime.now(datetime.UTC))
+            ),
+        )
+
+
+def _unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as _cursor:
+        _rebuild_table(
+            _cursor,
+            partition_clause="",
+            primary_key="(id)",
+            create_partitions=lambda: None,
+        )
+
+
+def _rebuild_table(cursor, *, partition_clause, primary_key, create_partitions):
+    _old = f"{_TABLE}_old"
+    # remember indexes and foreign keys, to recreate on the new table
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s"
+        " AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE contype = 'p')",
+        [_TABLE],
+    )
+    _indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+        " WHERE conrelid = %s::regclass AND contype IN ('f', 'p')",
+        [_TABLE],
+    )
+    _constraints = cursor.fetchall()
+    cursor.execute(f"ALTER TABLE {_TABLE} RENAME TO {_old}")
+    for _index_name, _ in _indexes:
+        cursor.execute(f"DROP INDEX {_index_name}")
+    for _constraint_name, _ in _constraints:
+        cursor.execute(f"ALTER TABLE {_old} DROP CONSTRAINT {_constraint_name}")
+    cursor.execute(
+        f"CREATE TABLE {_TABLE} (LIKE {_old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        f" {partition_clause}"
+    )
+    cursor.execute(f"ALTER TABLE {_TABLE} ADD PRIMARY KEY {primary_key}")
+    create_partitions()
+    # copy rows before adding indexes and foreign keys (faster, and no pending triggers)
+    cursor.execute(f"INSERT INTO {_TABLE} SELECT * FROM {_old}")
+    cursor.execute(f"DROP TABLE {_old}")
+    for _, _index_definition in _indexes:  # (named for the original table)
+        cursor.execute(_index_definition)
+    for _constraint_name, _constraint_definition in _constraints:
+        if not _constraint_definition.startswith("PRIMARY KEY"):
+            cursor.execute(
+                f"ALTER TABLE {_TABLE} ADD CONSTRAINT {_constraint_name} {_constraint_definition}"
+            )
+
+
+def _create_monthly_partitions(cursor, *, since):
+    cursor.execute(f"CREATE TABLE {_TABLE}_default PARTITION OF {_TABLE} DEFAULT")
+    _month = since.date().replace(day=1)
+    _last = _add_months(datetime.date.today().replace(day=1), _MONTHS_AHEAD)
+    while _month <= _last:
+        _next = _add_months(_month, 1)
+        cursor.execute(
+            f"CREATE TABLE {_TABLE}_p{_month:%Y%m} PARTITION OF {_TABLE}"
+            " FOR VALUES FROM (%s) TO (%s)",
+            [
+                datetime.datetime.combine(_month, datetime.time(), datetime.UTC),
+                datetime.datetime.combine(_next, datetime.time(), datetime.UTC),
+            ],
+        )
+        _month = _next
+
+
+def _add_months(month, months):
+    _years, _month_index = divmod(month.month - 1 + months, 12)
+    return month.replace(year=month.year + _years, month=_month_index + 1, day=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("addon_service", "0002_addonoperationinvocation_result_from_cache"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="addonoperationinvocation",
+            name="addon_servi_operati_4bdf63_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="addonoperationinvocation",
+            name="addon_servi_excepti_35dee4_idx",
+        ),
+        migrations.RunPython(_partition_by_created, _unpartition),
+        migrations.AddIndex(
+            model_name="addonoperationinvocation",
+            index=models.Index(
+                fields=["operation_identifier", "created"],
+                name="addon_servi_operati_ad3b20_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="addonoperationinvocation",
+            index=models.Index(
+                condition=models.Q(("exception_type", ""), _negated=True),
+                fields=["exception_type"],
+                name="addon_servi_failed_excepti_idx",
+            ),
+        ),
+    ]
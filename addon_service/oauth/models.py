@@ -12,7 +12,10 @@ from django.utils import timezone
 from addon_service.common.base_model import AddonsServiceBaseModel
 from addon_toolkit.credentials import AccessTokenCredentials
 
-from .utils import FreshTokenResult
+from .utils import (
+    FreshTokenResult,
+    expires_soon,
+)
 
 
 class OAuth2ClientConfig(AddonsServiceBaseModel):
@@ -106,9 +109,11 @@ class OAuth2TokenMetadata(AddonsServiceBaseModel):
                 "OAuth2 Token Metadata is linked to mulitple services/clients"
             )
 
-    @sync_to_async
+    def access_token_expires_soon(self) -> bool:
+        return expires_soon(self.access_token_expiration)
+
     @transaction.atomic
-    def update_with_fresh_token(
+    def update_with_fresh_token__blocking(
         self, fresh_token_result: FreshTokenResult
     ):  # -> tuple[AuthorizedStorageAccount, ...]
         # update this record's fields
@@ -133,6 +138,8 @@ class OAuth2TokenMetadata(AddonsServiceBaseModel):
             _account.save()
         return _accounts
 
+    update_with_fresh_token = sync_to_async(update_with_fresh_token__blocking)
+
     class Meta:
         verbose_name = "OAuth2 Token Metadata"
         verbose_name_plural = "OAuth2 Token Metadata"
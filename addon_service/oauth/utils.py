@@ -1,8 +1,12 @@
 import dataclasses
+import datetime
 from http import HTTPStatus
 from secrets import token_urlsafe
 from typing import Iterable
 
+from django.conf import settings
+from django.utils import timezone
+
 from addon_service.common.aiohttp_session import get_singleton_client_session
 from addon_toolkit.iri_utils import iri_with_query
 
@@ -54,6 +58,17 @@ def build_auth_url(
     return iri_with_query(auth_uri, query_params)
 
 
+def expires_soon(expiration: datetime.datetime | None) -> bool:
+    """whether the given expiration is past or within OAUTH_TOKEN_REFRESH_SKEW_SECONDS
+
+    (an expiration of None means it never expires)
+    """
+    if expiration is None:
+        return False
+    _skew = datetime.timedelta(seconds=settings.OAUTH_TOKEN_REFRESH_SKEW_SECONDS)
+    return expiration <= timezone.now() + _skew
+
+
 def generate_state_nonce(nonce_length: int = 16):
     return token_urlsafe(nonce_length)
 
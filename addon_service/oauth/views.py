@@ -4,7 +4,6 @@ from asgiref.sync import sync_to_async
 from django.db import transaction
 from django.http import HttpResponse
 
-from addon_service.common.aiohttp_session import get_singleton_client_session
 from addon_service.common.network import GravyvaletHttpRequestor
 from addon_service.models import (
     OAuth2ClientConfig,
@@ -53,7 +52,6 @@ async def _update_external_account_ids(accounts):
     for _account in accounts:
         _account.external_account_id = await _account.imp_cls.get_external_account_id(
             network=GravyvaletHttpRequestor(
-                client_session=await get_singleton_client_session(),
                 prefix_url=_account.external_service.api_base_url,
                 account=_account,
             ),
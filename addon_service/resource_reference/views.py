@@ -1,5 +1,8 @@
 from addon_service.common.permissions import SessionUserCanViewReferencedResource
 from addon_service.common.viewsets import RestrictedReadOnlyViewSet
+from addon_service.configured_storage_addon import (
+    serializers as configured_storage_addon_serializers,
+)
 from addon_service.serializers import ResourceReferenceSerializer
 
 from .models import ResourceReference
@@ -8,6 +11,16 @@ from .models import ResourceReference
 class ResourceReferenceViewSet(RestrictedReadOnlyViewSet):
     queryset = ResourceReference.objects.all()
     serializer_class = ResourceReferenceSerializer
+    select_for_related = {
+        "configured_storage_addons": (
+            configured_storage_addon_serializers.SELECT_FOR_SERIALIZING
+        ),
+    }
+    query_budget = {
+        "list": 4,
+        "retrieve": 3,
+        "retrieve_related": 4,
+    }
     permission_classes = [SessionUserCanViewReferencedResource]
     # Satisfies requirements of `RestrictedReadOnlyViewSet.list`
     required_list_filter_fields = ("resource_uri",)
@@ -2,6 +2,8 @@ from . import (
     invocation,
     key_rotation,
     osf_backchannel,
+    partition_maintenance,
+    token_refresh,
 )
 
 
@@ -9,4 +11,6 @@ __all__ = (
     "invocation",
     "key_rotation",
     "osf_backchannel",
+    "partition_maintenance",
+    "token_refresh",
 )
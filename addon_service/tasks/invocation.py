@@ -1,11 +1,38 @@
+import asyncio
+import datetime
+import random
+import typing
+
 import celery
-from asgiref.sync import sync_to_async
+from asgiref.sync import (
+    async_to_sync,
+    sync_to_async,
+)
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 
-from addon_service.addon_imp.instantiation import get_storage_addon_instance
+from addon_service.addon_imp.instantiation import (
+    pooled_storage_addon_instance,
+    pooled_storage_addon_instance__blocking,
+)
+from addon_service.addon_operation_invocation import (
+    audit_sink,
+    result_cache,
+)
 from addon_service.common.dibs import dibs
+from addon_service.common.exceptions import ExternalServiceBusy
 from addon_service.common.invocation_status import InvocationStatus
-from addon_service.models import AddonOperationInvocation
+from addon_service.common.unit_of_work import unit_of_work
+from addon_service.models import (
+    AddonOperationInvocation,
+    AuthorizedStorageAccount,
+)
+from addon_toolkit import InvocationPersistence
+from addon_toolkit.interfaces.storage import (
+    StorageAddonImp,
+    StorageConfig,
+)
 from addon_toolkit.json_arguments import json_for_typed_value
 
 
@@ -13,41 +40,195 @@ __all__ = (
     "perform_invocation__async",
     "perform_invocation__blocking",
     "perform_invocation__celery",
+    "perform_invocations__blocking",
+    "save_failed_invocation__blocking",
 )
 
 
 def perform_invocation__blocking(invocation: AddonOperationInvocation) -> None:
     # implemented as a sync function for django transactions
-    with dibs(invocation):  # TODO: handle dibs errors
+    if result_cache.use_cached_result(invocation):
+        _save_if_persisted(invocation)
+        return
+    if invocation._state.adding and (
+        audit_sink.enabled() or not _always_persisted(invocation)
+    ):
+        # saved (if at all) only once done -- no need for dibs
+        with unit_of_work():
+            try:
+                _invoke__blocking(invocation)
+            except BaseException as _e:
+                invocation.set_exception(_e)
+                raise
+            finally:
+                _save_if_persisted(invocation)
+                result_cache.after_invocation(invocation)
+        return
+    if invocation._state.adding:
+        invocation.save()
+    _error: BaseException | None = None
+    with unit_of_work(), dibs(invocation):  # TODO: handle dibs errors
         try:
-            _imp = get_storage_addon_instance(
-                invocation.imp_cls,  # type: ignore[arg-type]  #(TODO: generic impstantiation)
-                invocation.thru_account,
-                invocation.storage_imp_config(),
-            )
-            _operation = invocation.operation
-            # inner transaction to contain database errors,
-            # so status can be saved in the outer transaction (from `dibs`)
-            with transaction.atomic():
-                _result = _imp.invoke_operation__blocking(
-                    _operation.declaration,
-                    invocation.operation_kwargs,
-                )
-            invocation.operation_result = json_for_typed_value(
-                _operation.declaration.result_dataclass,
-                _result,
-            )
-            invocation.invocation_status = InvocationStatus.SUCCESS
+            _invoke__blocking(invocation)
         except BaseException as _e:
             invocation.set_exception(_e)
-            raise  # TODO: or swallow?
-        finally:
-            invocation.save()
+            _error = _e  # (raised once out of `dibs`, so the error status is saved)
+        invocation.save()
+        result_cache.after_invocation(invocation)
+    if _error is not None:
+        raise _error
 
 
 perform_invocation__async = sync_to_async(perform_invocation__blocking)
 
 
-@celery.shared_task(acks_late=True)
-def perform_invocation__celery(invocation_pk: str) -> None:
-    perform_invocation__blocking(AddonOperationInvocation.objects.get(pk=invocation_pk))
+def perform_invocations__blocking(
+    invocations: typing.Sequence[AddonOperationInvocation],
+) -> None:
+    """perform new (unsaved) invocations thru the same account and addon, concurrently
+
+    each invocation's error (if any) is recorded on it, not raised; once all are
+    done, the invocations are saved together (those to be saved, per each
+    operation's `persistence`)
+    """
+    _to_perform = [
+        _invocation
+        for _invocation in invocations
+        if not result_cache.use_cached_result(_invocation)
+    ]
+    if _to_perform:
+        _first = _to_perform[0]
+        assert all(
+            (_invocation.thru_account_id, _invocation.thru_addon_id)
+            == (_first.thru_account_id, _first.thru_addon_id)
+            for _invocation in _to_perform
+        )
+        with transaction.atomic():
+            async_to_sync(_perform_concurrently)(
+                _to_perform,
+                _first.imp_cls,
+                _first.thru_account,
+                _first.storage_imp_config(),
+            )
+    _now = timezone.now()
+    for _invocation in invocations:
+        _invocation.created = _invocation.modified = _now
+    _to_save = [
+        _invocation for _invocation in invocations if _should_persist(_invocation)
+    ]
+    if audit_sink.enabled():
+        audit_sink.record(_to_save)
+    else:
+        AddonOperationInvocation.objects.bulk_create(_to_save)
+    result_cache.after_invocations(_to_perform)
+
+
+def save_failed_invocation__blocking(invocation: AddonOperationInvocation) -> None:
+    """save a failed invocation (per its operation's `persistence`) anew
+
+    for use once the transaction it was performed in has rolled back -- as when
+    its error propagates out of a request (see `AddonOperationInvocationViewSet`)
+    """
+    invocation._state.adding = True  # (any earlier save was rolled back)
+    _save_if_persisted(invocation)
+
+
+@celery.shared_task(bind=True, acks_late=True)
+def perform_invocation__celery(
+    task: celery.Task, invocation_pk: str, invocation_created: str | None = None
+) -> None:
+    _lookup: dict[str, typing.Any] = {"pk": invocation_pk}
+    if invocation_created is not None:  # (to look in only one partition)
+        _lookup["created"] = datetime.datetime.fromisoformat(invocation_created)
+    _invocation = AddonOperationInvocation.objects.get(**_lookup)
+    try:
+        # (each outbound request holds a slot of the external service's limit)
+        perform_invocation__blocking(_invocation)
+    except ExternalServiceBusy as _e:
+        raise task.retry(exc=_e, countdown=settings.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS)
+
+
+###
+# module-private helpers
+
+
+def _invoke__blocking(invocation: AddonOperationInvocation) -> None:
+    _declaration = invocation.operation.declaration
+    # inner transaction to contain database errors,
+    # so status can be saved in the outer transaction (from `dibs`)
+    with (
+        pooled_storage_addon_instance__blocking(
+            invocation.imp_cls,  # type: ignore[arg-type]  #(TODO: generic impstantiation)
+            invocation.thru_account,
+            invocation.storage_imp_config(),
+        ) as _imp,
+        transaction.atomic(),
+    ):
+        _result = _imp.invoke_operation__blocking(
+            _declaration,
+            invocation.operation_kwargs,
+        )
+    invocation.operation_result = json_for_typed_value(
+        _declaration.result_dataclass,
+        _result,
+    )
+    invocation.invocation_status = InvocationStatus.SUCCESS
+
+
+def _always_persisted(invocation: AddonOperationInvocation) -> bool:
+    return invocation.operation.declaration.persistence is InvocationPersistence.ALWAYS
+
+
+def _should_persist(invocation: AddonOperationInvocation) -> bool:
+    """whether to save a finished invocation, per its operation's `persistence`"""
+    match invocation.operation.declaration.persistence:
+        case InvocationPersistence.ALWAYS:
+            return True
+        case InvocationPersistence.ON_ERROR:
+            return invocation.invocation_status is InvocationStatus.ERROR
+        case InvocationPersistence.SAMPLED:
+            return (
+                invocation.invocation_status is InvocationStatus.ERROR
+                or random.random() < settings.GRAVYVALET_INVOCATION_SAMPLE_RATE
+            )
+        case InvocationPersistence.NEVER:
+            return False
+
+
+def _save_if_persisted(invocation: AddonOperationInvocation) -> None:
+    if not invocation._state.adding:
+        invocation.save()
+    elif not _should_persist(invocation):
+        # not saved, but respond with timestamps like any other
+        invocation.created = invocation.modified = timezone.now()
+    elif audit_sink.enabled():
+        audit_sink.record([invocation])  # (saved soon, in a batch)
+    else:
+        invocation.save()
+
+
+async def _perform_concurrently(
+    invocations: typing.Sequence[AddonOperationInvocation],
+    imp_cls: type[StorageAddonImp],
+    account: AuthorizedStorageAccount,
+    config: StorageConfig,
+) -> None:
+    # one imp for all (the batch is one borrower), a few operations at a time
+    _limit = asyncio.Semaphore(settings.GRAVYVALET_BATCH_INVOCATION_CONCURRENCY)
+    async with pooled_storage_addon_instance(imp_cls, account, config) as _imp:
+
+        async def _perform(invocation: AddonOperationInvocation) -> None:
+            async with _limit:
+                _declaration = invocation.operation.declaration
+                try:
+                    _result = await _imp.invoke_operation(
+                        _declaration, invocation.operation_kwargs
+                    )
+                    invocation.operation_result = json_for_typed_value(
+                        _declaration.result_dataclass, _result
+                    )
+                    invocation.invocation_status = InvocationStatus.SUCCESS
+                except Exception as _e:
+                    invocation.set_exception(_e)
+
+        await asyncio.gather(*map(_perform, invocations))
@@ -1,10 +1,16 @@
 import datetime
+import logging
+import time
 
 import celery
 
+from addon_service.credentials import rotation
 from addon_service.credentials.models import ExternalCredentials
 
 
+_logger = logging.getLogger(__name__)
+
+
 def schedule_encryption_rotation(earlier_than: datetime.datetime | None = None):
     _pks = ExternalCredentials.objects.filter(
         modified__lte=(earlier_than or datetime.datetime.now(tz=datetime.UTC))
@@ -13,6 +19,25 @@ def schedule_encryption_rotation(earlier_than: datetime.datetime | None = None):
         rotate_credentials_encryption__celery.apply_async([_credentials_pk])
 
 
+def schedule_batched_encryption_rotation(
+    earlier_than: datetime.datetime | None = None,
+    *,
+    chain_count: int = 1,
+):
+    """rotate in batches, each task handling one batch then enqueuing the next
+
+    (with `chain_count` > 1, parallel chains of tasks skip each other's locked rows)
+    """
+    _earlier_than = earlier_than or datetime.datetime.now(tz=datetime.UTC)
+    for _ in range(chain_count):
+        rotate_encryption_batch__celery.apply_async(
+            kwargs={
+                "earlier_than": _earlier_than.isoformat(),
+                "started_at": time.time(),
+            }
+        )
+
+
 @celery.shared_task(acks_late=True)
 def schedule_encryption_rotation__celery(earlier_than: str = ""):
     schedule_encryption_rotation(
@@ -23,3 +48,43 @@ def schedule_encryption_rotation__celery(earlier_than: str = ""):
 @celery.shared_task(acks_late=True)
 def rotate_credentials_encryption__celery(credentials_pk: str):
     ExternalCredentials.objects.get(pk=credentials_pk).rotate_encryption()
+
+
+@celery.shared_task(acks_late=True)
+def rotate_encryption_batch__celery(
+    earlier_than: str,
+    started_at: float,
+    after_pk: str = "",
+    rotated: int = 0,
+    failed: int = 0,
+    remaining: int | None = None,
+):
+    _earlier_than = datetime.datetime.fromisoformat(earlier_than)
+    if remaining is None:  # (counted once, by the first task in the chain)
+        remaining = rotation.count_remaining(
+            earlier_than=_earlier_than, after_pk=after_pk
+        )
+    _batch = rotation.rotate_batch(earlier_than=_earlier_than, after_pk=after_pk)
+    if _batch is None:
+        _logger.info(
+            "batched key rotation done (%s rotated, %s failed)", rotated, failed
+        )
+        return
+    _progress = rotation.RotationProgress(
+        rotated=rotated + _batch.rotated,
+        failed=failed + _batch.failed,
+        remaining=max(0, remaining - _batch.rotated - _batch.failed),
+        elapsed_seconds=time.time() - started_at,
+    )
+    _logger.info("batched key rotation (checkpoint %s): %s", _batch.last_pk, _progress)
+    # the next task's args are the checkpoint
+    rotate_encryption_batch__celery.apply_async(
+        kwargs={
+            "earlier_than": earlier_than,
+            "started_at": started_at,
+            "after_pk": _batch.last_pk,
+            "rotated": _progress.rotated,
+            "failed": _progress.failed,
+            "remaining": _progress.remaining,
+        }
+    )
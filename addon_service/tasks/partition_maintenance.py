@@ -0,0 +1,63 @@
+import dataclasses
+import logging
+
+import celery
+from django.conf import settings
+
+from addon_service.addon_operation_invocation import partitions
+
+
+__all__ = (
+    "PartitionMaintenanceReport",
+    "maintain_invocation_partitions",
+    "maintain_invocation_partitions__celery",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class PartitionMaintenanceReport:
+    created: list[str] = dataclasses.field(default_factory=list)
+    pruned: list[str] = dataclasses.field(default_factory=list)
+
+
+def maintain_invocation_partitions(
+    *,
+    months_ahead: int | None = None,
+    retention_months: int | None = None,
+    detach_only: bool | None = None,
+) -> PartitionMaintenanceReport:
+    """create upcoming monthly partitions of the invocation table; prune those past retention
+
+    (see `addon_service.addon_operation_invocation.partitions`)
+    """
+    if months_ahead is None:
+        months_ahead = settings.INVOCATION_PARTITIONS_AHEAD
+    if retention_months is None:
+        retention_months = settings.INVOCATION_RETENTION_MONTHS
+    if detach_only is None:
+        detach_only = settings.INVOCATION_PARTITION_DETACH_ONLY
+    _report = PartitionMaintenanceReport()
+    if not partitions.is_partitioned():
+        _logger.warning("maintain_invocation_partitions: table not partitioned")
+        return _report
+    _report.created = [
+        _partition.name
+        for _partition in partitions.ensure_partitions(months_ahead=months_ahead)
+    ]
+    if retention_months > 0:
+        _report.pruned = [
+            _partition.name
+            for _partition in partitions.prune_partitions(
+                retention_months=retention_months, detach_only=detach_only
+            )
+        ]
+    _logger.info("maintain_invocation_partitions: %r", _report)
+    return _report
+
+
+@celery.shared_task(acks_late=True)
+def maintain_invocation_partitions__celery() -> dict:
+    return dataclasses.asdict(maintain_invocation_partitions())
@@ -0,0 +1,131 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import datetime
+import functools
+import itertools
+import logging
+
+import celery
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from addon_service.models import (
+    AuthorizedStorageAccount,
+    OAuth2TokenMetadata,
+)
+
+
+__all__ = (
+    "TokenRefreshReport",
+    "refresh_expiring_tokens",
+    "refresh_expiring_tokens__celery",
+)
+
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class TokenRefreshReport:
+    refreshed: int = 0
+    skipped: int = 0  # already refreshed elsewhere
+    failed: int = 0
+
+
+def refresh_expiring_tokens(
+    *,
+    within_seconds: float | None = None,
+    concurrency: int | None = None,
+    grace_seconds: float | None = None,
+    batch_size: int = 100,
+) -> TokenRefreshReport:
+    """refresh oauth2 access tokens that expire within the given window
+
+    (to spare interactive requests the wait; see also `GravyvaletHttpRequestor.do_send`)
+
+    tokens expired longer than `grace_seconds` ago are skipped -- if a refresh has
+    kept failing that long, it's left to be tried on demand
+    """
+    if within_seconds is None:
+        within_seconds = settings.OAUTH_TOKEN_SWEEP_WINDOW_SECONDS
+    if concurrency is None:
+        concurrency = settings.OAUTH_TOKEN_SWEEP_CONCURRENCY
+    if grace_seconds is None:
+        grace_seconds = settings.OAUTH_TOKEN_SWEEP_GRACE_SECONDS
+    _report = TokenRefreshReport()
+    _now = timezone.now()
+    _expiring_pks = (
+        OAuth2TokenMetadata.objects.filter(
+            refresh_token__isnull=False,
+            access_token_expiration__lte=(
+                _now + datetime.timedelta(seconds=within_seconds)
+            ),
+            access_token_expiration__gte=(
+                _now - datetime.timedelta(seconds=grace_seconds)
+            ),
+            authorized_storage_accounts__in=AuthorizedStorageAccount.objects.active(),
+        )
+        .distinct()
+        .values_list("pk", flat=True)
+    )
+    with contextlib.ExitStack() as _exit_stack:
+        if concurrency > 1:
+            _executor = _exit_stack.enter_context(
+                concurrent.futures.ThreadPoolExecutor(
+                    max_workers=concurrency,
+                    thread_name_prefix="token-refresh",
+                )
+            )
+            _map = functools.partial(_executor.map, _refresh_one_in_worker_thread)
+        else:  # all in this thread
+            _map = functools.partial(map, _refresh_one)
+        for _batch in itertools.batched(_expiring_pks.iterator(), batch_size):
+            for _refreshed in _map(_batch):
+                if _refreshed is None:
+                    _report.failed += 1
+                elif _refreshed:
+                    _report.refreshed += 1
+                else:
+                    _report.skipped += 1
+    _logger.info("refresh_expiring_tokens: %r", _report)
+    return _report
+
+
+@celery.shared_task(acks_late=True)
+def refresh_expiring_tokens__celery(within_seconds: float | None = None) -> dict:
+    return dataclasses.asdict(refresh_expiring_tokens(within_seconds=within_seconds))
+
+
+###
+# module-private helpers
+
+
+def _refresh_one(token_metadata_pk: str) -> bool | None:
+    # returns None on failure (after logging), otherwise whether refreshed
+    try:
+        _account = (
+            AuthorizedStorageAccount.objects.active()
+            .filter(oauth2_token_metadata_id=token_metadata_pk)
+            .select_related(
+                "external_storage_service__oauth2_client_config",
+                "oauth2_token_metadata",
+            )
+            .first()
+        )
+        if _account is None:  # deactivated in the meantime
+            return False
+        return _account.refresh_oauth_access_token__blocking()
+    except Exception:
+        _logger.exception(
+            "failed to refresh token (OAuth2TokenMetadata %s)", token_metadata_pk
+        )
+        return None
+
+
+def _refresh_one_in_worker_thread(token_metadata_pk: str) -> bool | None:
+    try:
+        return _refresh_one(token_metadata_pk)
+    finally:
+        connection.close()  # each worker thread has its own connection
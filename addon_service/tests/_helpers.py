@@ -1,5 +1,6 @@
 import contextlib
 import dataclasses
+import json
 import secrets
 from collections import defaultdict
 from http import HTTPStatus
@@ -162,11 +163,29 @@ class MockExternalService:
 @dataclasses.dataclass
 class _FakeAiohttpResponse:
     status: HTTPStatus = HTTPStatus.OK
-    data: dict | None = None
+    data: dict | list | None = None
+    headers: dict[str, str] = dataclasses.field(default_factory=dict)
 
     async def json(self):
         return self.data
 
+    async def read(self):
+        return json.dumps(self.data).encode()
+
+    @property
+    def content(self):
+        return _FakeStreamReader(json.dumps(self.data).encode())
+
+
+@dataclasses.dataclass
+class _FakeStreamReader:
+    body: bytes
+
+    async def iter_chunked(self, chunk_size: int):
+        for _start in range(0, len(self.body), chunk_size):
+            _end = _start + chunk_size
+            yield self.body[_start:_end]
+
 
 # TODO: use this more often in tests
 def jsonapi_ref(obj) -> dict:
@@ -1,7 +1,16 @@
+import addon_service.common.concurrency
 import addon_service.common.filtering
 import addon_service.common.jsonapi
+import addon_service.common.local_cache
+import addon_service.common.unit_of_work
 from addon_toolkit.tests._doctest import load_doctests
 
 
 # for some reason this variable name matters
-load_tests = load_doctests(addon_service.common.filtering, addon_service.common.jsonapi)
+load_tests = load_doctests(
+    addon_service.common.concurrency,
+    addon_service.common.filtering,
+    addon_service.common.jsonapi,
+    addon_service.common.local_cache,
+    addon_service.common.unit_of_work,
+)
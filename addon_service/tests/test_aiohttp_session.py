@@ -0,0 +1,125 @@
+import asyncio
+import http.server
+import threading
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from addon_service.common import aiohttp_session
+
+
+class TestSharedClientSession(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        aiohttp_session.close_singleton_client_session__blocking()
+        self.addCleanup(aiohttp_session.close_singleton_client_session__blocking)
+
+    def test_shared_across_loops(self):
+        _first = asyncio.run(aiohttp_session.get_singleton_client_session())
+        _second = async_to_sync(aiohttp_session.get_singleton_client_session)()
+        self.assertIs(_first, _second)
+        self.assertIs(_first.connector, _second.connector)
+        self.assertFalse(_first.closed)  # (still open after its loops are gone)
+
+    def test_connection_reused_across_async_to_sync(self):
+        _server = _KeepAliveServer()
+        self.addCleanup(_server.stop)
+
+        async def _get() -> bytes:
+            _session = await aiohttp_session.get_singleton_client_session()
+            async with _session.get(_server.url) as _response:
+                self.assertEqual(_response.status, 200)
+                return b"".join(
+                    [_chunk async for _chunk in _response.content.iter_chunked(2)]
+                )
+
+        self.assertEqual(async_to_sync(_get)(), b"hello")
+        self.assertEqual(async_to_sync(_get)(), b"hello")
+        self.assertEqual(_server.connection_count, 1)
+        _stats = aiohttp_session.client_session_stats()
+        self.assertEqual(_stats.open_sessions, 1)
+        self.assertEqual(_stats.connections_in_use, 0)
+        self.assertEqual(_stats.idle_connections, 1)
+
+    def test_streamed_request_body(self):
+        _server = _KeepAliveServer()
+        self.addCleanup(_server.stop)
+
+        async def _chunks():
+            for _chunk in (b"he", b"ll", b"o"):
+                await asyncio.sleep(0)  # (on the caller's loop)
+                yield _chunk
+
+        async def _post() -> str:
+            _session = await aiohttp_session.get_singleton_client_session()
+            async with _session.post(_server.url, data=_chunks()) as _response:
+                return await _response.text()
+
+        self.assertEqual(async_to_sync(_post)(), "posted 5 bytes")
+
+    def test_close(self):
+        async def _get_close_get():
+            _first = await aiohttp_session.get_singleton_client_session()
+            await aiohttp_session.close_singleton_client_session()
+            self.assertTrue(_first.closed)
+            self.assertEqual(aiohttp_session.client_session_stats().open_sessions, 0)
+            _second = await aiohttp_session.get_singleton_client_session()
+            self.assertIsNot(_first, _second)
+            self.assertFalse(_second.closed)
+
+        asyncio.run(_get_close_get())
+
+    def test_connector_settings(self):
+        async def _get_limits():
+            _connector = (
+                await aiohttp_session.get_singleton_client_session()
+            ).connector
+            return (_connector.limit, _connector.limit_per_host)
+
+        with self.settings(HTTP_POOL_LIMIT=7, HTTP_POOL_LIMIT_PER_HOST=3):
+            self.assertEqual(asyncio.run(_get_limits()), (7, 3))
+
+
+class _KeepAliveServer:
+    """local http/1.1 server that counts connections"""
+
+    def __init__(self):
+        self.connection_count = 0
+        _server = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # (keep connections alive)
+
+            def setup(self):
+                _server.connection_count += 1
+                super().setup()
+
+            def do_GET(self):
+                self._respond(b"hello")
+
+            def do_POST(self):
+                _body = b""
+                while (_size := int(self.rfile.readline().strip(), 16)) > 0:
+                    _body += self.rfile.read(_size)
+                    self.rfile.readline()
+                self.rfile.readline()
+                self._respond(f"posted {len(_body)} bytes".encode())
+
+            def _respond(self, body: bytes):
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}/"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -1,20 +1,41 @@
+import contextlib
 import dataclasses
+import itertools
 import json
 import typing
 from http import HTTPStatus
+from unittest import mock
 
+from django.db import transaction
 from django.urls import reverse
+from rest_framework.exceptions import NotFound
 from rest_framework.test import APITestCase
 
+from addon_imps.storage.my_blarg import MyBlargStorage
+from addon_service.addon_imp import instantiation
+from addon_service.addon_operation_invocation import (
+    audit_sink,
+    result_cache,
+)
 from addon_service.common.aiohttp_session import (
     close_singleton_client_session__blocking,
 )
 from addon_service.common.invocation_status import InvocationStatus
+from addon_service.common.local_cache import (
+    KeyedPool,
+    TtlLruCache,
+)
+from addon_service.models import AddonOperationInvocation
+from addon_service.tasks import invocation as invocation_tasks
 from addon_service.tests import _factories
 from addon_service.tests._helpers import (
     MockOSF,
     jsonapi_ref,
 )
+from addon_toolkit import (
+    AddonCapabilities,
+    InvocationPersistence,
+)
 
 
 @dataclasses.dataclass
@@ -70,6 +91,20 @@ class TestAddonOperationInvocationCreate(APITestCase):
         )
         self._mock_osf.configure_assumed_caller(self._owner_uri)
         self.enterContext(self._mock_osf.mocking())
+        self.enterContext(
+            mock.patch.object(
+                result_cache,
+                "_result_cache",
+                return_value=TtlLruCache(maxsize=64, ttl_seconds=None),
+            )
+        )
+        self.enterContext(
+            mock.patch.object(
+                instantiation,
+                "_imp_pool",
+                return_value=KeyedPool(max_idle=8, idle_seconds=60),
+            )
+        )
 
     @property
     def _resource_uri(self):
@@ -161,6 +196,376 @@ class TestAddonOperationInvocationCreate(APITestCase):
             self.assertEqual(_resp.status_code, HTTPStatus.CREATED)
             self._assert_invocation_response(_inv_case, _resp)
 
+    def test_cached_result(self):
+        _inv_case = self._INVOKE_SUCCESS_CASES[0]
+        _spy = self.enterContext(
+            mock.patch.object(
+                invocation_tasks,
+                "pooled_storage_addon_instance__blocking",
+                wraps=invocation_tasks.pooled_storage_addon_instance__blocking,
+            )
+        )
+        _first = self._post_invocation(_inv_case, thru_addon=self._configured_addon)
+        self._assert_invocation_response(_inv_case, _first)
+        self.assertFalse(_first.data["result_from_cache"])
+        # same arguments (defaults given explicitly, this time)
+        _same_case = dataclasses.replace(
+            _inv_case, operation_kwargs={"page_cursor": ""}
+        )
+        _second = self._post_invocation(_same_case, thru_addon=self._configured_addon)
+        self._assert_invocation_response(_inv_case, _second)
+        self.assertTrue(_second.data["result_from_cache"])
+        self.assertEqual(_spy.call_count, 1)
+        # different arguments
+        _other_case = dataclasses.replace(
+            _inv_case, operation_kwargs={"page_cursor": "2"}
+        )
+        _third = self._post_invocation(_other_case, thru_addon=self._configured_addon)
+        self.assertFalse(_third.data["result_from_cache"])
+        self.assertEqual(_spy.call_count, 2)
+        self.assertEqual(result_cache.result_cache_stats().size, 2)
+
+    def test_cached_result__update_forgets(self):
+        _inv_case = self._INVOKE_SUCCESS_CASES[0]
+        self._post_invocation(_inv_case, thru_addon=self._configured_addon)
+        _update = _factories.AddonOperationInvocationFactory(thru_account=self._account)
+        _update_operation = mock.Mock()
+        _update_operation.declaration.capability = AddonCapabilities.UPDATE
+        with mock.patch.object(
+            type(_update),
+            "operation",
+            mock.PropertyMock(return_value=_update_operation),
+        ):
+            result_cache.after_invocation(_update)
+        _resp = self._post_invocation(_inv_case, thru_addon=self._configured_addon)
+        self.assertFalse(_resp.data["result_from_cache"])
+
+    def test_cached_result__concurrent_update_forgets(self):
+        _read, _update = [
+            _factories.AddonOperationInvocationFactory.build(
+                thru_account=self._account,
+                thru_addon=self._configured_addon,
+                invocation_status=InvocationStatus.SUCCESS,
+                operation_result={"item_id": "foo", "item_name": "foo!"},
+            )
+            for _ in range(2)
+        ]
+        with mock.patch.object(
+            result_cache, "_is_update", side_effect=lambda _inv: _inv is _update
+        ):
+            # the update is listed first, but the read may have run before it
+            result_cache.after_invocations([_update, _read])
+            self.assertEqual(result_cache.result_cache_stats().size, 0)
+            result_cache.after_invocations([_read])
+            self.assertEqual(result_cache.result_cache_stats().size, 1)
+
+    def test_pooled_imp(self):
+        _inv_case = self._INVOKE_SUCCESS_CASES[0]
+        for _page_cursor in ("", "2", "3"):  # (no cached results)
+            _resp = self._post_invocation(
+                dataclasses.replace(
+                    _inv_case, operation_kwargs={"page_cursor": _page_cursor}
+                ),
+                thru_addon=self._configured_addon,
+            )
+            self._assert_invocation_response(_inv_case, _resp)
+            self.assertFalse(_resp.data["result_from_cache"])
+        _stats = instantiation.imp_pool_stats()
+        self.assertEqual((_stats.created, _stats.reused, _stats.idle), (1, 2, 1))
+        with self.subTest("saving the account leaves pooled imps unused"):
+            self._account.save()
+            self._post_invocation(
+                dataclasses.replace(_inv_case, operation_kwargs={"page_cursor": "4"}),
+                thru_addon=self._configured_addon,
+            )
+            self.assertEqual(instantiation.imp_pool_stats().created, 2)
+
+    def test_persistence(self):
+        _inv_case = self._INVOKE_SUCCESS_CASES[0]
+        with self.subTest("successful browsing not saved"):
+            _resp = self._post_invocation(_inv_case, thru_addon=self._configured_addon)
+            self._assert_invocation_response(_inv_case, _resp)
+            self.assertIsNotNone(_resp.data["created"])
+            self.assertFalse(AddonOperationInvocation.objects.exists())
+        with self.subTest("failed browsing saved"):
+            with (
+                mock.patch.object(
+                    MyBlargStorage, "list_root_items", side_effect=ValueError("no")
+                ),
+                self.assertRaises(ValueError),
+            ):
+                self._post_invocation(
+                    dataclasses.replace(
+                        _inv_case, operation_kwargs={"page_cursor": "2"}
+                    ),
+                    thru_addon=self._configured_addon,
+                )
+            (_saved,) = AddonOperationInvocation.objects.all()  # (not rolled back)
+            self.assertEqual(_saved.invocation_status, InvocationStatus.ERROR)
+            self.assertEqual(_saved.exception_type, "ValueError")
+        with self.subTest("always saved"):
+            _declaration = MyBlargStorage.get_operation_declaration("list_root_items")
+            self.enterContext(
+                mock.patch.dict(
+                    _declaration.__dict__, {"persistence": InvocationPersistence.ALWAYS}
+                )
+            )
+            _resp = self._post_invocation(
+                dataclasses.replace(_inv_case, operation_kwargs={"page_cursor": "3"}),
+                thru_addon=self._configured_addon,
+            )
+            self.assertTrue(
+                AddonOperationInvocation.objects.filter(pk=_resp.data["id"]).exists()
+            )
+
+    def test_persistence__handled_error(self):
+        # an error turned into a response (not raised) -- saved exactly once
+        _inv_case = self._INVOKE_SUCCESS_CASES[0]
+        _declaration = MyBlargStorage.get_operation_declaration("list_root_items")
+        self.enterContext(
+            mock.patch.object(
+                MyBlargStorage, "list_root_items", side_effect=NotFound("no")
+            )
+        )
+        for _persistence, _rollback in itertools.product(
+            (InvocationPersistence.ON_ERROR, InvocationPersistence.ALWAYS),
+            (True, False),
+        ):
+            with (
+                self.subTest(persistence=_persistence, rollback=_rollback),
+                mock.patch.dict(_declaration.__dict__, {"persistence": _persistence}),
+                (  # (an exception handler need not roll back)
+                    contextlib.nullcontext()
+                    if _rollback
+                    else mock.patch("rest_framework.views.set_rollback")
+                ),
+                self.captureOnCommitCallbacks(execute=True),
+            ):
+                AddonOperationInvocation.objects.all().delete()
+                _resp = self._post_invocation(
+                    dataclasses.replace(
+                        _inv_case,
+                        operation_kwargs={"page_cursor": f"{_persistence}{_rollback}"},
+                    ),
+                    thru_addon=self._configured_addon,
+                )
+                self.assertEqual(_resp.status_code, HTTPStatus.NOT_FOUND)
+                (_saved,) = AddonOperationInvocation.objects.all()
+                self.assertEqual(_saved.invocation_status, InvocationStatus.ERROR)
+                self.assertEqual(_saved.exception_type, "NotFound")
+
+    def test_audit_sink(self):
+        _sink = audit_sink.InvocationAuditSink(
+            max_pending=10, batch_size=5, flush_seconds=1, autostart=False
+        )
+        self.enterContext(
+            mock.patch.object(audit_sink, "_audit_sink", return_value=_sink)
+        )
+        _failing = _factories.AddonOperationInvocationFactory.build(
+            thru_account=self._account,
+            thru_addon=self._configured_addon,
+            by_user=_factories.UserReferenceFactory(),
+        )
+        with (
+            self.captureOnCommitCallbacks(execute=True),
+            mock.patch.object(
+                MyBlargStorage, "get_item_info", side_effect=ValueError("no")
+            ),
+            self.assertRaises(ValueError),
+        ):
+            invocation_tasks.perform_invocation__blocking(_failing)
+        with self.captureOnCommitCallbacks(execute=True):
+            _resp = self._post_batch(
+                [
+                    {
+                        "operation_name": "get_item_info",
+                        "operation_kwargs": {"item_id": _id},
+                    }
+                    for _id in "abc"
+                ],
+                thru_addon=self._configured_addon,
+            )
+        self.assertEqual(_resp.status_code, HTTPStatus.CREATED)
+        # not yet saved (successful browsing never is)
+        self.assertFalse(AddonOperationInvocation.objects.exists())
+        self.assertEqual(_sink.stats(), audit_sink.AuditSinkStats(1, 1, 0, 0))
+        _sink.drain()
+        (_saved,) = AddonOperationInvocation.objects.all()
+        self.assertEqual(_saved.pk, _failing.pk)
+        self.assertEqual(_saved.exception_type, "ValueError")
+        self.assertEqual(_sink.stats(), audit_sink.AuditSinkStats(0, 1, 1, 0))
+
+    def test_audit_sink__backpressure(self):
+        _sink = audit_sink.InvocationAuditSink(
+            max_pending=3, batch_size=2, flush_seconds=1, autostart=False
+        )
+        _user = _factories.UserReferenceFactory()
+        _invocations = [
+            _factories.AddonOperationInvocationFactory.build(
+                thru_account=self._account,
+                thru_addon=self._configured_addon,
+                by_user=_user,
+            )
+            for _ in range(4)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            _sink.record(_invocations[:3])
+        self.assertFalse(AddonOperationInvocation.objects.exists())
+        # no room (and no background thread) -- saves a batch first
+        with self.captureOnCommitCallbacks(execute=True):
+            _sink.record(_invocations[3:])
+        self.assertEqual(AddonOperationInvocation.objects.count(), 2)
+        self.assertEqual(_sink.flush(), 2)
+        self.assertEqual(AddonOperationInvocation.objects.count(), 4)
+        self.assertEqual(_sink.stats(), audit_sink.AuditSinkStats(0, 4, 4, 0))
+
+    def test_audit_sink__after_commit(self):
+        _sink = audit_sink.InvocationAuditSink(
+            max_pending=1, batch_size=1, flush_seconds=1, autostart=False
+        )
+        _new_user = _factories.UserReferenceFactory()  # (in the same transaction)
+        _invocation, _rolled_back = [
+            _factories.AddonOperationInvocationFactory.build(
+                thru_account=self._account,
+                thru_addon=self._configured_addon,
+                by_user=_new_user,
+            )
+            for _ in range(2)
+        ]
+        with self.captureOnCommitCallbacks() as _on_commit:
+            _sink.record([_invocation])
+            # queued only once committed
+            self.assertEqual(_sink.stats(), audit_sink.AuditSinkStats(0, 0, 0, 0))
+        with self.captureOnCommitCallbacks() as _on_rollback:
+            try:
+                with transaction.atomic():
+                    _sink.record([_rolled_back])
+                    raise ValueError("roll back")
+            except ValueError:
+                pass
+        self.assertEqual(_on_rollback, [])  # (never queued)
+        _on_commit[0]()
+        self.assertEqual(_sink.stats(), audit_sink.AuditSinkStats(1, 1, 0, 0))
+        _sink.drain()
+        (_saved,) = AddonOperationInvocation.objects.all()
+        self.assertEqual(_saved.pk, _invocation.pk)
+
+    def test_batch(self):
+        _item_ids = ["a", "b", "c", "d"]
+        _resp = self._post_batch(
+            [
+                *(
+                    {
+                        "operation_name": "get_item_info",
+                        "operation_kwargs": {"item_id": _id},
+                    }
+                    for _id in _item_ids
+                ),
+                {"operation_name": "list_root_items"},
+            ],
+            thru_addon=self._configured_addon,
+        )
+        self.assertEqual(_resp.status_code, HTTPStatus.CREATED)
+        self.assertEqual(len(_resp.data), 5)
+        self.assertEqual(
+            [_inv["operation_result"]["item_name"] for _inv in _resp.data[:4]],
+            ["itema!", "itemb!", "itemc!", "itemd!"],
+        )
+        self.assertEqual(
+            _resp.data[4]["operation_result"],
+            self._INVOKE_SUCCESS_CASES[0].expected_result,
+        )
+        # browsing operations save only failed invocations
+        self.assertFalse(AddonOperationInvocation.objects.exists())
+        _stats = instantiation.imp_pool_stats()
+        self.assertEqual((_stats.created, _stats.reused), (1, 0))
+
+    def test_batch__cached_and_failed(self):
+        _original = MyBlargStorage.get_item_info
+
+        def _fail_on_b(imp, item_id):
+            if item_id == "b":
+                raise ValueError("no b")
+            return _original(imp, item_id)
+
+        self.enterContext(
+            mock.patch.object(MyBlargStorage, "get_item_info", new=_fail_on_b)
+        )
+        self._post_invocation(
+            self._INVOKE_SUCCESS_CASES[0], thru_addon=self._configured_addon
+        )
+        _resp = self._post_batch(
+            [
+                {"operation_name": "list_root_items"},
+                {
+                    "operation_name": "get_item_info",
+                    "operation_kwargs": {"item_id": "a"},
+                },
+                {
+                    "operation_name": "get_item_info",
+                    "operation_kwargs": {"item_id": "b"},
+                },
+            ],
+            thru_account=self._account,
+        )
+        self.assertEqual(_resp.status_code, HTTPStatus.CREATED)
+        self.assertEqual(
+            [
+                (_inv["invocation_status"], _inv["result_from_cache"])
+                for _inv in _resp.data
+            ],
+            [("SUCCESS", True), ("SUCCESS", False), ("ERROR", False)],
+        )
+        self.assertEqual(
+            list(AddonOperationInvocation.objects.values_list("pk", flat=True)),
+            [_resp.data[2]["id"]],
+        )
+
+    def test_batch__problem(self):
+        with self.subTest("invalid kwargs"):
+            _resp = self._post_batch(
+                [
+                    {"operation_name": "list_root_items"},
+                    {
+                        "operation_name": "list_root_items",
+                        "operation_kwargs": {"blarg": 2},
+                    },
+                ],
+                thru_addon=self._configured_addon,
+            )
+            self.assertEqual(_resp.status_code, HTTPStatus.BAD_REQUEST)
+        with self.subTest("empty"):
+            _resp = self._post_batch([], thru_addon=self._configured_addon)
+            self.assertEqual(_resp.status_code, HTTPStatus.BAD_REQUEST)
+        with self.subTest("non-owner thru account"):
+            self._mock_osf.configure_assumed_caller(self._collaborator_uri)
+            _resp = self._post_batch(
+                [{"operation_name": "list_root_items"}], thru_account=self._account
+            )
+            self.assertEqual(_resp.status_code, HTTPStatus.FORBIDDEN)
+        self.assertFalse(AddonOperationInvocation.objects.exists())
+
+    def _post_batch(
+        self, invocations: list[dict], *, thru_addon=None, thru_account=None
+    ):
+        _relationships = {}
+        if thru_addon is not None:
+            _relationships["thru_addon"] = {"data": jsonapi_ref(thru_addon)}
+        if thru_account is not None:
+            _relationships["thru_account"] = {"data": jsonapi_ref(thru_account)}
+        _payload = {
+            "data": {
+                "type": "addon-operation-invocations",
+                "attributes": {"invocations": invocations},
+                "relationships": _relationships,
+            },
+        }
+        return self.client.post(
+            reverse("addon-operation-invocations-batch"),
+            data=json.dumps(_payload),
+            content_type="application/vnd.api+json",
+        )
+
     def _assert_invocation_response(self, inv_case: _InvocationCase, response):
         with self.subTest("expected http status"):
             self.assertEqual(response.status_code, inv_case.expected_http_status)
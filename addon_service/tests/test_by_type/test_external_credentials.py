@@ -0,0 +1,364 @@
+import asyncio
+import collections
+import concurrent.futures
+import pickle
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from addon_service import models as db
+from addon_service.common.credentials_formats import CredentialsFormats
+from addon_service.credentials import (
+    encryption,
+)
+from addon_service.credentials import models as credentials_models
+from addon_service.credentials import (
+    rotation,
+    warmup,
+)
+from addon_service.tests import _factories
+from addon_service.tests._helpers import patch_encryption_key_derivation
+from addon_toolkit.credentials import AccessTokenCredentials
+
+
+class TestDecryptedCredentialsCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._account = _factories.AuthorizedStorageAccountFactory(
+            credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+            credentials=AccessTokenCredentials(access_token="token"),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        _cache = credentials_models._decrypted_credentials_cache()
+        _cache.clear()
+        self.addCleanup(_cache.clear)
+        self._mock_decrypt = self.enterContext(
+            mock.patch.object(
+                encryption,
+                "pls_decrypt_json",
+                wraps=encryption.pls_decrypt_json,
+            )
+        )
+
+    def _load_credentials(self) -> db.ExternalCredentials:
+        return db.ExternalCredentials.objects.get(pk=self._account._credentials_id)
+
+    def test_decrypt_once(self):
+        _credentials = self._load_credentials()
+        self.assertEqual(
+            _credentials.decrypted_credentials,
+            AccessTokenCredentials(access_token="token"),
+        )
+        self.assertEqual(
+            self._load_credentials().decrypted_credentials,
+            AccessTokenCredentials(access_token="token"),
+        )
+        self.assertEqual(self._mock_decrypt.call_count, 1)
+
+    def test_invalidate_on_save(self):
+        _credentials = self._load_credentials()
+        _stale_credentials = self._load_credentials()
+        _credentials.decrypted_credentials  # cache it
+        _credentials.decrypted_credentials = AccessTokenCredentials(
+            access_token="new_token"
+        )
+        self.assertEqual(
+            _credentials.decrypted_credentials,
+            AccessTokenCredentials(access_token="new_token"),
+        )
+        _credentials.save()
+        self.assertEqual(
+            self._load_credentials().decrypted_credentials,
+            AccessTokenCredentials(access_token="new_token"),
+        )
+        # an object loaded before the update still decrypts its own (stale) data
+        self.assertEqual(
+            _stale_credentials.decrypted_credentials,
+            AccessTokenCredentials(access_token="token"),
+        )
+
+    def test_invalidate_on_rotate(self):
+        _credentials = self._load_credentials()
+        _credentials.decrypted_credentials  # cache it
+        _old_encrypted_json = _credentials.encrypted_json
+        _credentials.rotate_encryption()  # (decrypts once to validate)
+        self.assertNotEqual(_credentials.encrypted_json, _old_encrypted_json)
+        self.assertEqual(self._mock_decrypt.call_count, 2)
+        self.assertEqual(
+            _credentials.decrypted_credentials,
+            AccessTokenCredentials(access_token="token"),
+        )
+        self.assertEqual(self._mock_decrypt.call_count, 3)
+
+    def test_never_serialized_or_shown(self):
+        self._load_credentials().decrypted_credentials  # cache it
+        _cache = credentials_models._decrypted_credentials_cache()
+        self.assertNotIn("token", repr(_cache))
+        with self.assertRaises(TypeError):
+            pickle.dumps(_cache)
+
+    def test_cache_disabled(self):
+        _cache = credentials_models._decrypted_credentials_cache()
+        with mock.patch.object(_cache, "maxsize", 0):
+            self._load_credentials().decrypted_credentials
+            self._load_credentials().decrypted_credentials
+        self.assertEqual(self._mock_decrypt.call_count, 2)
+
+
+class TestKeyDerivation(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self._mock_scrypt = self.enterContext(patch_encryption_key_derivation())
+        self._service = encryption._KeyDerivationService(cache_size=8, max_workers=2)
+        self.addCleanup(self._service.shutdown)
+        self.enterContext(
+            mock.patch.object(
+                encryption, "_derivation_service", return_value=self._service
+            )
+        )
+
+    def test_derive_once(self):
+        _key_params = encryption.KeyParameters()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as _executor:
+            _keys = list(
+                _executor.map(
+                    encryption._derive_multifernet_key,
+                    [_key_params] * 7,
+                )
+            )
+        self.assertTrue(all(_key is _keys[0] for _key in _keys))
+        _stats = encryption.key_derivation_stats()
+        self.assertEqual(_stats.derivations, 1)
+        self.assertEqual(_stats.queue_depth, 0)
+        self.assertEqual(_stats.in_progress, 0)
+        self.assertEqual(
+            self._mock_scrypt.call_count,
+            1 + len(settings.GRAVYVALET_ENCRYPT_SECRET_PRIORS),
+        )
+
+    def test_async(self):
+        _key_params = encryption.KeyParameters()
+
+        async def _derive_concurrently():
+            return await asyncio.gather(
+                *(
+                    encryption.derive_multifernet_key__async(_key_params)
+                    for _ in range(5)
+                )
+            )
+
+        _keys = asyncio.run(_derive_concurrently())
+        self.assertTrue(all(_key is _keys[0] for _key in _keys))
+        self.assertIs(encryption._derive_multifernet_key(_key_params), _keys[0])
+        _stats = encryption.key_derivation_stats()
+        self.assertEqual(_stats.derivations, 1)
+        self.assertEqual(_stats.cache.hits, 1)
+        self.assertEqual(_stats.cache.size, 1)
+
+    def test_roundtrip(self):
+        _key_params = encryption.KeyParameters()
+        _encrypted = encryption.pls_encrypt_json({"foo": "bar"}, _key_params)
+        self.assertEqual(
+            encryption.pls_decrypt_json(_encrypted, _key_params), {"foo": "bar"}
+        )
+        self.assertEqual(encryption.key_derivation_stats().derivations, 1)
+
+
+class TestWarmup(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._accounts = [
+            _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+                credentials=AccessTokenCredentials(access_token=f"token{_i}"),
+            )
+            for _i in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        self._service = encryption._KeyDerivationService(cache_size=8, max_workers=2)
+        self.addCleanup(self._service.shutdown)
+        self.enterContext(
+            mock.patch.object(
+                encryption, "_derivation_service", return_value=self._service
+            )
+        )
+
+    def test_warm_derived_key_cache(self):
+        self.assertEqual(warmup.warm_derived_key_cache(limit=2), 2)
+        self.assertEqual(encryption.key_derivation_stats().derivations, 2)
+        # most recently modified first
+        _newest = self._accounts[-1]._credentials
+        self.assertIn(_newest._key_parameters, self._service._cache.keys())
+        self.assertEqual(warmup.warm_derived_key_cache(), 3)
+        self.assertEqual(encryption.key_derivation_stats().derivations, 3)
+
+    def test_status_until_warm(self):
+        with self.settings(GRAVYVALET_WARMUP_AT_STARTUP=True):
+            with mock.patch.object(warmup, "is_warm", return_value=False):
+                self.assertEqual(
+                    self.client.get(reverse("status")).status_code,
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                )
+            with mock.patch.object(warmup, "is_warm", return_value=True):
+                self.assertEqual(
+                    self.client.get(reverse("status")).status_code, HTTPStatus.OK
+                )
+        with self.settings(GRAVYVALET_WARMUP_AT_STARTUP=False):
+            self.assertEqual(
+                self.client.get(reverse("status")).status_code, HTTPStatus.OK
+            )
+
+
+class TestBatchedRotation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._accounts = [
+            _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+                credentials=AccessTokenCredentials(access_token=f"token{_i}"),
+            )
+            for _i in range(5)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+
+    def _load_all(self) -> dict[str, db.ExternalCredentials]:
+        return {_row.pk: _row for _row in db.ExternalCredentials.objects.all()}
+
+    def test_rotate_in_batches(self):
+        _before = self._load_all()
+        with self.assertLogs("addon_service.credentials.rotation", "INFO"):
+            _progress = rotation.rotate_in_batches(batch_size=2, max_workers=2)
+        self.assertEqual(_progress.rotated, 5)
+        self.assertEqual(_progress.failed, 0)
+        self.assertEqual(_progress.remaining, 0)
+        _after = self._load_all()
+        for _pk, _row in _after.items():
+            self.assertNotEqual(
+                bytes(_row.encrypted_json), bytes(_before[_pk].encrypted_json)
+            )
+            self.assertGreater(_row.modified, _before[_pk].modified)
+        for _i, _account in enumerate(self._accounts):
+            _account.refresh_from_db()
+            self.assertEqual(
+                _account.credentials,
+                AccessTokenCredentials(access_token=f"token{_i}"),
+            )
+
+    def test_rotate_batch__resumable(self):
+        _earlier_than = timezone.now()
+        _first = rotation.rotate_batch(earlier_than=_earlier_than, batch_size=3)
+        self.assertEqual(_first.rotated, 3)
+        self.assertEqual(
+            rotation.count_remaining(
+                earlier_than=_earlier_than, after_pk=_first.last_pk
+            ),
+            2,
+        )
+        _second = rotation.rotate_batch(
+            earlier_than=_earlier_than, after_pk=_first.last_pk, batch_size=3
+        )
+        self.assertEqual(_second.rotated, 2)
+        self.assertIsNone(
+            rotation.rotate_batch(earlier_than=_earlier_than, after_pk=_second.last_pk)
+        )
+        # rotated rows have a fresh `modified`, so are not selected again
+        self.assertIsNone(rotation.rotate_batch(earlier_than=_earlier_than))
+
+    def test_rotate_batch__concurrent(self):
+        # every row has its own salt, so each is alone in its group of key parameters
+        _both_rotating = threading.Barrier(2, timeout=5)
+
+        def _rotate_in_pairs(**kwargs):
+            _both_rotating.wait()  # (times out unless two rows rotate at once)
+            return _pls_rotate_encryption(**kwargs)
+
+        _pls_rotate_encryption = encryption.pls_rotate_encryption
+        with mock.patch.object(
+            encryption, "pls_rotate_encryption", side_effect=_rotate_in_pairs
+        ):
+            _batch = rotation.rotate_batch(
+                earlier_than=timezone.now(), batch_size=4, max_workers=2
+            )
+        self.assertEqual(_batch.derived_key_count, 4)
+        self.assertEqual(_batch.rotated, 4)
+        self.assertEqual(_batch.failed, 0)
+
+    def test_rotate_batch__failure(self):
+        _broken_pk = self._accounts[0]._credentials_id
+        db.ExternalCredentials.objects.filter(pk=_broken_pk).update(
+            encrypted_json=b"nope"
+        )
+        with self.assertLogs("addon_service.credentials.rotation", "ERROR"):
+            _batch = rotation.rotate_batch(earlier_than=timezone.now())
+        self.assertEqual(_batch.rotated, 4)
+        self.assertEqual(_batch.failed, 1)
+        self.assertEqual(
+            bytes(db.ExternalCredentials.objects.get(pk=_broken_pk).encrypted_json),
+            b"nope",
+        )
+
+    def test_rotate_batch__salt_epochs(self):
+        # stale key parameters, so rows are re-encrypted with fresh ones
+        _default_params = encryption.KeyParameters()
+        db.ExternalCredentials.objects.update(
+            _scrypt_cost_log2=_default_params.scrypt_cost_log2 - 1
+        )
+        _batch = rotation.rotate_batch(earlier_than=timezone.now(), max_rows_per_salt=2)
+        self.assertEqual(_batch.rotated, 5)
+        self.assertEqual(_batch.fresh_salt_count, 3)
+        _rows = db.ExternalCredentials.objects.all()
+        self.assertEqual(
+            sorted(collections.Counter(bytes(_row._salt) for _row in _rows).values()),
+            [1, 2, 2],
+        )
+        with self.subTest("up-to-date rows keep their salt"):
+            _salts = {_row.pk: bytes(_row._salt) for _row in _rows}
+            _batch = rotation.rotate_batch(
+                earlier_than=timezone.now(), max_rows_per_salt=2
+            )
+            self.assertEqual(_batch.rotated, 5)
+            self.assertEqual(_batch.fresh_salt_count, 0)
+            self.assertEqual(
+                {
+                    _row.pk: bytes(_row._salt)
+                    for _row in db.ExternalCredentials.objects.all()
+                },
+                _salts,
+            )
+        self.assertTrue(
+            all(
+                _row._scrypt_cost_log2 == _default_params.scrypt_cost_log2
+                for _row in _rows
+            )
+        )
+        for _i, _account in enumerate(self._accounts):
+            _account.refresh_from_db()
+            self.assertEqual(
+                _account.credentials,
+                AccessTokenCredentials(access_token=f"token{_i}"),
+            )
+
+    def test_salt_epoch__max_rows(self):
+        with self.assertRaises(ValueError):
+            encryption.SaltEpoch(max_rows=0)
+        _epoch = encryption.SaltEpoch(max_rows=3)
+        _params = [_epoch.next_key_parameters() for _ in range(7)]
+        self.assertEqual(len(set(_params)), 3)
+        self.assertEqual(_epoch.salt_count, 3)
@@ -0,0 +1,158 @@
+import asyncio
+import gc
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+
+from addon_service.common import concurrency
+from addon_service.common.exceptions import ExternalServiceBusy
+from addon_service.tests import _factories
+
+
+class TestSlotPool(SimpleTestCase):
+    def test_limits_concurrency(self):
+        _pool = concurrency.SlotPool(size=2, name="test")
+        _running = 0
+        _max_running = 0
+
+        async def _use_slot():
+            nonlocal _running, _max_running
+            async with _pool.slot(timeout=None):
+                _running += 1
+                _max_running = max(_max_running, _running)
+                await asyncio.sleep(0.01)
+                _running -= 1
+
+        async def _use_many_slots():
+            await asyncio.gather(*(_use_slot() for _ in range(7)))
+
+        asyncio.run(_use_many_slots())
+        self.assertEqual(_max_running, 2)
+        self.assertEqual(_pool.in_use, 0)
+        self.assertEqual(_pool.waiting, 0)
+
+    def test_bounded_wait(self):
+        _pool = concurrency.SlotPool(size=1, name="test")
+
+        async def _wait_too_long():
+            async with _pool.slot(timeout=None):
+                with self.assertRaises(ExternalServiceBusy):
+                    await _pool.acquire(timeout=0.01)
+                self.assertEqual(_pool.waiting, 0)
+
+        asyncio.run(_wait_too_long())
+        self.assertEqual(_pool.in_use, 0)
+
+    def test_reentrant(self):
+        _pool = concurrency.SlotPool(size=1, name="test")
+
+        async def _nested():
+            async with _pool.slot(timeout=0):
+                async with _pool.slot(timeout=0):  # (same context -- same slot)
+                    self.assertEqual(_pool.in_use, 1)
+                with self.assertRaises(ExternalServiceBusy):  # (other contexts wait)
+                    await asyncio.create_task(_pool.acquire(timeout=0))
+
+        asyncio.run(_nested())
+        self.assertEqual(_pool.in_use, 0)
+
+    def test_across_loops(self):
+        _pool = concurrency.SlotPool(size=1, name="test")
+        _pool.acquire__blocking(timeout=0)
+
+        async def _wait_then_release():
+            _waiting = asyncio.ensure_future(_pool.acquire(timeout=1))
+            await asyncio.sleep(0)
+            self.assertEqual(_pool.waiting, 1)
+            # released from another thread (with no event loop)
+            await asyncio.to_thread(_pool.release)
+            await _waiting
+            self.assertEqual(_pool.in_use, 1)
+
+        asyncio.run(_wait_then_release())
+
+
+class TestSlotPoolsForAccount(TestCase):
+    def test_service_limit(self):
+        _account = _factories.AuthorizedStorageAccountFactory(
+            external_storage_service=_factories.ExternalStorageServiceFactory(
+                max_concurrent_downloads=3
+            )
+        )
+        (_pool,) = concurrency.slot_pools_for_account__blocking(_account)
+        self.assertEqual(_pool.size, 3)
+        self.assertIs(
+            _pool,
+            concurrency.slot_pools_for_account__blocking(_account)[0],
+        )
+
+    def test_account_limit(self):
+        _account = _factories.AuthorizedStorageAccountFactory(
+            external_storage_service=_factories.ExternalStorageServiceFactory(
+                max_concurrent_downloads=0  # unlimited
+            )
+        )
+        self.assertEqual(concurrency.slot_pools_for_account__blocking(_account), ())
+        with self.settings(ACCOUNT_CONCURRENCY_LIMIT=1):
+            (_pool,) = concurrency.slot_pools_for_account__blocking(_account)
+        self.assertEqual(_pool.size, 1)
+
+    def test_pools_not_kept(self):
+        _account = _factories.AuthorizedStorageAccountFactory(
+            external_storage_service=_factories.ExternalStorageServiceFactory(
+                max_concurrent_downloads=0  # unlimited
+            )
+        )
+        _name = f"account:{_account.pk}"
+        with self.settings(ACCOUNT_CONCURRENCY_LIMIT=2):
+            (_pool,) = concurrency.slot_pools_for_account__blocking(_account)
+        with self.settings(ACCOUNT_CONCURRENCY_LIMIT=3):
+            (_resized_pool,) = concurrency.slot_pools_for_account__blocking(_account)
+        self.assertEqual((_pool.size, _resized_pool.size), (2, 3))
+        self.assertIs(concurrency._SLOT_POOLS[_name], _resized_pool)  # (superseded)
+        del _pool, _resized_pool
+        gc.collect()
+        self.assertNotIn(_name, concurrency._SLOT_POOLS)  # (unused)
+
+    def test_cross_process_slot(self):
+        _account = _factories.AuthorizedStorageAccountFactory(
+            external_storage_service=_factories.ExternalStorageServiceFactory(
+                max_concurrent_downloads=2
+            )
+        )
+        self.assertEqual(self._count_advisory_locks(), 0)
+        with concurrency.cross_process_slot__blocking(_account, timeout=0):
+            self.assertEqual(self._count_advisory_locks(), 1)
+        self.assertEqual(self._count_advisory_locks(), 0)
+
+    def test_cross_process_limit(self):
+        _limit = concurrency.CrossProcessLimit(name="test", size=1)
+        with _limit.slot__blocking(timeout=0):
+            self.assertEqual(self._count_advisory_locks(), 1)
+            with _limit.slot__blocking(timeout=0):  # (re-entrant)
+                self.assertEqual(self._count_advisory_locks(), 1)
+        self.assertEqual(self._count_advisory_locks(), 0)
+        # taken (outside any slot context) on this same connection -- not granted again
+        _slot = _limit._try_take()
+        self.assertIsNone(_limit._try_take())
+
+        async def _wait_for_slot():
+            async with _limit.slot(timeout=0.1):
+                pass
+
+        with self.assertRaises(ExternalServiceBusy):
+            async_to_sync(_wait_for_slot)()
+        _limit._give_back(_slot)
+        async_to_sync(_wait_for_slot)()
+        self.assertEqual(self._count_advisory_locks(), 0)
+
+    def _count_advisory_locks(self) -> int:
+        with connection.cursor() as _cursor:
+            _cursor.execute(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+            )
+            return _cursor.fetchone()[0]
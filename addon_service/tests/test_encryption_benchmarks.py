@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import unittest
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from addon_service.credentials import benchmarks
+from addon_service.tests._helpers import patch_encryption_key_derivation
+
+
+class TestEncryptionBenchmarks(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self._mock_scrypt = self.enterContext(patch_encryption_key_derivation())
+
+    def _run(self, **kwargs) -> list[benchmarks.BenchmarkResult]:
+        return list(
+            benchmarks.run_benchmarks(
+                **{
+                    "cost_log2_grid": [14],
+                    "block_size_grid": [8],
+                    "parallelization_grid": [1],
+                    "iterations": 10,
+                    "distinct_salts": 3,
+                    **kwargs,
+                }
+            )
+        )
+
+    def test_cache_sizes(self):
+        _uncached, _tiny, _enough = self._run(cache_sizes=[0, 1, 8])
+        self.assertEqual(_uncached.cache_hit_ratio, 0.0)
+        self.assertGreater(_tiny.cache_hit_ratio, 0.0)
+        self.assertGreater(_enough.cache_hit_ratio, _tiny.cache_hit_ratio)
+        self.assertGreater(_uncached.derivations, _tiny.derivations)
+        self.assertGreater(_tiny.derivations, _enough.derivations)
+        # (rotating keeps each grid point's own key params -- no further derivations)
+        self.assertEqual(_enough.derivations, 3)
+        for _result in (_uncached, _tiny, _enough):
+            self.assertEqual(_result.encrypt_cold.samples, 3)
+            self.assertEqual(_result.decrypt.samples, 10)
+            self.assertGreater(_result.peak_rss_bytes, 0)
+
+    def test_grid(self):
+        _results = self._run(
+            cost_log2_grid=[14, 15], block_size_grid=[8, 9], cache_sizes=[4]
+        )
+        self.assertEqual(
+            [(_r.scrypt_cost_log2, _r.scrypt_block_size) for _r in _results],
+            [(14, 8), (14, 9), (15, 8), (15, 9)],
+        )
+
+    def test_command(self):
+        _out = io.StringIO()
+        call_command(
+            "benchmark_encryption",
+            "--cache-size",
+            "0",
+            "2",
+            "--iterations=3",
+            "--json",
+            stdout=_out,
+        )
+        _rows = [json.loads(_line) for _line in _out.getvalue().splitlines()]
+        self.assertEqual([_row["cache_size"] for _row in _rows], [0, 2])
+        self.assertIn("decrypt_p95_ms", _rows[0])
+
+
+@unittest.skipUnless(
+    os.environ.get("GRAVYVALET_RUN_BENCHMARKS"),
+    "set GRAVYVALET_RUN_BENCHMARKS to run (slow) benchmarks with real key derivation",
+)
+class TestEncryptionRegressions(SimpleTestCase):
+    def test_warm_much_faster_than_cold(self):
+        (_result,) = benchmarks.run_benchmarks(
+            cost_log2_grid=[14],
+            block_size_grid=[8],
+            parallelization_grid=[1],
+            cache_sizes=[8],
+        )
+        self.assertEqual(_result.encrypt_warm.samples, 20)
+        self.assertLess(
+            _result.encrypt_warm.p95_seconds * 10,
+            _result.encrypt_cold.mean_seconds,
+        )
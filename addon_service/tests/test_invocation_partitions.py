@@ -0,0 +1,139 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from addon_service.addon_operation_invocation import partitions
+from addon_service.common.dibs import dibs
+from addon_service.models import AddonOperationInvocation
+from addon_service.tasks import partition_maintenance
+from addon_service.tests import _factories
+from addon_service.tests._helpers import patch_encryption_key_derivation
+
+
+class TestInvocationPartitions(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with patch_encryption_key_derivation():
+            cls._invocation = _factories.AddonOperationInvocationFactory()
+
+    def test_partitioned(self):
+        self.assertTrue(partitions.is_partitioned())
+        _this_month = partitions.MonthlyPartition.containing(datetime.date.today())
+        self.assertIn(_this_month, partitions.list_partitions())
+        self.assertEqual(
+            self._partition_of(self._invocation), _this_month.name
+        )  # (by `created`)
+        # lookup by pk still works, and rows are still updatable
+        self._invocation.operation_kwargs = {"item_id": "bar"}
+        self._invocation.save()
+        self.assertEqual(
+            AddonOperationInvocation.objects.get(
+                pk=self._invocation.pk
+            ).operation_kwargs,
+            {"item_id": "bar"},
+        )
+
+    def test_dibs_by_partition(self):
+        with CaptureQueriesContext(connection) as _queries, dibs(self._invocation):
+            pass
+        (_locking_sql,) = [
+            _query["sql"] for _query in _queries if "FOR UPDATE" in _query["sql"]
+        ]
+        self.assertIn('."created" = ', _locking_sql)
+
+    def test_ensure_partitions__moves_from_default(self):
+        _far_future = timezone.now() + datetime.timedelta(days=366 * 2)
+        _future_invocation = self._copy_invocation(created=_far_future)
+        self.assertEqual(
+            self._partition_of(_future_invocation),
+            f"{AddonOperationInvocation._meta.db_table}_default",
+        )
+        with CaptureQueriesContext(connection) as _queries:
+            _created = partitions.ensure_partitions(months_ahead=26)
+        _sqls = [_query["sql"] for _query in _queries]
+        _first_lock = next(_i for _i, _sql in enumerate(_sqls) if "LOCK TABLE" in _sql)
+        _detach = next(_i for _i, _sql in enumerate(_sqls) if "DETACH" in _sql)
+        self.assertLess(_first_lock, _detach)
+        _future_partition = partitions.MonthlyPartition.containing(_far_future.date())
+        self.assertIn(_future_partition, _created)
+        self.assertEqual(self._partition_of(_future_invocation), _future_partition.name)
+        # (idempotent)
+        self.assertEqual(partitions.ensure_partitions(months_ahead=26), [])
+
+    def test_ensure_partitions__no_lock_when_default_empty(self):
+        with CaptureQueriesContext(connection) as _queries:
+            _created = partitions.ensure_partitions(months_ahead=30)
+        self.assertTrue(_created)
+        self.assertFalse(
+            [_query for _query in _queries if "LOCK TABLE" in _query["sql"]]
+        )
+
+    def test_maintenance_prunes(self):
+        _long_ago = timezone.now() - datetime.timedelta(days=366 * 2)
+        _old_partition = partitions.MonthlyPartition.containing(_long_ago.date())
+        self.assertTrue(partitions.create_partition(_old_partition))
+        _old_invocation = self._copy_invocation(created=_long_ago)
+        self.assertEqual(self._partition_of(_old_invocation), _old_partition.name)
+        _stranded_invocation = self._copy_invocation(
+            created=_long_ago - datetime.timedelta(days=366)
+        )
+        self.assertEqual(
+            self._partition_of(_stranded_invocation),
+            f"{AddonOperationInvocation._meta.db_table}_default",
+        )
+        _report = partition_maintenance.maintain_invocation_partitions(
+            months_ahead=1, retention_months=12, detach_only=False
+        )
+        self.assertEqual(_report.pruned, [_old_partition.name])
+        self.assertNotIn(_old_partition, partitions.list_partitions())
+        self.assertFalse(
+            AddonOperationInvocation.objects.filter(
+                pk__in=[_old_invocation.pk, _stranded_invocation.pk]
+            ).exists()
+        )
+        self.assertTrue(
+            AddonOperationInvocation.objects.filter(pk=self._invocation.pk).exists()
+        )
+
+    def test_maintenance_detach_only(self):
+        _long_ago = timezone.now() - datetime.timedelta(days=366 * 2)
+        _old_partition = partitions.MonthlyPartition.containing(_long_ago.date())
+        partitions.create_partition(_old_partition)
+        _old_invocation = self._copy_invocation(created=_long_ago)
+        partition_maintenance.maintain_invocation_partitions(
+            months_ahead=1, retention_months=12, detach_only=True
+        )
+        self.assertFalse(
+            AddonOperationInvocation.objects.filter(pk=_old_invocation.pk).exists()
+        )
+        with connection.cursor() as _cursor:  # (still there, detached)
+            _cursor.execute(
+                f"SELECT id FROM {connection.ops.quote_name(_old_partition.name)}"
+            )
+            self.assertEqual(
+                [str(_id) for (_id,) in _cursor.fetchall()], [_old_invocation.pk]
+            )
+
+    def _copy_invocation(self, *, created) -> AddonOperationInvocation:
+        _copy = _factories.AddonOperationInvocationFactory.build(
+            thru_account=self._invocation.thru_account,
+            thru_addon=self._invocation.thru_addon,
+            by_user=self._invocation.by_user,
+        )
+        _copy.created = _copy.modified = created
+        AddonOperationInvocation.objects.bulk_create([_copy])  # (keep given `created`)
+        with connection.cursor() as _cursor:  # (no deferred fk checks left to block DROP)
+            _cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        return _copy
+
+    def _partition_of(self, invocation: AddonOperationInvocation) -> str:
+        with connection.cursor() as _cursor:
+            _cursor.execute(
+                f"SELECT tableoid::regclass::text FROM {AddonOperationInvocation._meta.db_table} WHERE id = %s",
+                [invocation.pk],
+            )
+            (_partition_name,) = _cursor.fetchone()
+        return _partition_name
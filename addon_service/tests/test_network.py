@@ -0,0 +1,335 @@
+import contextlib
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from asgiref.sync import (
+    async_to_sync,
+    sync_to_async,
+)
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+
+from addon_service.common import http_cache
+from addon_service.common.credentials_formats import CredentialsFormats
+from addon_service.common.exceptions import UploadTooLarge
+from addon_service.common.local_cache import TtlLruCache
+from addon_service.common.network import (
+    GravyvaletHttpRequestor,
+    _AiohttpResponseInfo,
+    _PrefixUrlResolver,
+)
+from addon_service.tests import _factories
+from addon_service.tests._helpers import (
+    _FakeAiohttpResponse,
+    patch_encryption_key_derivation,
+)
+from addon_toolkit.credentials import AccessTokenCredentials
+
+
+class TestStreamingResponse(SimpleTestCase):
+    _DATA = {
+        "meta": {"total": 3},
+        "data": [{"id": "a", "name": "ä"}, {"id": "b"}, {"id": "c"}],
+    }
+
+    def _response_info(self) -> _AiohttpResponseInfo:
+        return _AiohttpResponseInfo(_FakeAiohttpResponse(data=self._DATA))
+
+    def test_iter_content(self):
+        async def _read_chunks():
+            return [
+                _chunk
+                async for _chunk in self._response_info().iter_content(chunk_size=5)
+            ]
+
+        _chunks = async_to_sync(_read_chunks)()
+        self.assertTrue(all(len(_chunk) <= 5 for _chunk in _chunks))
+        self.assertEqual(
+            b"".join(_chunks),
+            _FakeAiohttpResponse(data=self._DATA).content.body,
+        )
+
+    def test_iter_json_array_items(self):
+        async def _read_items():
+            return [
+                _item
+                async for _item in self._response_info().iter_json_array_items("data")
+            ]
+
+        self.assertEqual(async_to_sync(_read_items)(), self._DATA["data"])
+
+
+class TestRequestContent(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with patch_encryption_key_derivation():
+            cls._account = _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+                credentials=AccessTokenCredentials(access_token="token"),
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        self._sent = []
+
+        @contextlib.asynccontextmanager
+        async def _fake_request(method, url, params, headers, data=None):
+            if data is not None and not isinstance(data, bytes):
+                data = b"".join([_chunk async for _chunk in data])
+            self._sent.append((method, url, params, dict(headers.items()), data))
+            yield _FakeAiohttpResponse(status=HTTPStatus.CREATED)
+
+        self.enterContext(
+            mock.patch(
+                "addon_service.common.network.get_singleton_client_session",
+                return_value=mock.Mock(request=_fake_request),
+            )
+        )
+
+    def _network(self, max_upload_mb=None) -> GravyvaletHttpRequestor:
+        _network = GravyvaletHttpRequestor(
+            prefix_url="https://api.example/",
+            account=self._account,
+            max_upload_mb=max_upload_mb,
+        )
+        _network.preload__blocking()
+        return _network
+
+    def _send(self, network, **kwargs):
+        async def _put():
+            async with network.PUT("foo", **kwargs) as _response:
+                return _response.http_status
+
+        return async_to_sync(_put)()
+
+    def test_bytes(self):
+        self.assertEqual(self._send(self._network(), content=b"hello"), 201)
+        self.assertEqual(self._sent[-1][1], "https://api.example/foo")
+        self.assertEqual(self._sent[-1][4], b"hello")
+
+    def test_query_and_headers(self):
+        async def _get():
+            async with self._network().GET(
+                "items/1",
+                query=[("fields", "id,name"), ("limit", "7"), ("limit", "8")],
+                headers={"If-None-Match": '"abc"', "Authorization": "nope"},
+            ):
+                pass
+
+        async_to_sync(_get)()
+        _, _url, _params, _headers, _ = self._sent[-1]
+        self.assertEqual(_url, "https://api.example/items/1")
+        self.assertEqual(
+            _params, [("fields", "id,name"), ("limit", "7"), ("limit", "8")]
+        )
+        self.assertEqual(_headers["If-None-Match"], '"abc"')
+        self.assertEqual(_headers["Authorization"], "Bearer token")
+
+    def test_slots_per_request(self):
+        _service = self._account.external_storage_service
+        _service.max_concurrent_downloads = 1
+        _service.save()
+        _network = self._network()
+
+        def _count_advisory_locks() -> int:
+            with connection.cursor() as _cursor:
+                _cursor.execute(
+                    "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+                )
+                return _cursor.fetchone()[0]
+
+        async def _nested_requests() -> int:
+            async with _network.GET("items/1"):
+                _held = await sync_to_async(_count_advisory_locks)()
+                # (a request within another's response takes no other slot)
+                async with _network.GET("items/2"):
+                    pass
+            return _held
+
+        with self.settings(EXTERNAL_SERVICE_SLOT_WAIT_SECONDS=0):
+            self.assertEqual(async_to_sync(_nested_requests)(), 1)
+        self.assertEqual(_count_advisory_locks(), 0)
+        self.assertEqual(len(self._sent), 2)
+
+    def test_json(self):
+        self._send(self._network(), json_content={"name": "foo"})
+        _, _, _, _headers, _data = self._sent[-1]
+        self.assertEqual(json.loads(_data), {"name": "foo"})
+        self.assertEqual(_headers["Content-Type"], "application/json")
+        self.assertEqual(_headers["Authorization"], "Bearer token")
+        with self.assertRaises(ValueError):
+            self._send(self._network(), content=b"{}", json_content={})
+
+    def test_streamed(self):
+        _chunk = b"x" * 1024
+        _produced = []
+
+        async def _chunks(count):
+            for _ in range(count):
+                _produced.append(_chunk)
+                yield _chunk
+
+        _network = self._network(max_upload_mb=1)
+        self._send(_network, content=_chunks(1024))
+        self.assertEqual(len(self._sent[-1][4]), 1024 * 1024)
+        # fails once over the limit (without reading the rest)
+        _produced.clear()
+        with self.assertRaises(UploadTooLarge):
+            self._send(_network, content=_chunks(2048))
+        self.assertEqual(len(_produced), 1025)
+        with self.assertRaises(UploadTooLarge):
+            self._send(_network, content=b"x" * (1024 * 1024 + 1))
+        self.assertEqual(len(self._sent), 1)
+
+
+class TestPrefixUrlResolver(SimpleTestCase):
+    def test_resolve(self):
+        _cases = [
+            ("https://api.example/", "foo/bar", "https://api.example/foo/bar"),
+            ("https://api.example/v2/", "foo?a=b", "https://api.example/v2/foo?a=b"),
+            ("https://api.example/v2/", "foo/./bar", "https://api.example/v2/foo/bar"),
+            ("https://api.example/v2/", "a/../b", "https://api.example/v2/b"),
+            ("https://api.example/v2/", "", "https://api.example/v2/"),
+        ]
+        for _prefix_url, _relative_url, _expected in _cases:
+            with self.subTest(_relative_url, prefix_url=_prefix_url):
+                self.assertEqual(
+                    _PrefixUrlResolver.for_prefix(_prefix_url).resolve(_relative_url),
+                    _expected,
+                )
+
+    def test_invalid(self):
+        _resolver = _PrefixUrlResolver.for_prefix("https://api.example/v2/")
+        for _relative_url in (
+            "https://elsewhere.example/",
+            "//elsewhere.example/",
+            "/v2/foo",
+            "../foo",
+            "foo/../../v3",
+        ):
+            with self.subTest(_relative_url):
+                with self.assertRaises(ValueError):
+                    _resolver.resolve(_relative_url)
+        # prefix without trailing slash: relative paths replace its last segment
+        with self.assertRaises(ValueError):
+            _PrefixUrlResolver.for_prefix("https://api.example/v2").resolve("foo")
+
+    def test_cached_per_prefix(self):
+        self.assertIs(
+            _PrefixUrlResolver.for_prefix("https://api.example/"),
+            _PrefixUrlResolver.for_prefix("https://api.example/"),
+        )
+
+
+class TestHttpCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with patch_encryption_key_derivation():
+            cls._account = _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+                credentials=AccessTokenCredentials(access_token="token"),
+            )
+            cls._other_account = _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.PERSONAL_ACCESS_TOKEN,
+                credentials=AccessTokenCredentials(access_token="token"),
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        self.enterContext(
+            mock.patch.object(
+                http_cache,
+                "_http_cache",
+                return_value=TtlLruCache(maxsize=8, ttl_seconds=60),
+            )
+        )
+        http_cache.clear()
+        self.addCleanup(http_cache.clear)
+        self._etag = '"v1"'
+        self._sent_headers = []
+
+        @contextlib.asynccontextmanager
+        async def _fake_request(method, url, params, headers, data=None):
+            self._sent_headers.append(dict(headers.items()))
+            if headers.get("If-None-Match") == self._etag:
+                yield _FakeAiohttpResponse(status=HTTPStatus.NOT_MODIFIED)
+            else:
+                yield _FakeAiohttpResponse(
+                    data={"entries": [{"id": "1", "etag": self._etag}]},
+                    headers={"ETag": self._etag},
+                )
+
+        self.enterContext(
+            mock.patch(
+                "addon_service.common.network.get_singleton_client_session",
+                return_value=mock.Mock(request=_fake_request),
+            )
+        )
+
+    def _request(self, account=None, method="GET", query=None, headers=None):
+        _network = GravyvaletHttpRequestor(
+            prefix_url="https://api.example/",
+            account=account or self._account,
+        )
+        _network.preload__blocking()
+
+        async def _send():
+            async with _network.request(
+                method, "items", query=query, headers=headers
+            ) as _response:
+                return (_response.http_status, await _response.json_content())
+
+        return async_to_sync(_send)()
+
+    def test_not_modified(self):
+        _status, _json = self._request()
+        self.assertEqual(_status, HTTPStatus.OK)
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
+        _json["entries"].clear()  # (callers get their own copy)
+        _status, _cached_json = self._request()
+        self.assertEqual(self._sent_headers[-1]["If-None-Match"], '"v1"')
+        self.assertEqual(_status, HTTPStatus.OK)
+        self.assertEqual(_cached_json, {"entries": [{"id": "1", "etag": '"v1"'}]})
+        # changed upstream
+        self._etag = '"v2"'
+        _, _fresh_json = self._request()
+        self.assertEqual(_fresh_json["entries"][0]["etag"], '"v2"')
+        _stats = http_cache.http_cache_stats()
+        self.assertEqual(_stats.conditional_requests, 2)
+        self.assertEqual(_stats.not_modified, 1)
+        self.assertEqual(_stats.hit_ratio, 0.5)
+
+    def test_scoped_per_account_query_and_headers(self):
+        self._request()
+        self._request(account=self._other_account)
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
+        self._request(query={"limit": "5"})
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
+        self._request(headers={"Range": "bytes=0-99"})
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
+        self._request(headers={"range": "bytes=0-99"})  # (names case-insensitive)
+        self.assertIn("If-None-Match", self._sent_headers[-1])
+        self._request()
+        self.assertIn("If-None-Match", self._sent_headers[-1])
+
+    def test_forget_on_change(self):
+        self._request()
+        self._request(method="DELETE")
+        self._request()
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
+
+    def test_disabled(self):
+        with mock.patch.object(
+            http_cache,
+            "_http_cache",
+            return_value=TtlLruCache(maxsize=0, ttl_seconds=60),
+        ):
+            self._request()
+            self._request()
+        self.assertNotIn("If-None-Match", self._sent_headers[-1])
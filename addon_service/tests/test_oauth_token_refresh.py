@@ -0,0 +1,289 @@
+import asyncio
+import contextlib
+import datetime
+from http import HTTPStatus
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+)
+from django.utils import timezone
+
+from addon_service.common.credentials_formats import CredentialsFormats
+from addon_service.common.network import GravyvaletHttpRequestor
+from addon_service.common.unit_of_work import unit_of_work
+from addon_service.models import AuthorizedStorageAccount
+from addon_service.oauth.utils import FreshTokenResult
+from addon_service.tasks import token_refresh
+from addon_service.tests import _factories
+from addon_service.tests._helpers import (
+    _FakeAiohttpResponse,
+    patch_encryption_key_derivation,
+)
+
+
+class TestOAuthTokenRefresh(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with patch_encryption_key_derivation():
+            cls._account = _factories.AuthorizedStorageAccountFactory(
+                credentials_format=CredentialsFormats.OAUTH2,
+            )
+            cls._account.oauth2_token_metadata.update_with_fresh_token__blocking(
+                FreshTokenResult(
+                    access_token="old-token",
+                    refresh_token="refresh-token",
+                    expires_in=3600,
+                    scopes=None,
+                )
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        self._token_requests = []
+
+        async def _fake_refresh(**kwargs):
+            self._token_requests.append(kwargs)
+            await asyncio.sleep(0)
+            return FreshTokenResult(
+                access_token=f"fresh-token-{len(self._token_requests)}",
+                refresh_token="refresh-token",
+                expires_in=3600,
+                scopes=None,
+            )
+
+        self.enterContext(
+            mock.patch(
+                "addon_service.oauth.utils.get_refreshed_access_token",
+                side_effect=_fake_refresh,
+            )
+        )
+
+    def _load_account(self) -> AuthorizedStorageAccount:
+        return AuthorizedStorageAccount.objects.get(pk=self._account.pk)
+
+    def _expire_soon(self) -> None:
+        _token_metadata = self._account.oauth2_token_metadata
+        _token_metadata.access_token_expiration = timezone.now() + datetime.timedelta(
+            seconds=1
+        )
+        _token_metadata.save()
+
+    def test_concurrent_refreshes(self):
+        _accounts = [self._load_account() for _ in range(5)]
+
+        async def _refresh_all():
+            await asyncio.gather(
+                *(_account.refresh_oauth_access_token() for _account in _accounts)
+            )
+
+        async_to_sync(_refresh_all)()
+        self.assertEqual(len(self._token_requests), 1)
+        for _account in _accounts:
+            self.assertEqual(_account.credentials.access_token, "fresh-token-1")
+
+    def test_refreshed_elsewhere(self):
+        _account = self._load_account()
+        _stale_account = self._load_account()
+        _stale_account.oauth2_token_metadata  # load the soon-stale token metadata
+        _account.refresh_oauth_access_token__blocking()
+        _stale_account.refresh_oauth_access_token__blocking()
+        self.assertEqual(len(self._token_requests), 1)
+        self.assertEqual(_stale_account.credentials.access_token, "fresh-token-1")
+
+    def test_refreshed_elsewhere_but_expiring(self):
+        _stale_account = self._load_account()
+        _stale_account.oauth2_token_metadata  # load the soon-stale token metadata
+        self._expire_soon()
+        _stale_account.refresh_oauth_access_token__blocking()
+        self.assertEqual(len(self._token_requests), 1)
+
+    def test_proactive_refresh(self):
+        _sent_headers = []
+
+        @contextlib.asynccontextmanager
+        async def _fake_request(method, url, params, headers, data=None):
+            _sent_headers.append(dict(headers.items()))
+            yield _FakeAiohttpResponse(status=HTTPStatus.OK, data={})
+
+        async def _send():
+            _fake_session = mock.Mock(request=_fake_request)
+            with mock.patch(
+                "addon_service.common.network.get_singleton_client_session",
+                return_value=_fake_session,
+            ):
+                async with _network.GET("foo"):
+                    pass
+
+        with self.subTest("not expiring"):
+            _network = self._network()
+            async_to_sync(_send)()
+            self.assertEqual(self._token_requests, [])
+            self.assertEqual(
+                _sent_headers[-1]["Authorization"],
+                "Bearer old-token",
+            )
+        with self.subTest("expiring"):
+            self._expire_soon()
+            _network = self._network()
+            async_to_sync(_send)()
+            self.assertEqual(len(self._token_requests), 1)
+            self.assertEqual(
+                _sent_headers[-1]["Authorization"],
+                "Bearer fresh-token-1",
+            )
+
+    def test_refresh_within_unit_of_work(self):
+        _sent_headers = []
+        _statuses = []
+
+        @contextlib.asynccontextmanager
+        async def _fake_request(method, url, params, headers, data=None):
+            _sent_headers.append(headers["Authorization"])
+            yield _FakeAiohttpResponse(status=_statuses.pop(0), data={})
+
+        async def _send():
+            _fake_session = mock.Mock(request=_fake_request)
+            with mock.patch(
+                "addon_service.common.network.get_singleton_client_session",
+                return_value=_fake_session,
+            ):
+                async with _network.GET("foo"):
+                    pass
+
+        with self.subTest("retry after 401"), unit_of_work():
+            _network = self._network()
+            _statuses[:] = [HTTPStatus.UNAUTHORIZED, HTTPStatus.OK]
+            async_to_sync(_send)()
+            self.assertEqual(
+                _sent_headers, ["Bearer old-token", "Bearer fresh-token-1"]
+            )
+        _sent_headers.clear()
+        with self.subTest("expiring"), unit_of_work():
+            self._expire_soon()
+            _network = self._network()
+            _statuses[:] = [HTTPStatus.OK]
+            async_to_sync(_send)()
+            self.assertEqual(_sent_headers, ["Bearer fresh-token-2"])
+
+    def _network(self) -> GravyvaletHttpRequestor:
+        _network = GravyvaletHttpRequestor(
+            prefix_url="https://api.example/",
+            account=self._load_account(),
+        )
+        _network.preload__blocking()
+        return _network
+
+
+class TestRefreshExpiringTokens(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with patch_encryption_key_derivation():
+            cls._expiring_account = cls._oauth_account(expires_in=60)
+            cls._unexpiring_account = cls._oauth_account(expires_in=3600)
+            cls._failing_account = cls._oauth_account(expires_in=60)
+            cls._long_expired_account = cls._oauth_account(expires_in=-7200)
+
+    @staticmethod
+    def _oauth_account(*, expires_in):
+        _account = _factories.AuthorizedStorageAccountFactory(
+            credentials_format=CredentialsFormats.OAUTH2,
+        )
+        _account.oauth2_token_metadata.update_with_fresh_token__blocking(
+            FreshTokenResult(
+                access_token="old-token",
+                refresh_token=f"refresh-token-{_account.pk}",
+                expires_in=expires_in,
+                scopes=None,
+            )
+        )
+        return _account
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+
+        async def _fake_refresh(*, refresh_token, **kwargs):
+            if refresh_token.endswith(self._failing_account.pk):
+                raise RuntimeError("nope")
+            return FreshTokenResult(
+                access_token="fresh-token",
+                refresh_token=refresh_token,
+                expires_in=3600,
+                scopes=None,
+            )
+
+        self.enterContext(
+            mock.patch(
+                "addon_service.oauth.utils.get_refreshed_access_token",
+                side_effect=_fake_refresh,
+            )
+        )
+
+    def test_refresh_expiring_tokens(self):
+        with self.assertLogs("addon_service.tasks.token_refresh", "INFO"):
+            _report = token_refresh.refresh_expiring_tokens(
+                within_seconds=600,
+                concurrency=1,
+                grace_seconds=3600,
+            )
+        self.assertEqual(
+            _report,
+            token_refresh.TokenRefreshReport(refreshed=1, skipped=0, failed=1),
+        )
+        self._expiring_account.refresh_from_db()
+        self.assertEqual(self._expiring_account.credentials.access_token, "fresh-token")
+        self._unexpiring_account.refresh_from_db()
+        self.assertEqual(self._unexpiring_account.credentials.access_token, "old-token")
+        # (expired too long ago to sweep -- left for on-demand refresh)
+        self._long_expired_account.refresh_from_db()
+        self.assertEqual(
+            self._long_expired_account.credentials.access_token, "old-token"
+        )
+
+
+class TestRefreshExpiringTokensConcurrently(TransactionTestCase):
+    # (not TestCase: worker threads use their own connections, so need committed rows)
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(patch_encryption_key_derivation())
+        self._expiring_accounts = [
+            TestRefreshExpiringTokens._oauth_account(expires_in=60) for _ in range(3)
+        ]
+        self._failing_account = TestRefreshExpiringTokens._oauth_account(expires_in=60)
+
+        async def _fake_refresh(*, refresh_token, **kwargs):
+            if refresh_token.endswith(self._failing_account.pk):
+                raise RuntimeError("nope")
+            return FreshTokenResult(
+                access_token="fresh-token",
+                refresh_token=refresh_token,
+                expires_in=3600,
+                scopes=None,
+            )
+
+        self.enterContext(
+            mock.patch(
+                "addon_service.oauth.utils.get_refreshed_access_token",
+                side_effect=_fake_refresh,
+            )
+        )
+
+    def test_refresh_expiring_tokens(self):
+        with self.assertLogs("addon_service.tasks.token_refresh", "INFO"):
+            _report = token_refresh.refresh_expiring_tokens(
+                within_seconds=600,
+                concurrency=2,
+                batch_size=2,
+            )
+        self.assertEqual(
+            _report,
+            token_refresh.TokenRefreshReport(refreshed=3, skipped=0, failed=1),
+        )
+        for _account in self._expiring_accounts:
+            _account.refresh_from_db()
+            self.assertEqual(_account.credentials.access_token, "fresh-token")
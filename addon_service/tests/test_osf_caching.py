@@ -0,0 +1,187 @@
+import contextlib
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+)
+
+from addon_service.common import osf
+from addon_service.common.exceptions import OsfUnavailable
+from addon_service.tests._helpers import _FakeAiohttpResponse
+
+
+class _FakeOsfClient:
+    """stand-in for an aiohttp.ClientSession that answers like osf's api"""
+
+    def __init__(self, current_user_permissions=("read", "write"), user_uri=None):
+        self.get_calls = []
+        self.status = HTTPStatus.OK
+        self._current_user_permissions = list(current_user_permissions)
+        self._user_uri = user_uri
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, *args, **kwargs):
+        self.get_calls.append(url)
+        if url.endswith("/v2/users/me/"):
+            yield (
+                _FakeAiohttpResponse(data={"data": {"links": {"iri": self._user_uri}}})
+                if self._user_uri
+                else _FakeAiohttpResponse(status=HTTPStatus.UNAUTHORIZED)
+            )
+            return
+        if self.status != HTTPStatus.OK:
+            yield _FakeAiohttpResponse(status=self.status, data={"errors": []})
+            return
+        yield _FakeAiohttpResponse(
+            data={
+                "data": {
+                    "embeds": {
+                        "referent": {
+                            "data": {
+                                "attributes": {
+                                    "current_user_permissions": self._current_user_permissions,
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        )
+
+
+class TestOsfPermissionCache(SimpleTestCase):
+    _resource_uri = f"{settings.OSF_BASE_URL}/abcde"
+
+    def setUp(self):
+        super().setUp()
+        self._fake_client = _FakeOsfClient()
+        self.enterContext(
+            mock.patch(
+                "addon_service.common.osf.get_singleton_client_session",
+                mock.AsyncMock(return_value=self._fake_client),
+            )
+        )
+        osf._permission_cache().clear()
+        self.addCleanup(osf._permission_cache().clear)
+
+    def _cookie_request(self, cookie_value: str):
+        _request = RequestFactory().get("/")
+        _request.COOKIES[settings.USER_REFERENCE_COOKIE] = cookie_value
+        return _request
+
+    def test_repeated_check_asks_osf_once(self):
+        _request = self._cookie_request("cookie-a")
+        for _ in range(3):
+            self.assertTrue(
+                osf.has_osf_permission_on_resource(
+                    _request, self._resource_uri, osf.OSFPermission.WRITE
+                )
+            )
+        self.assertEqual(len(self._fake_client.get_calls), 1)
+        self.assertEqual(osf._permission_cache().stats().hits, 2)
+
+    def test_cache_keyed_by_caller_and_permission(self):
+        _request_a = self._cookie_request("cookie-a")
+        _request_b = self._cookie_request("cookie-b")
+        self.assertTrue(
+            osf.has_osf_permission_on_resource(
+                _request_a, self._resource_uri, osf.OSFPermission.WRITE
+            )
+        )
+        self.assertTrue(
+            osf.has_osf_permission_on_resource(
+                _request_b, self._resource_uri, osf.OSFPermission.WRITE
+            )
+        )
+        self.assertFalse(
+            osf.has_osf_permission_on_resource(
+                _request_a, self._resource_uri, osf.OSFPermission.ADMIN
+            )
+        )
+        self.assertEqual(len(self._fake_client.get_calls), 3)
+
+    def test_osf_errors(self):
+        _request = self._cookie_request("cookie-a")
+        for _status in (
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            HTTPStatus.INTERNAL_SERVER_ERROR,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        ):
+            with self.subTest(_status):
+                self._fake_client.status = _status
+                with self.assertRaises(OsfUnavailable):
+                    osf.has_osf_permission_on_resource(
+                        _request, self._resource_uri, osf.OSFPermission.READ
+                    )
+                self.assertEqual(osf._permission_cache().keys(), [])  # (not cached)
+        self._fake_client.status = HTTPStatus.NOT_FOUND
+        self.assertFalse(
+            osf.has_osf_permission_on_resource(
+                _request, self._resource_uri, osf.OSFPermission.READ
+            )
+        )
+        self._fake_client.status = HTTPStatus.OK
+        self.assertFalse(  # (cached)
+            osf.has_osf_permission_on_resource(
+                _request, self._resource_uri, osf.OSFPermission.READ
+            )
+        )
+        self.assertEqual(len(self._fake_client.get_calls), 4)
+
+    def test_credentials_not_in_cache_keys(self):
+        osf.has_osf_permission_on_resource(
+            self._cookie_request("so-secret-cookie"),
+            self._resource_uri,
+            osf.OSFPermission.READ,
+        )
+        for _key in osf._permission_cache().keys():
+            self.assertNotIn("so-secret-cookie", repr(_key))
+
+    def test_cache_disabled(self):
+        osf._permission_cache.cache_clear()
+        self.addCleanup(osf._permission_cache.cache_clear)
+        with self.settings(OSF_PERMISSION_CACHE_SIZE=0):
+            _request = self._cookie_request("cookie-a")
+            for _ in range(2):
+                osf.has_osf_permission_on_resource(
+                    _request, self._resource_uri, osf.OSFPermission.READ
+                )
+        self.assertEqual(len(self._fake_client.get_calls), 2)
+
+
+class TestOsfUserCache(SimpleTestCase):
+    _user_uri = f"{settings.OSF_BASE_URL}/userr"
+    _resource_uri = f"{settings.OSF_BASE_URL}/abcde"
+
+    def setUp(self):
+        super().setUp()
+        self._fake_client = _FakeOsfClient(user_uri=self._user_uri)
+        self.enterContext(
+            mock.patch(
+                "addon_service.common.osf.get_singleton_client_session",
+                mock.AsyncMock(return_value=self._fake_client),
+            )
+        )
+        for _cache in (osf._user_uri_cache(), osf._permission_cache()):
+            _cache.clear()
+            self.addCleanup(_cache.clear)
+
+    def _bearer_request(self, token: str):
+        return RequestFactory().get("/", headers={"Authorization": f"Bearer {token}"})
+
+    def test_repeated_identify_asks_osf_once(self):
+        _request = self._bearer_request("token-a")
+        for _ in range(3):
+            self.assertEqual(osf.get_osf_user_uri(_request), self._user_uri)
+        self.assertEqual(len(self._fake_client.get_calls), 1)
+
+    def test_unrecognized_caller_not_cached(self):
+        self._fake_client._user_uri = None
+        _request = self._bearer_request("token-a")
+        self.assertIsNone(osf.get_osf_user_uri(_request))
+        self.assertEqual(osf._user_uri_cache().keys(), [])
+        self._fake_client._user_uri = self._user_uri
+        self.assertEqual(osf.get_osf_user_uri(_request), self._user_uri)
@@ -0,0 +1,183 @@
+"""query counts for json:api read endpoints, with and without `include`
+
+each case is counted twice -- before and after adding more related rows -- and
+both counts must equal the expected count, so per-row ("n+1") queries fail here
+(counts include the session lookup; update expected counts deliberately)
+
+not covered: including links-only relationships (e.g. `configured_storage_addons`),
+which the renderer does not support, and `authorized_operations`/`connected_operations`
+related endpoints, which fail building jsonschema for some operations
+"""
+
+import typing
+import urllib.parse
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from addon_service import models as db
+from addon_service.tests import _factories
+from addon_service.tests._helpers import MockOSF
+
+
+class _Case(typing.NamedTuple):
+    view_name: str
+    url_kwargs: typing.Callable[["TestQueryCounts"], dict]
+    expected_query_count: int
+    include: tuple[str, ...] = ()
+    list_filter: typing.Callable[["TestQueryCounts"], dict] | None = None
+
+
+def _pk(attr_name: str, related_field: str | None = None):
+    def _url_kwargs(test):
+        _kwargs = {"pk": getattr(test, attr_name).pk}
+        if related_field is not None:
+            _kwargs["related_field"] = related_field
+        return _kwargs
+
+    return _url_kwargs
+
+
+_CASES = (
+    # user references
+    _Case(
+        "user-references-list",
+        lambda test: {},
+        8,  # (counts for pagination)
+        list_filter=lambda test: {"filter[user_uri]": test._user.user_uri},
+    ),
+    _Case("user-references-detail", _pk("_user"), 7),
+    _Case(
+        "user-references-related",
+        _pk("_user", "authorized_storage_accounts"),
+        8,
+    ),
+    _Case("user-references-related", _pk("_user", "configured_resources"), 8),
+    # authorized storage accounts
+    _Case("authorized-storage-accounts-detail", _pk("_account"), 7),
+    _Case(
+        "authorized-storage-accounts-detail",
+        _pk("_account"),
+        7,
+        include=("account_owner", "external_storage_service", "authorized_operations"),
+    ),
+    _Case(
+        "authorized-storage-accounts-related",
+        _pk("_account", "account_owner"),
+        7,
+    ),
+    _Case(
+        "authorized-storage-accounts-related",
+        _pk("_account", "external_storage_service"),
+        7,
+    ),
+    _Case(
+        "authorized-storage-accounts-related",
+        _pk("_account", "configured_storage_addons"),
+        8,
+    ),
+    # configured storage addons
+    _Case("configured-storage-addons-detail", _pk("_addon"), 7),
+    _Case(
+        "configured-storage-addons-detail",
+        _pk("_addon"),
+        7,
+        include=("base_account", "authorized_resource", "connected_operations"),
+    ),
+    _Case(
+        "configured-storage-addons-related",
+        _pk("_addon", "base_account"),
+        7,
+    ),
+    _Case(
+        "configured-storage-addons-related",
+        _pk("_addon", "authorized_resource"),
+        7,
+    ),
+    # resource references
+    _Case(
+        "resource-references-list",
+        lambda test: {},
+        8,  # (counts for pagination)
+        list_filter=lambda test: {"filter[resource_uri]": test._resource.resource_uri},
+    ),
+    _Case("resource-references-detail", _pk("_resource"), 7),
+    _Case(
+        "resource-references-related",
+        _pk("_resource", "configured_storage_addons"),
+        8,
+    ),
+)
+
+# each include path alone, too
+_SINGLE_INCLUDE_CASES = tuple(
+    _case._replace(include=(_include_path,))
+    for _case in _CASES
+    if len(_case.include) > 1
+    for _include_path in _case.include
+)
+
+
+class TestQueryCounts(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._user = _factories.UserReferenceFactory()
+        cls._resource = _factories.ResourceReferenceFactory()
+        cls._account = cls._add_account()
+        cls._addon = db.ConfiguredStorageAddon.objects.get(
+            base_account=cls._account, authorized_resource=cls._resource
+        )
+
+    @classmethod
+    def _add_account(cls) -> db.AuthorizedStorageAccount:
+        _account = _factories.AuthorizedStorageAccountFactory(account_owner=cls._user)
+        for _resource in (cls._resource, _factories.ResourceReferenceFactory()):
+            _factories.ConfiguredStorageAddonFactory(
+                base_account=_account, authorized_resource=_resource
+            )
+        return _account
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies[settings.USER_REFERENCE_COOKIE] = self._user.user_uri
+        self._mock_osf = MockOSF()
+        self.enterContext(self._mock_osf.mocking())
+
+    def _allow_all_resources(self):
+        for _resource in db.ResourceReference.objects.all():
+            self._mock_osf.configure_user_role(
+                self._user.user_uri, _resource.resource_uri, "admin"
+            )
+
+    def _count_queries(self, case: _Case) -> int:
+        _url = reverse(case.view_name, kwargs=case.url_kwargs(self))
+        _query = case.list_filter(self) if case.list_filter else {}
+        if case.include:
+            _query["include"] = ",".join(case.include)
+        if _query:
+            _url = f"{_url}?{urllib.parse.urlencode(_query)}"
+        with CaptureQueriesContext(connection) as _queries:
+            _response = self.client.get(_url)
+        self.assertEqual(_response.status_code, 200, _url)
+        return len(_queries)
+
+    def test_query_counts(self):
+        _cases = _CASES + _SINGLE_INCLUDE_CASES
+        self._allow_all_resources()
+        _counts = [self._count_queries(_case) for _case in _cases]
+        # more rows, same queries
+        for _ in range(3):
+            self._add_account()
+        self._allow_all_resources()
+        _more_counts = [self._count_queries(_case) for _case in _cases]
+        for _case, _count, _more_count in zip(_cases, _counts, _more_counts):
+            with self.subTest(
+                _case.view_name, include=_case.include, **_case.url_kwargs(self)
+            ):
+                self.assertEqual(
+                    (_count, _more_count),
+                    (_case.expected_query_count, _case.expected_query_count),
+                )
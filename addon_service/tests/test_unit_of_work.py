@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from addon_service import models as db
+from addon_service.authorized_storage_account.views import (
+    AuthorizedStorageAccountViewSet,
+)
+from addon_service.common.exceptions import QueryBudgetExceeded
+from addon_service.common.unit_of_work import unit_of_work
+from addon_service.tests import _factories
+from addon_service.tests._helpers import MockOSF
+
+
+class TestUnitOfWork(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._addon = _factories.ConfiguredStorageAddonFactory()
+
+    def _load_addon(self) -> db.ConfiguredStorageAddon:
+        return db.ConfiguredStorageAddon.objects.get(pk=self._addon.pk)
+
+    def test_identity_map(self):
+        with unit_of_work():
+            _addon_a = self._load_addon()
+            _addon_b = self._load_addon()
+            with self.assertNumQueries(1):
+                _account = _addon_a._base_account
+            with self.assertNumQueries(0):
+                self.assertIs(_addon_b._base_account, _account)
+            with self.assertNumQueries(1):
+                _addon_a.external_service
+            with self.assertNumQueries(0):
+                _addon_b.external_service
+        # outside a unit of work, each instance loads its own
+        _addon_c = self._load_addon()
+        with self.assertNumQueries(1):
+            self.assertIsNot(_addon_c._base_account, _account)
+
+    def test_memoized(self):
+        _imp_cls = self._addon.base_account.imp_cls
+        with unit_of_work():
+            _account_a = db.AuthorizedStorageAccount.objects.get(
+                pk=self._addon.base_account_id
+            )
+            _account_b = db.AuthorizedStorageAccount.objects.get(
+                pk=self._addon.base_account_id
+            )
+            with mock.patch.object(
+                _imp_cls,
+                "implemented_operations_for_capabilities",
+                wraps=_imp_cls.implemented_operations_for_capabilities,
+            ) as _mock_ops:
+                _names = _account_a.authorized_operation_names
+                self.assertEqual(_account_b.authorized_operation_names, _names)
+                self.assertEqual(_mock_ops.call_count, 1)
+                # recomputed when dependencies change
+                _account_b.int_authorized_capabilities = 0
+                self.assertEqual(_account_b.authorized_operation_names, [])
+                self.assertEqual(_mock_ops.call_count, 2)
+                # forgotten on save
+                _account_a.save()
+                self.assertEqual(_account_a.authorized_operation_names, _names)
+                self.assertEqual(_mock_ops.call_count, 3)
+
+
+class TestQueryBudget(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls._account = _factories.AuthorizedStorageAccountFactory()
+
+    def setUp(self):
+        super().setUp()
+        self.client.cookies[settings.USER_REFERENCE_COOKIE] = (
+            self._account.account_owner.user_uri
+        )
+        self.enterContext(MockOSF().mocking())
+
+    def _get_detail(self):
+        return self.client.get(
+            reverse(
+                "authorized-storage-accounts-detail",
+                kwargs={"pk": self._account.pk},
+            )
+        )
+
+    def test_within_budget(self):
+        with self.settings(GRAVYVALET_ENFORCE_QUERY_BUDGETS=True):
+            self.assertEqual(self._get_detail().status_code, 200)
+
+    def test_over_budget(self):
+        with (
+            self.settings(GRAVYVALET_ENFORCE_QUERY_BUDGETS=True),
+            mock.patch.object(
+                AuthorizedStorageAccountViewSet, "query_budget", {"retrieve": 0}
+            ),
+        ):
+            with self.assertRaises(QueryBudgetExceeded):
+                self._get_detail()
+        with (
+            self.settings(GRAVYVALET_ENFORCE_QUERY_BUDGETS=False),
+            mock.patch.object(
+                AuthorizedStorageAccountViewSet, "query_budget", {"retrieve": 0}
+            ),
+        ):
+            self.assertEqual(self._get_detail().status_code, 200)
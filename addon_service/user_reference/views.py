@@ -1,3 +1,6 @@
+from addon_service.authorized_storage_account import (
+    serializers as authorized_storage_account_serializers,
+)
 from addon_service.common.permissions import SessionUserIsOwner
 from addon_service.common.viewsets import RestrictedReadOnlyViewSet
 
@@ -8,6 +11,16 @@ from .serializers import UserReferenceSerializer
 class UserReferenceViewSet(RestrictedReadOnlyViewSet):
     queryset = UserReference.objects.all()
     serializer_class = UserReferenceSerializer
+    select_for_related = {
+        "authorized_storage_accounts": (
+            authorized_storage_account_serializers.SELECT_FOR_SERIALIZING
+        ),
+    }
+    query_budget = {
+        "list": 4,
+        "retrieve": 3,
+        "retrieve_related": 4,
+    }
     permission_classes = [
         SessionUserIsOwner,
     ]
@@ -2,6 +2,7 @@
 
 from http import HTTPStatus
 
+from django.conf import settings
 from django.db import transaction
 from django.http import HttpResponse
 
@@ -14,6 +15,7 @@ from addon_service.authorized_storage_account.views import (
     AuthorizedStorageAccountViewSet,
 )
 from addon_service.configured_storage_addon.views import ConfiguredStorageAddonViewSet
+from addon_service.credentials import warmup
 from addon_service.external_storage_service.views import ExternalStorageServiceViewSet
 from addon_service.oauth.views import oauth2_callback_view
 from addon_service.resource_reference.views import ResourceReferenceViewSet
@@ -25,6 +27,8 @@ async def status(request):
     """
     Handles status checks for the GV
     """
+    if settings.GRAVYVALET_WARMUP_AT_STARTUP and not warmup.is_warm():
+        return HttpResponse(status=HTTPStatus.SERVICE_UNAVAILABLE)
     return HttpResponse(status=HTTPStatus.OK)
 
 
@@ -1,6 +1,7 @@
 from .addon_operation_declaration import (
     AddonOperationDeclaration,
     AddonOperationType,
+    InvocationPersistence,
     addon_operation,
     eventual_operation,
     immediate_operation,
@@ -18,6 +19,7 @@ __all__ = (
     "AddonInterface",
     "AddonOperationDeclaration",
     "AddonOperationType",
+    "InvocationPersistence",
     "RedirectResult",
     "addon_operation",
     "eventual_operation",
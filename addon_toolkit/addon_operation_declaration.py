@@ -1,4 +1,5 @@
 import dataclasses
+import datetime
 import enum
 import inspect
 from typing import (
@@ -15,6 +16,7 @@ from .declarator import Declarator
 __all__ = (
     "AddonOperationDeclaration",
     "AddonOperationType",
+    "InvocationPersistence",
     "addon_operation",
     "eventual_operation",
     "immediate_operation",
@@ -28,6 +30,15 @@ class AddonOperationType(enum.Enum):
     EVENTUAL = "eventual"  # gravyvalet starts a potentially long-running act, responding immediately with status
 
 
+class InvocationPersistence(enum.Enum):
+    ALWAYS = (
+        "always"  # every invocation is saved (required for all but ACCESS operations)
+    )
+    ON_ERROR = "on_error"  # only failed invocations are saved
+    SAMPLED = "sampled"  # failed invocations and a sample of the rest are saved
+    NEVER = "never"  # invocations live only as long as their response
+
+
 @dataclasses.dataclass(frozen=True)
 class AddonOperationDeclaration:
     """dataclass for a declared operation method on an interface
@@ -43,6 +54,18 @@ class AddonOperationDeclaration:
         default=type(None),  # if not provided, inferred by __post_init__
         compare=False,
     )
+    # results may be reused (for the same account and arguments) for this long
+    # -- only for immediate operations with ACCESS capability
+    cache_ttl: datetime.timedelta | None = dataclasses.field(
+        default=None,
+        compare=False,
+    )
+    # which invocations are saved to the database -- anything other than ALWAYS
+    # only for immediate (or redirect) operations with ACCESS capability
+    persistence: InvocationPersistence = dataclasses.field(
+        default=InvocationPersistence.ALWAYS,
+        compare=False,
+    )
 
     @classmethod
     def for_function(self, fn: Callable) -> "AddonOperationDeclaration":
@@ -54,6 +77,20 @@ class AddonOperationDeclaration:
     def __post_init__(self):
         if len(self.capability) != 1:
             raise exceptions.OperationNotValid
+        if self.cache_ttl is not None and (
+            self.operation_type is not AddonOperationType.IMMEDIATE
+            or self.capability is not AddonCapabilities.ACCESS
+        ):
+            raise exceptions.OperationNotValid(
+                f"only immediate ACCESS operations may declare cache_ttl (got {self.operation_fn})"
+            )
+        if self.persistence is not InvocationPersistence.ALWAYS and (
+            self.operation_type is AddonOperationType.EVENTUAL
+            or self.capability is not AddonCapabilities.ACCESS
+        ):
+            raise exceptions.OperationNotValid(
+                f"only immediate ACCESS operations may skip saving invocations (got {self.operation_fn})"
+            )
         _return_type = self.call_signature.return_annotation
         if self.result_dataclass is type(None):
             # no result_dataclass declared; infer from type annotation
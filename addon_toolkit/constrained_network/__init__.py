@@ -1,4 +1,6 @@
 from .http import (
+    DEFAULT_CHUNK_SIZE,
+    HttpRequestContent,
     HttpRequestInfo,
     HttpRequestor,
     HttpResponseInfo,
@@ -9,6 +11,8 @@ from .http import (
 
 
 __all__ = (
+    "DEFAULT_CHUNK_SIZE",
+    "HttpRequestContent",
     "HttpRequestInfo",
     "HttpRequestor",
     "HttpResponseInfo",
@@ -1,5 +1,6 @@
 import contextlib
 import dataclasses
+import json
 import typing
 from functools import partialmethod
 from http import (
@@ -11,14 +12,22 @@ from addon_toolkit.iri_utils import (
     KeyValuePairs,
     Multidict,
 )
+from addon_toolkit.json_stream import iter_json_array_items
 
 
 __all__ = (
+    "DEFAULT_CHUNK_SIZE",
+    "HttpRequestContent",
     "HttpRequestInfo",
     "HttpResponseInfo",
     "HttpRequestor",
 )
 
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# a request body: all at once, or streamed in chunks (sent as they're produced)
+HttpRequestContent: typing.TypeAlias = bytes | typing.AsyncIterable[bytes] | None
+
 
 @dataclasses.dataclass
 class HttpRequestInfo:
@@ -26,8 +35,7 @@ class HttpRequestInfo:
     uri_path: str
     query: Multidict
     headers: Multidict
-
-    # TODO: content (when needed)
+    content: HttpRequestContent = None
 
 
 class HttpResponseInfo(typing.Protocol):
@@ -39,7 +47,21 @@ class HttpResponseInfo(typing.Protocol):
 
     async def json_content(self) -> typing.Any: ...
 
-    # TODO: streaming (when needed)
+    def iter_content(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.AsyncIterator[bytes]:
+        """iterate over chunks of the response body, as they arrive
+
+        (the body can be read once -- either thru this or `json_content`)
+        """
+        ...
+
+    def iter_json_array_items(self, *path: str) -> typing.AsyncIterator[typing.Any]:
+        """iterate over items of a json array in the response body, as they arrive
+
+        `path` is object keys leading to the array (none if the body is the array)
+        """
+        return iter_json_array_items(self.iter_content(), *path)
 
 
 class _MethodRequestMethod(typing.Protocol):
@@ -53,6 +75,8 @@ class _MethodRequestMethod(typing.Protocol):
         uri_path: str,
         query: Multidict | KeyValuePairs | None = None,
         headers: Multidict | KeyValuePairs | None = None,
+        content: HttpRequestContent = None,
+        json_content: typing.Any = None,
     ) -> contextlib.AbstractAsyncContextManager[HttpResponseInfo]: ...
 
 
@@ -72,18 +96,31 @@ class HttpRequestor(typing.Protocol):
         uri_path: str,
         query: Multidict | KeyValuePairs | None = None,
         headers: Multidict | KeyValuePairs | None = None,
+        content: HttpRequestContent = None,
+        json_content: typing.Any = None,
     ):
+        """send a request; use the response within the context
+
+        for a request body, give either `content` (bytes, or an async iterable of
+        bytes to stream) or `json_content` (any json-serializable value)
+        """
+        _headers = headers if isinstance(headers, Multidict) else Multidict(headers)
+        if json_content is not None:
+            if content is not None:
+                raise ValueError("give `content` or `json_content`, not both")
+            content = json.dumps(json_content).encode()
+            if "Content-Type" not in _headers:
+                _headers.add("Content-Type", "application/json")
         _request_info = HttpRequestInfo(
             http_method=http_method,
             uri_path=uri_path,
             query=(query if isinstance(query, Multidict) else Multidict(query)),
-            headers=(headers if isinstance(headers, Multidict) else Multidict(headers)),
+            headers=_headers,
+            content=content,
         )
         async with self.do_send(_request_info) as _response:
             yield _response
 
-    # TODO: streaming send/receive (only if/when needed)
-
     ###
     # convenience methods for http methods
     # (same call signature as self.request, minus `http_method`)
@@ -90,12 +90,29 @@ class AddonImp:
     async def invoke_operation(
         self, operation: AddonOperationDeclaration, json_kwargs: dict
     ):
-        _operation_method = getattr(self, operation.name)
-        _kwargs = kwargs_from_json(operation.call_signature, json_kwargs)
+        _operation_method, _kwargs = self._operation_call(operation, json_kwargs)
         if not inspect.iscoroutinefunction(_operation_method):
             _operation_method = sync_to_async(_operation_method)
-        _result = await _operation_method(**_kwargs)
-        assert isinstance(_result, operation.result_dataclass)
-        return _result
+        return self._checked_result(operation, await _operation_method(**_kwargs))
 
-    invoke_operation__blocking = async_to_sync(invoke_operation)
+    def invoke_operation__blocking(
+        self, operation: AddonOperationDeclaration, json_kwargs: dict
+    ):
+        _operation_method, _kwargs = self._operation_call(operation, json_kwargs)
+        if inspect.iscoroutinefunction(_operation_method):
+            _operation_method = async_to_sync(_operation_method)
+        # (a sync operation called from sync code needs no event loop)
+        return self._checked_result(operation, _operation_method(**_kwargs))
+
+    def _operation_call(
+        self, operation: AddonOperationDeclaration, json_kwargs: dict
+    ) -> tuple[typing.Callable, dict]:
+        return (
+            getattr(self, operation.name),
+            kwargs_from_json(operation.call_signature, json_kwargs),
+        )
+
+    @staticmethod
+    def _checked_result(operation: AddonOperationDeclaration, result: typing.Any):
+        assert isinstance(result, operation.result_dataclass)
+        return result
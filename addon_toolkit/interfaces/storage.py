@@ -1,11 +1,15 @@
 """a static (and still in progress) definition of what composes a storage addon"""
 
 import dataclasses
+import datetime
 import enum
 import typing
 from collections import abc
 
-from addon_toolkit.addon_operation_declaration import immediate_operation
+from addon_toolkit.addon_operation_declaration import (
+    InvocationPersistence,
+    immediate_operation,
+)
 from addon_toolkit.capabilities import AddonCapabilities
 from addon_toolkit.constrained_network import HttpRequestor
 from addon_toolkit.cursor import Cursor
@@ -79,6 +83,11 @@ class ItemSampleResult:
 ###
 # declaration of all storage addon operations
 
+# browsing (e.g. in a file picker) repeats the same requests often
+# (and needs no record of successful requests)
+_BROWSING_CACHE_TTL = datetime.timedelta(seconds=30)
+_BROWSING_PERSISTENCE = InvocationPersistence.ON_ERROR
+
 
 class StorageAddonInterface(AddonInterface, typing.Protocol):
 
@@ -88,7 +97,11 @@ class StorageAddonInterface(AddonInterface, typing.Protocol):
     # @redirect_operation(capability=AddonCapabilities.ACCESS)
     # def download(self, item_id: str) -> RedirectResult: ...
 
-    @immediate_operation(capability=AddonCapabilities.ACCESS)
+    @immediate_operation(
+        capability=AddonCapabilities.ACCESS,
+        cache_ttl=_BROWSING_CACHE_TTL,
+        persistence=_BROWSING_PERSISTENCE,
+    )
     async def get_item_info(self, item_id: str) -> ItemResult: ...
 
     #
@@ -105,10 +118,18 @@ class StorageAddonInterface(AddonInterface, typing.Protocol):
     ##
     # tree-read operations:
 
-    @immediate_operation(capability=AddonCapabilities.ACCESS)
+    @immediate_operation(
+        capability=AddonCapabilities.ACCESS,
+        cache_ttl=_BROWSING_CACHE_TTL,
+        persistence=_BROWSING_PERSISTENCE,
+    )
     async def list_root_items(self, page_cursor: str = "") -> ItemSampleResult: ...
 
-    @immediate_operation(capability=AddonCapabilities.ACCESS)
+    @immediate_operation(
+        capability=AddonCapabilities.ACCESS,
+        cache_ttl=_BROWSING_CACHE_TTL,
+        persistence=_BROWSING_PERSISTENCE,
+    )
     async def list_child_items(
         self,
         item_id: str,
@@ -0,0 +1,214 @@
+"""incremental json parsing, for large list responses
+
+decode items of a json array as chunks of the document arrive, without holding
+the whole document (or all items) in memory
+
+>>> _decoder = JsonArrayItemsDecoder("data")
+>>> _decoder.feed(b'{"meta": {"total": 3}, "data": [{"id": "a"}, {"i')
+[{'id': 'a'}]
+>>> _decoder.feed(b'd": "b"}, 7')
+[{'id': 'b'}]
+>>> _decoder.feed(b']}')
+[7]
+>>> _decoder.finish()
+[]
+
+(only the array's items are decoded one at a time -- any other value before the
+array, like "meta" above, is decoded whole, then dropped)
+"""
+
+import codecs
+import enum
+import json
+import typing
+
+
+__all__ = (
+    "JsonArrayItemsDecoder",
+    "iter_json_array_items",
+)
+
+
+class JsonArrayItemsDecoder:
+    """decode items of a json array from chunks of a json document
+
+    `path` is a sequence of object keys leading to the array -- empty when the
+    document itself is the array
+
+    raises ValueError (or json.JSONDecodeError, a subclass) for invalid json
+    or if there's no array at the given path
+    """
+
+    def __init__(self, *path: str) -> None:
+        self._path = path
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0  # (index into path)
+        self._state = _State.OPEN_OBJECT if path else _State.OPEN_ARRAY
+        self._final = False
+
+    @property
+    def done(self) -> bool:
+        return self._state is _State.DONE
+
+    def feed(self, chunk: bytes) -> list[typing.Any]:
+        """take another chunk of the document; return items completed by it"""
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._decode_available()
+
+    def finish(self) -> list[typing.Any]:
+        """end of the document; return any last items"""
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._final = True
+        _items = self._decode_available()
+        if not self.done:
+            raise ValueError(
+                f"json document ended before the end of its array (path {self._path})"
+            )
+        return _items
+
+    def _decode_available(self) -> list[typing.Any]:
+        _items: list[typing.Any] = []
+        try:
+            while self._state is not _State.DONE:
+                self._step(_items)
+        except _NeedMore:
+            pass
+        # drop what's been consumed
+        _consumed, self._pos = self._pos, 0
+        self._buffer = self._buffer[_consumed:]
+        return _items
+
+    def _step(self, items: list[typing.Any]) -> None:
+        # each step consumes from the buffer only once it can complete
+        # (raising _NeedMore without changing state, otherwise)
+        match self._state:
+            case _State.OPEN_OBJECT:
+                self._consume_char("{")
+                self._state = _State.KEY_OR_END
+            case _State.KEY_OR_END | _State.KEY:
+                if self._state is _State.KEY_OR_END and self._peek_char() == "}":
+                    self._fail_not_found()
+                _key, _end = self._decode_value()
+                _colon = self._skip_whitespace(_end)
+                if _colon >= len(self._buffer):
+                    raise _NeedMore
+                if self._buffer[_colon] != ":" or not isinstance(_key, str):
+                    self._fail_invalid(_colon)
+                self._pos = _colon + 1
+                if _key != self._path[self._depth]:
+                    self._state = _State.SKIP_VALUE
+                elif self._depth + 1 < len(self._path):
+                    self._depth += 1
+                    self._state = _State.OPEN_OBJECT
+                else:
+                    self._state = _State.OPEN_ARRAY
+            case _State.SKIP_VALUE:
+                _, self._pos = self._decode_value()
+                self._state = _State.AFTER_MEMBER
+            case _State.AFTER_MEMBER:
+                if self._consume_char(",}") == "}":
+                    self._fail_not_found()
+                self._state = _State.KEY
+            case _State.OPEN_ARRAY:
+                self._consume_char("[")
+                self._state = _State.ITEM_OR_END
+            case _State.ITEM_OR_END | _State.ITEM:
+                if self._state is _State.ITEM_OR_END and self._peek_char() == "]":
+                    self._consume_char("]")
+                    self._state = _State.DONE
+                    return
+                _item, self._pos = self._decode_value()
+                items.append(_item)
+                self._state = _State.AFTER_ITEM
+            case _State.AFTER_ITEM:
+                _char = self._consume_char(",]")
+                self._state = _State.ITEM if _char == "," else _State.DONE
+
+    def _skip_whitespace(self, pos: int) -> int:
+        while pos < len(self._buffer) and self._buffer[pos] in _JSON_WHITESPACE:
+            pos += 1
+        return pos
+
+    def _peek_char(self) -> str:
+        self._pos = self._skip_whitespace(self._pos)
+        if self._pos >= len(self._buffer):
+            raise _NeedMore
+        return self._buffer[self._pos]
+
+    def _consume_char(self, expected: str) -> str:
+        _char = self._peek_char()
+        if _char not in expected:
+            self._fail_invalid(self._pos)
+        self._pos += 1
+        return _char
+
+    def _decode_value(self) -> tuple[typing.Any, int]:
+        _start = self._skip_whitespace(self._pos)
+        try:
+            _value, _end = _JSON_DECODER.raw_decode(self._buffer, _start)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            raise _NeedMore  # (assume incomplete -- any error will recur at the end)
+        if not self._final and (
+            _end >= len(self._buffer)
+            or (
+                isinstance(_value, (int, float))
+                and self._buffer[_end] not in _AFTER_NUMBER
+            )
+        ):
+            raise _NeedMore  # (a number may continue, like "-2" in "-2.5e3")
+        return _value, _end
+
+    def _fail_invalid(self, pos: int) -> typing.NoReturn:
+        raise json.JSONDecodeError(
+            f"unexpected character (in state {self._state.name})", self._buffer, pos
+        )
+
+    def _fail_not_found(self) -> typing.NoReturn:
+        raise ValueError(f"no array at path {self._path}")
+
+
+async def iter_json_array_items(
+    chunks: typing.AsyncIterable[bytes], *path: str
+) -> typing.AsyncIterator[typing.Any]:
+    """decode items of a json array, given chunks of a json document
+
+    (stops reading once the array ends)
+    """
+    _decoder = JsonArrayItemsDecoder(*path)
+    async for _chunk in chunks:
+        for _item in _decoder.feed(_chunk):
+            yield _item
+        if _decoder.done:
+            return
+    for _item in _decoder.finish():
+        yield _item
+
+
+###
+# module-private helpers
+
+
+class _NeedMore(Exception):
+    pass
+
+
+class _State(enum.Enum):
+    OPEN_OBJECT = enum.auto()
+    KEY_OR_END = enum.auto()
+    KEY = enum.auto()
+    SKIP_VALUE = enum.auto()
+    AFTER_MEMBER = enum.auto()
+    OPEN_ARRAY = enum.auto()
+    ITEM_OR_END = enum.auto()
+    ITEM = enum.auto()
+    AFTER_ITEM = enum.auto()
+    DONE = enum.auto()
+
+
+_JSON_WHITESPACE = " \t\n\r"
+_AFTER_NUMBER = f"{_JSON_WHITESPACE},]}}"
+_JSON_DECODER = json.JSONDecoder()
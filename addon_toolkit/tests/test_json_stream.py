@@ -0,0 +1,61 @@
+import json
+import unittest
+
+import addon_toolkit.json_stream
+from addon_toolkit.json_stream import JsonArrayItemsDecoder
+from addon_toolkit.tests._doctest import load_doctests
+
+
+load_tests = load_doctests(addon_toolkit.json_stream)
+
+
+class TestJsonArrayItemsDecoder(unittest.TestCase):
+    def _decode_in_chunks(self, document: str, *path: str, chunk_size: int):
+        _encoded = document.encode()
+        _decoder = JsonArrayItemsDecoder(*path)
+        _items = []
+        for _start in range(0, len(_encoded), chunk_size):
+            _end = _start + chunk_size
+            _items.extend(_decoder.feed(_encoded[_start:_end]))
+        _items.extend(_decoder.finish())
+        return _items
+
+    def test_any_chunk_size(self):
+        _items = [1, -2.5e3, "ü,]}", None, True, [], {"a": [{}]}, 123456789]
+        _cases = [
+            (json.dumps(_items), ()),
+            (json.dumps({"items": _items}), ("items",)),
+            (
+                json.dumps({"x": [1, {"items": 2}], "page": {"items": _items}, "z": 0}),
+                ("page", "items"),
+            ),
+            (json.dumps(_items, indent=2), ()),
+        ]
+        for _document, _path in _cases:
+            for _chunk_size in (1, 2, 7, len(_document)):
+                with self.subTest(path=_path, chunk_size=_chunk_size):
+                    self.assertEqual(
+                        self._decode_in_chunks(
+                            _document, *_path, chunk_size=_chunk_size
+                        ),
+                        _items,
+                    )
+
+    def test_empty(self):
+        self.assertEqual(self._decode_in_chunks("[ ]", chunk_size=1), [])
+        self.assertEqual(self._decode_in_chunks('{"a": []}', "a", chunk_size=1), [])
+
+    def test_invalid(self):
+        _cases = [
+            ("[1, 2", ()),  # incomplete
+            ("[1 2]", ()),
+            ('{"a": 1}', ()),  # not an array
+            ('{"a": 1}', ("b",)),  # no such key
+            ("{}", ("a",)),
+            ('{"a": {"b": []}}', ("a", "c")),
+            ("[1, nope]", ()),
+        ]
+        for _document, _path in _cases:
+            with self.subTest(_document, path=_path):
+                with self.assertRaises(ValueError):
+                    self._decode_in_chunks(_document, *_path, chunk_size=3)
@@ -9,9 +9,15 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_asgi_application()
+
+if settings.GRAVYVALET_WARMUP_AT_STARTUP:
+    from addon_service.credentials.warmup import start_warmup
+
+    start_warmup()
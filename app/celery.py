@@ -3,6 +3,7 @@ import enum
 from celery import (
     Celery,
     bootsteps,
+    signals,
 )
 from kombu import (
     Consumer,
@@ -11,7 +12,10 @@ from kombu import (
 
 from app.env import (
     AMQP_BROKER_URL,
+    GRAVYVALET_WARMUP_AT_STARTUP,
     GV_QUEUE_NAME_PREFIX,
+    INVOCATION_PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    OAUTH_TOKEN_SWEEP_INTERVAL_SECONDS,
     OSF_BACKCHANNEL_QUEUE_NAME,
 )
 
@@ -41,6 +45,18 @@ app = Celery(
         "addon_service.tasks.invocation.*": {"queue": gv_interactive_queue},
         "addon_service.tasks.osf_backchannel.*": {"queue": gv_reactive_queue},
         "addon_service.tasks.key_rotation.*": {"queue": gv_chill_queue},
+        "addon_service.tasks.token_refresh.*": {"queue": gv_chill_queue},
+        "addon_service.tasks.partition_maintenance.*": {"queue": gv_chill_queue},
+    },
+    beat_schedule={
+        "refresh-expiring-oauth-tokens": {
+            "task": "addon_service.tasks.token_refresh.refresh_expiring_tokens__celery",
+            "schedule": OAUTH_TOKEN_SWEEP_INTERVAL_SECONDS,
+        },
+        "maintain-invocation-partitions": {
+            "task": "addon_service.tasks.partition_maintenance.maintain_invocation_partitions__celery",
+            "schedule": INVOCATION_PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+        },
     },
     include=["addon_service.tasks"],
 )
@@ -69,3 +85,15 @@ class OsfBackchannelConsumerStep(bootsteps.ConsumerStep):
 
 
 app.steps["consumer"].add(OsfBackchannelConsumerStep)
+
+
+###
+# optional warmup in each worker process (see addon_service.credentials.warmup)
+
+
+@signals.worker_process_init.connect
+def _warm_up_worker_process(**kwargs):
+    if GRAVYVALET_WARMUP_AT_STARTUP:
+        from addon_service.credentials.warmup import start_warmup
+
+        start_warmup()
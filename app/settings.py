@@ -24,6 +24,17 @@ GRAVYVALET_SCRYPT_COST_LOG2 = env.GRAVYVALET_SCRYPT_COST_LOG2
 GRAVYVALET_SCRYPT_BLOCK_SIZE = env.GRAVYVALET_SCRYPT_BLOCK_SIZE
 GRAVYVALET_SCRYPT_PARALLELIZATION = env.GRAVYVALET_SCRYPT_PARALLELIZATION
 GRAVYVALET_DERIVED_KEY_CACHE_SIZE = env.GRAVYVALET_DERIVED_KEY_CACHE_SIZE
+GRAVYVALET_KEY_DERIVATION_WORKERS = env.GRAVYVALET_KEY_DERIVATION_WORKERS
+GRAVYVALET_WARMUP_AT_STARTUP = env.GRAVYVALET_WARMUP_AT_STARTUP
+GRAVYVALET_ROTATION_BATCH_SIZE = env.GRAVYVALET_ROTATION_BATCH_SIZE
+GRAVYVALET_ROTATION_WORKERS = env.GRAVYVALET_ROTATION_WORKERS
+GRAVYVALET_MAX_ROWS_PER_SALT = env.GRAVYVALET_MAX_ROWS_PER_SALT
+GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_SIZE = (
+    env.GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_SIZE
+)
+GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_TTL_SECONDS = (
+    env.GRAVYVALET_DECRYPTED_CREDENTIALS_CACHE_TTL_SECONDS
+)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -34,11 +45,41 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env.DEBUG
+GRAVYVALET_ENFORCE_QUERY_BUDGETS = env.GRAVYVALET_ENFORCE_QUERY_BUDGETS
 
 USER_REFERENCE_COOKIE = "osf"
 OSF_BASE_URL = env.OSF_BASE_URL.rstrip("/")
 OSF_API_BASE_URL = env.OSF_API_BASE_URL.rstrip("/")
 ALLOWED_RESOURCE_URI_PREFIXES = {OSF_BASE_URL}
+OSF_PERMISSION_CACHE_SIZE = env.OSF_PERMISSION_CACHE_SIZE
+OSF_PERMISSION_CACHE_TTL_SECONDS = env.OSF_PERMISSION_CACHE_TTL_SECONDS
+OSF_USER_CACHE_SIZE = env.OSF_USER_CACHE_SIZE
+OSF_USER_CACHE_TTL_SECONDS = env.OSF_USER_CACHE_TTL_SECONDS
+GRAVYVALET_OPERATION_RESULT_CACHE_SIZE = env.GRAVYVALET_OPERATION_RESULT_CACHE_SIZE
+GRAVYVALET_IMP_POOL_SIZE = env.GRAVYVALET_IMP_POOL_SIZE
+GRAVYVALET_IMP_POOL_IDLE_SECONDS = env.GRAVYVALET_IMP_POOL_IDLE_SECONDS
+GRAVYVALET_INVOCATION_SAMPLE_RATE = env.GRAVYVALET_INVOCATION_SAMPLE_RATE
+GRAVYVALET_AUDIT_SINK_MAX_PENDING = env.GRAVYVALET_AUDIT_SINK_MAX_PENDING
+GRAVYVALET_AUDIT_SINK_BATCH_SIZE = env.GRAVYVALET_AUDIT_SINK_BATCH_SIZE
+GRAVYVALET_AUDIT_SINK_FLUSH_SECONDS = env.GRAVYVALET_AUDIT_SINK_FLUSH_SECONDS
+GRAVYVALET_BATCH_INVOCATION_MAX_SIZE = env.GRAVYVALET_BATCH_INVOCATION_MAX_SIZE
+GRAVYVALET_BATCH_INVOCATION_CONCURRENCY = env.GRAVYVALET_BATCH_INVOCATION_CONCURRENCY
+HTTP_POOL_LIMIT = env.HTTP_POOL_LIMIT
+HTTP_POOL_LIMIT_PER_HOST = env.HTTP_POOL_LIMIT_PER_HOST
+HTTP_KEEPALIVE_TIMEOUT_SECONDS = env.HTTP_KEEPALIVE_TIMEOUT_SECONDS
+HTTP_DNS_CACHE_TTL_SECONDS = env.HTTP_DNS_CACHE_TTL_SECONDS
+HTTP_CACHE_SIZE = env.HTTP_CACHE_SIZE
+HTTP_CACHE_TTL_SECONDS = env.HTTP_CACHE_TTL_SECONDS
+HTTP_CACHE_MAX_BODY_BYTES = env.HTTP_CACHE_MAX_BODY_BYTES
+EXTERNAL_SERVICE_SLOT_WAIT_SECONDS = env.EXTERNAL_SERVICE_SLOT_WAIT_SECONDS
+ACCOUNT_CONCURRENCY_LIMIT = env.ACCOUNT_CONCURRENCY_LIMIT
+OAUTH_TOKEN_REFRESH_SKEW_SECONDS = env.OAUTH_TOKEN_REFRESH_SKEW_SECONDS
+OAUTH_TOKEN_SWEEP_WINDOW_SECONDS = env.OAUTH_TOKEN_SWEEP_WINDOW_SECONDS
+OAUTH_TOKEN_SWEEP_CONCURRENCY = env.OAUTH_TOKEN_SWEEP_CONCURRENCY
+OAUTH_TOKEN_SWEEP_GRACE_SECONDS = env.OAUTH_TOKEN_SWEEP_GRACE_SECONDS
+INVOCATION_PARTITIONS_AHEAD = env.INVOCATION_PARTITIONS_AHEAD
+INVOCATION_RETENTION_MONTHS = env.INVOCATION_RETENTION_MONTHS
+INVOCATION_PARTITION_DETACH_ONLY = env.INVOCATION_PARTITION_DETACH_ONLY
 if DEBUG:
     # allow for local osf shenanigans
     ALLOWED_RESOURCE_URI_PREFIXES.update(
@@ -81,6 +122,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "addon_service.common.unit_of_work.UnitOfWorkMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -9,9 +9,15 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_wsgi_application()
+
+if settings.GRAVYVALET_WARMUP_AT_STARTUP:
+    from addon_service.credentials.warmup import start_warmup
+
+    start_warmup()